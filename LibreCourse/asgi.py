@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "LibreCourse.settings")
+# Database connections aren't kept between requests (see DATABASE_CONN_MAX_AGE)
+os.environ.setdefault("LIBRECOURSE_ASGI", "1")
 
 application = get_asgi_application()
@@ -0,0 +1,40 @@
+"""
+Helpers for async views on Django 4.2, which has neither request.auser()
+nor async support in the view decorators (both arrived in 5.0).
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed
+from django.utils.log import log_response
+
+
+async def auser(request):
+    """request.user, loaded (session and user row) off the event loop."""
+
+    def load():
+        request.user.is_authenticated  # evaluates the lazy object
+        return request.user
+
+    return await sync_to_async(load)()
+
+
+def require_GET(view):
+    """django.views.decorators.http.require_GET for async views."""
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            response = HttpResponseNotAllowed(["GET"])
+            log_response(
+                "Method Not Allowed (%s): %s",
+                request.method,
+                request.path,
+                response=response,
+                request=request,
+            )
+            return response
+        return await view(request, *args, **kwargs)
+
+    return wrapper
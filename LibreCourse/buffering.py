@@ -0,0 +1,104 @@
+"""
+In-process write-behind buffers.
+
+A BatchBuffer collects items on the request path (an append under a lock)
+and hands them to `flush_fn` in one batch once `max_items` are pending or the
+oldest is `max_age` seconds old. Every buffer is also checked at the end of
+each request and flushed when the process exits. Only explicit flush() calls
+raise; a failed flush on the request path is logged and its items are kept
+for the next one.
+"""
+
+import atexit
+import logging
+import threading
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.core.signals import request_finished
+
+logger = logging.getLogger(__name__)
+
+_buffers = weakref.WeakSet()
+
+
+class BatchBuffer:
+    def __init__(self, flush_fn, max_items=1000, max_age=10.0, max_pending=None):
+        self.flush_fn = flush_fn
+        self.max_items = max_items
+        self.max_age = max_age
+        # Cap on items kept around while flushes keep failing
+        self.max_pending = max_pending or max_items * 100
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.items = []
+        self.oldest = None
+        _buffers.add(self)
+
+    def append(self, item):
+        if self.add(item):
+            self.try_flush()
+
+    async def aappend(self, item):
+        """append() for async code; a due flush runs on a worker thread."""
+        if self.add(item):
+            await sync_to_async(self.try_flush)()
+
+    def add(self, item):
+        """Buffer `item` without flushing; returns whether a flush is due."""
+        with self.lock:
+            self.items.append(item)
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+        return self.due()
+
+    def pending(self):
+        """A copy of the items not flushed yet."""
+        with self.lock:
+            return list(self.items)
+
+    def due(self):
+        return len(self.items) >= self.max_items or (
+            self.oldest is not None and time.monotonic() - self.oldest >= self.max_age
+        )
+
+    def flush(self):
+        """Pass pending items to flush_fn; returns how many were flushed."""
+        with self.flush_lock:
+            with self.lock:
+                items, self.items = self.items, []
+                self.oldest = None
+            if not items:
+                return 0
+            try:
+                self.flush_fn(items)
+            except Exception:
+                with self.lock:
+                    self.items = (items + self.items)[-self.max_pending :]
+                    self.oldest = self.oldest or time.monotonic()
+                raise
+            return len(items)
+
+    def try_flush(self):
+        """flush(), logging failures instead of raising; items stay pending."""
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception("Flushing %r failed", self.flush_fn)
+            return 0
+
+
+def flush_due_buffers(**kwargs):
+    for buffer in list(_buffers):
+        if buffer.due():
+            buffer.try_flush()
+
+
+@atexit.register
+def flush_all_buffers():
+    for buffer in list(_buffers):
+        buffer.try_flush()
+
+
+request_finished.connect(flush_due_buffers, dispatch_uid="flush_due_buffers")
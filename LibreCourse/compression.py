@@ -0,0 +1,174 @@
+"""
+Response compression for dynamic HTML and JSON.
+
+The encoding is negotiated from Accept-Encoding (q-values included): Brotli
+when the client takes it and the Brotli package is installed, gzip
+otherwise. Responses smaller than COMPRESSION_MIN_SIZE, of types other than
+text, JSON, JavaScript and XML, already encoded, served in ranges, or
+marked no-transform go out as they are. Streaming responses (sync or async) are
+compressed chunk by chunk, each flushed on its own, so a slow stream isn't
+held back waiting for a full compression block.
+
+BREACH: a compressed page reflecting attacker-chosen input next to a secret
+leaks the secret through its size. Pages that used the CSRF token, which is
+when CsrfViewMiddleware sets its cookie, are therefore never compressed. The
+middleware has to sit above CsrfViewMiddleware to see that cookie.
+"""
+
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(
+    r"^(text/|application/(json|javascript|xml|[\w.+-]+\+(json|xml))\b|image/svg\+xml)"
+)
+ACCEPT_ENCODING = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*")
+
+
+def encodings():
+    """Supported encodings, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(header):
+    """The encoding to use for an Accept-Encoding header, or None."""
+    weights = {}
+    for part in header.split(","):
+        match = ACCEPT_ENCODING.fullmatch(part)
+        if not match:
+            continue
+        try:
+            weights[match[1].lower()] = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+    best, best_weight = None, 0.0
+    for name in encodings():
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+class Compressor:
+    """Incremental compressor for one response body."""
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            self.engine = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits 31: gzip container
+            self.engine = zlib.compressobj(
+                settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31
+            )
+        self.brotli = encoding == "br"
+
+    def chunk(self, data):
+        """Compressed `data`, flushed so it can be sent right away."""
+        if self.brotli:
+            return self.engine.process(data) + self.engine.flush()
+        return self.engine.compress(data) + self.engine.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.brotli:
+            return self.engine.finish()
+        return self.engine.flush()
+
+    def compress(self, data):
+        if self.brotli:
+            return self.engine.process(data) + self.engine.finish()
+        return self.engine.compress(data) + self.engine.flush()
+
+
+def compress(data, encoding):
+    return Compressor(encoding).compress(data)
+
+
+def stream(chunks, encoding):
+    compressor = Compressor(encoding)
+    for data in chunks:
+        if data:
+            yield compressor.chunk(data)
+    yield compressor.finish()
+
+
+async def astream(chunks, encoding):
+    compressor = Compressor(encoding)
+    async for data in chunks:
+        if data:
+            yield compressor.chunk(data)
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        if (
+            response.has_header("Content-Encoding")
+            # Ranges address the bytes as they are
+            or response.has_header("Content-Range")
+            or response.get("Accept-Ranges", "none") != "none"
+            or "no-transform" in response.get("Cache-Control", "")
+            or not COMPRESSIBLE_TYPES.match(response.get("Content-Type", ""))
+        ):
+            return response
+        # The body holds a CSRF token; see the module docstring
+        if settings.CSRF_COOKIE_NAME in response.cookies:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = astream(
+                    response.streaming_content, encoding
+                )
+            else:
+                response.streaming_content = stream(
+                    response.streaming_content, encoding
+                )
+            # The compressed size isn't known until it has been sent
+            del response.headers["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # A strong ETag must not match a different encoding of the body
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,21 @@
+"""
+Jinja2 environment for the optional Jinja2 template engine.
+
+Templates under jinja2/ mirror the Django templates of the same name and get
+the same context (context processors included); they call static() and url()
+where the Django ones use {% static %} and {% url %}.
+"""
+
+from django.templatetags.static import static
+from django.urls import reverse
+from jinja2 import Environment
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update(static=static, url=url)
+    return env
@@ -0,0 +1,137 @@
+"""
+Read replica routing.
+
+Reads go to a replica only inside views wrapped with `read_from_replica`,
+and only while the visitor isn't pinned to the primary. Any write during a
+request pins the visitor (by cookie, so it holds across workers) for
+REPLICA_PIN_SECONDS, which lets them read their own writes while replicas
+catch up. Everything else, writes included, uses the default database.
+The middleware and the decorator work with both sync and async views.
+"""
+
+import contextvars
+import functools
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+PIN_COOKIE = "primary_until"
+# Writes from these apps are bookkeeping the visitor doesn't read back (and
+# buffered analytics flush other visitors' events too), they don't pin
+UNPINNED_APPS = {"analytics", "sessions"}
+
+# Per request: {"replica": bool, "wrote": bool}
+_state = contextvars.ContextVar("replica_routing", default=None)
+
+
+def pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state
+            and state["replica"]
+            and not state["wrote"]
+            and settings.REPLICA_DATABASES
+        ):
+            return random.choice(settings.REPLICA_DATABASES)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label not in UNPINNED_APPS:
+            state["wrote"] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class PrimaryPinMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = {"replica": False, "wrote": False}
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        state = {"replica": False, "wrote": False}
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state["wrote"] and settings.REPLICA_DATABASES:
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def read_from_replica(view):
+    """Let the view's reads (template rendering included) use a replica."""
+    if iscoroutinefunction(view):
+
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            state = _state.get()
+            if state is None or pinned(request):
+                return await view(request, *args, **kwargs)
+            state["replica"] = True
+            try:
+                response = await view(request, *args, **kwargs)
+                if hasattr(response, "render") and not response.is_rendered:
+                    await sync_to_async(response.render)()
+                return response
+            finally:
+                state["replica"] = False
+
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None or pinned(request):
+            return view(request, *args, **kwargs)
+        state["replica"] = True
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+            return response
+        finally:
+            state["replica"] = False
+
+    return wrapper
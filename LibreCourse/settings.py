@@ -22,6 +22,14 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 load_dotenv()
 
 
+def env_flag(name, default=False):
+    """Boolean environment variable: 1, true, yes or on, in any case."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,7 +41,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv("SECRET_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_flag("DEBUG", default=True)
 
 ALLOWED_HOSTS = [
     "*",
@@ -55,6 +63,12 @@ INSTALLED_APPS = [
     # Apps
     "courses",
     "users",
+    "progress",
+    "analytics",
+    "history",
+    "quizzes",
+    "api",
+    "ratelimit",
 ]
 
 INTERNAL_IPS = [
@@ -63,14 +77,17 @@ INTERNAL_IPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Static files are answered before sessions and users are looked up
+    "LibreCourse.middleware.WhiteNoiseMiddleware",
+    # Above CsrfViewMiddleware, to leave out pages with a CSRF token
+    "LibreCourse.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "LibreCourse.routers.PrimaryPinMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
 ]
 
 AUTHENTICATION_BACKENDS = [
@@ -81,21 +98,48 @@ AUTHENTICATION_BACKENDS = [
 
 ROOT_URLCONF = "LibreCourse.urls"
 
+TEMPLATE_CONTEXT_PROCESSORS = [
+    "django.template.context_processors.request",
+    "django.contrib.auth.context_processors.auth",
+    "django.contrib.messages.context_processors.messages",
+]
+
+# Templates are parsed once per process by the cached loader. Under
+# runserver it is reset whenever a template changes.
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
-            "context_processors": [
-                "django.template.context_processors.request",
-                "django.contrib.auth.context_processors.auth",
-                "django.contrib.messages.context_processors.messages",
+            "context_processors": TEMPLATE_CONTEXT_PROCESSORS,
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
             ],
         },
     },
 ]
 
+# JINJA2_TEMPLATES=1 renders the hottest pages (catalog, course page, home)
+# with Jinja2 from templates/jinja2/, which mirrors the Django templates of
+# the same names; everything else keeps the Django engine. Needs Jinja2.
+JINJA2_TEMPLATES = env_flag("JINJA2_TEMPLATES")
+JINJA2_ENGINE = {
+    "BACKEND": "django.template.backends.jinja2.Jinja2",
+    "DIRS": [BASE_DIR / "templates" / "jinja2"],
+    "OPTIONS": {
+        "environment": "LibreCourse.jinja2.environment",
+        "context_processors": TEMPLATE_CONTEXT_PROCESSORS,
+    },
+}
+if JINJA2_TEMPLATES:
+    TEMPLATES.insert(0, JINJA2_ENGINE)
+
 WSGI_APPLICATION = "LibreCourse.wsgi.application"
 
 
@@ -105,34 +149,109 @@ WSGI_APPLICATION = "LibreCourse.wsgi.application"
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-if DATABASE_URL:
+# Set by LibreCourse.asgi before the settings are loaded
+ASGI = env_flag("LIBRECOURSE_ASGI")
+
+# Keep database connections open between requests for this many seconds;
+# Django checks a reused connection before handing it out. Under ASGI each
+# request runs its queries in a thread of its own, which ends with the
+# request, so a persistent connection would be left open behind it; there
+# the default is to close connections at the end of every request, and
+# PgBouncer (below) takes the connection cost instead.
+DATABASE_CONN_MAX_AGE = int(os.getenv("DATABASE_CONN_MAX_AGE", 0 if ASGI else 60))
+# Set when DATABASE_URL points at PgBouncer in transaction pooling mode
+DATABASE_PGBOUNCER = env_flag("DATABASE_PGBOUNCER")
+# Server processes and threads per process (WEB_CONCURRENCY as used by
+# gunicorn and most hosts). Each thread holds at most one connection, so the
+# app needs up to WEB_CONCURRENCY * WEB_THREADS of them. Behind PgBouncer
+# they share a pool of at most DATABASE_MAX_CONNECTIONS server connections;
+# `manage.py pgbouncer_config` prints the pool settings for that.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+WEB_THREADS = int(os.getenv("WEB_THREADS", 1))
+DATABASE_MAX_CONNECTIONS = int(os.getenv("DATABASE_MAX_CONNECTIONS", 20))
+
+
+# SQLite profile: WAL lets readers run alongside the writer, synchronous=NORMAL
+# is durable across application crashes (only an OS crash can lose the last
+# commits), and writers wait up to the busy timeout for the lock.
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "normal"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024**2)),
+    # Negative values are KiB
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024)),
+    "temp_store": "memory",
+}
+
+
+def sqlite_database(name):
+    return {
+        "ENGINE": "LibreCourse.sqlite_backend",
+        "NAME": name,
+        "OPTIONS": {
+            "transaction_mode": "IMMEDIATE",
+            "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000,
+        },
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+    }
+
 
-    parsed_url = urlparse(DATABASE_URL)
-
-    DATABASES = {
-        "default": {
-            "ENGINE": "django.db.backends.postgresql",
-            "NAME": parsed_url.path[1:],  # Remove the leading slash
-            "USER": parsed_url.username,
-            "PASSWORD": parsed_url.password,
-            "HOST": parsed_url.hostname,
-            "PORT": parsed_url.port,
-            "OPTIONS": {
-                "sslmode": "require",  # Required for Railway
-            },
-        }
+def database_from_url(url):
+    parsed_url = urlparse(url)
+    if parsed_url.scheme == "sqlite":
+        # sqlite:///relative.sqlite3 or sqlite:////absolute/path.sqlite3
+        return sqlite_database(parsed_url.path[1:])
+    config = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": parsed_url.path[1:],  # Remove the leading slash
+        "USER": parsed_url.username,
+        "PASSWORD": parsed_url.password,
+        "HOST": parsed_url.hostname,
+        "PORT": parsed_url.port,
+        "OPTIONS": {
+            "sslmode": "require",  # Required for Railway
+        },
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
     }
+    if DATABASE_PGBOUNCER:
+        # Consecutive transactions may run on different server connections,
+        # so cursors can't outlive a transaction
+        config["DISABLE_SERVER_SIDE_CURSORS"] = True
+    return config
+
+
+if DATABASE_URL:
+    DATABASES = {"default": database_from_url(DATABASE_URL)}
 else:
-    # Fallback for local development (if needed)
-    DATABASES = {
-        "default": {
-            "ENGINE": "django.db.backends.sqlite3",
-            "NAME": "db.sqlite3",
-        }
+    # Fallback for local development and small single-node deployments
+    DATABASES = {"default": sqlite_database("db.sqlite3")}
+
+# Read replicas, as comma separated URLs. Catalog views read from them unless
+# the visitor wrote something in the last REPLICA_PIN_SECONDS. For local
+# testing a copy of the SQLite file works: sqlite:///replica.sqlite3
+REPLICA_DATABASES = []
+for number, url in enumerate(
+    filter(None, os.getenv("DATABASE_REPLICA_URLS", "").split(",")), start=1
+):
+    DATABASES[f"replica{number}"] = {
+        **database_from_url(url.strip()),
+        "TEST": {"MIRROR": "default"},
     }
+    REPLICA_DATABASES.append(f"replica{number}")
+
+DATABASE_ROUTERS = ["LibreCourse.routers.ReplicaRouter"]
+# Should exceed the replicas' usual replication lag
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 10))
 
 CSRF_TRUSTED_ORIGINS = []
 
+# Covering (INCLUDE) index columns only apply on PostgreSQL; SQLite builds the
+# same indexes without them.
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -176,6 +295,37 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Outside DEBUG, collectstatic gives files content-hashed names and writes
+# gzip and Brotli copies next to them; WhiteNoise serves the hashed names
+# with far-future immutable caching and the compressed copy the client
+# accepts. Run `npm run build` to rebuild the CSS and collect.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+            if DEBUG
+            else "whitenoise.storage.CompressedManifestStaticFilesStorage"
+        )
+    },
+}
+
+# Uploaded media
+MEDIA_URL = "media/"
+
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Lesson attachments
+ATTACHMENT_ROOT = MEDIA_ROOT / "attachments"
+ATTACHMENT_MAX_SIZE = int(os.getenv("ATTACHMENT_MAX_SIZE", 2 * 1024**3))
+ATTACHMENT_MAX_AGE = 60 * 60 * 24 * 365
+# Set to "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache) to hand
+# downloads to the front server; the prefix maps ATTACHMENT_ROOT there.
+ATTACHMENT_SENDFILE_HEADER = os.getenv("ATTACHMENT_SENDFILE_HEADER")
+ATTACHMENT_SENDFILE_PREFIX = os.getenv(
+    "ATTACHMENT_SENDFILE_PREFIX", "/protected/attachments/"
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -190,6 +340,81 @@ LOGOUT_REDIRECT_URL = "/"
 SESSION_COOKIE_AGE = 1209600  # 2 weeks in seconds
 SESSION_SAVE_EVERY_REQUEST = True
 
+# Lesson content larger than this many bytes is stored zlib-compressed
+# (0 disables compression). Convert existing rows with
+# `manage.py compress_lessons`.
+LESSON_CONTENT_COMPRESS_THRESHOLD = int(
+    os.getenv("LESSON_CONTENT_COMPRESS_THRESHOLD", 0)
+)
+
+# Lesson progress marks are buffered per process and written in one batch
+# once this many are pending or the oldest is this many seconds old
+PROGRESS_FLUSH_MARKS = int(os.getenv("PROGRESS_FLUSH_MARKS", 500))
+PROGRESS_FLUSH_SECONDS = float(os.getenv("PROGRESS_FLUSH_SECONDS", 5))
+
+# Analytics events are buffered per process and bulk inserted in batches
+ANALYTICS_FLUSH_EVENTS = int(os.getenv("ANALYTICS_FLUSH_EVENTS", 1000))
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", 10))
+# Raw events older than this are dropped by `manage.py rollup_events`
+ANALYTICS_RETENTION_DAYS = int(os.getenv("ANALYTICS_RETENTION_DAYS", 90))
+
+# Change history entries are written after commit, in batches
+HISTORY_FLUSH_ENTRIES = int(os.getenv("HISTORY_FLUSH_ENTRIES", 100))
+HISTORY_FLUSH_SECONDS = float(os.getenv("HISTORY_FLUSH_SECONDS", 2))
+
+# Seconds a worker keeps the tag vocabulary without seeing an invalidation
+# (only matters when the cache backend isn't shared between workers)
+TAG_VOCABULARY_TTL = int(os.getenv("TAG_VOCABULARY_TTL", 300))
+
+# The catalog's per-process tag facet index picks up course changes this
+# often and is rebuilt from scratch at the longer interval
+FACET_INDEX_REFRESH_SECONDS = float(os.getenv("FACET_INDEX_REFRESH_SECONDS", 2))
+FACET_INDEX_REBUILD_SECONDS = float(os.getenv("FACET_INDEX_REBUILD_SECONDS", 300))
+
+# Catalog pages are served from a per-process snapshot of published courses,
+# refreshed from changed rows and rebuilt from scratch at these intervals
+CATALOG_SNAPSHOT_REFRESH_SECONDS = float(
+    os.getenv("CATALOG_SNAPSHOT_REFRESH_SECONDS", 2)
+)
+CATALOG_SNAPSHOT_REBUILD_SECONDS = float(
+    os.getenv("CATALOG_SNAPSHOT_REBUILD_SECONDS", 300)
+)
+
+# API list pages: default and largest `limit`
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", 50))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 200))
+
+# Static export of the public pages (manage.py export_site, see
+# courses.export). The base URL is needed for the sitemap's absolute URLs.
+STATIC_EXPORT_ROOT = os.getenv("STATIC_EXPORT_ROOT", BASE_DIR / "export")
+STATIC_EXPORT_BASE_URL = os.getenv("STATIC_EXPORT_BASE_URL", "")
+
+# Compression of dynamic responses (see LibreCourse.compression): smallest
+# body worth compressing, in bytes, and the gzip level and Brotli quality,
+# kept moderate as every response is compressed on the fly
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 500))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+# Delta sync (see api.sync): rows are handed out once they are this old, so
+# transactions that committed late aren't skipped, and deletions are kept
+# this long (older cursors must sync from scratch)
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", 5))
+SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", 90))
+
+# Token bucket rate limits (see ratelimit.limits): `rate` tokens are added
+# per period up to `burst`, and every request takes one. Buckets are kept in
+# RATE_LIMIT_STORAGE: "local" (per process), "cache" (the default cache) or
+# "db". Set RATE_LIMIT_PROXIES to the number of proxies in front of the app
+# that append to X-Forwarded-For.
+RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "cache")
+RATE_LIMIT_PROXIES = int(os.getenv("RATE_LIMIT_PROXIES", 0))
+RATE_LIMITS = {
+    "login": {"rate": "10/m", "burst": 10, "key": "ip"},
+    "signup": {"rate": "20/h", "burst": 5, "key": "ip"},
+    "autocomplete": {"rate": "5/s", "burst": 20, "key": "user"},
+}
+
 # Email backend (for password resets)
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
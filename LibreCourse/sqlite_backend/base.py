@@ -0,0 +1,77 @@
+"""
+SQLite backend for single-node deployments.
+
+Adds three things to Django's SQLite backend:
+
+- the PRAGMAs in settings.SQLITE_PRAGMAS (WAL journal, synchronous level,
+  mmap and page cache sizes, busy timeout) on every new connection, from a
+  connection_created hook;
+- OPTIONS["transaction_mode"], as Django 5.1 has it. With "IMMEDIATE",
+  transactions take the write lock when they begin instead of on their
+  first write, so concurrent writers wait on the busy timeout rather than
+  failing with "database is locked" when a read lock can't be upgraded;
+- flushes (`manage.py flush`, TransactionTestCase) that don't fire triggers,
+  as TRUNCATE doesn't on PostgreSQL. Triggers guarding tables against
+  DELETE, such as the change history's, would otherwise abort them.
+"""
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3 import base, operations
+from django.dispatch import receiver
+
+
+class DatabaseOperations(operations.DatabaseOperations):
+    def sql_flush(self, style, tables, *, reset_sequences=False, allow_cascade=False):
+        sql = super().sql_flush(
+            style, tables, reset_sequences=reset_sequences, allow_cascade=allow_cascade
+        )
+        if not sql:
+            return sql
+        if allow_cascade:
+            tables = {t for table in tables for t in self._references_graph(table)}
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                f"AND tbl_name IN ({', '.join(['%s'] * len(tables))})",
+                list(tables),
+            )
+            triggers = cursor.fetchall()
+        # Dropped for the DELETEs and created again, in the flush's transaction
+        return [
+            *(f"DROP TRIGGER {self.quote_name(name)};" for name, _ in triggers),
+            *sql,
+            *(f"{create};" for _, create in triggers),
+        ]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    ops_class = DatabaseOperations
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("transaction_mode", None)
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict["OPTIONS"].get("transaction_mode")
+        self.cursor().execute(f"BEGIN {mode}" if mode else "BEGIN")
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    # Only this backend's connections, Django's own SQLite backend keeps its
+    # defaults
+    if not isinstance(connection, DatabaseWrapper):
+        return
+    pragmas = dict(getattr(settings, "SQLITE_PRAGMAS", {}))
+    journal_mode = pragmas.pop("journal_mode", None)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        # The journal mode is stored in the database file; switching it needs
+        # an exclusive lock, so only do it when it isn't set yet
+        if journal_mode:
+            cursor.execute("PRAGMA journal_mode")
+            if cursor.fetchone()[0].lower() != journal_mode.lower():
+                cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
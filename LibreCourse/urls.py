@@ -22,7 +22,12 @@ from . import views
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("courses/", include("courses.urls")),
+    path("courses/", include("history.urls")),
+    path("courses/", include("analytics.urls")),
+    path("courses/", include("quizzes.urls")),
     path("users/", include("users.urls")),
+    path("api/progress/", include("progress.urls")),
+    path("api/v1/", include("api.urls")),
     path("", views.home_view, name="home"),
 ]
 
@@ -6,4 +6,4 @@ def home_view(request):
 
 
 def permission_denied_view(request, exception=None):
-    return render(request, "main/no-access", status=403)
+    return render(request, "main/no-access.html", status=403)
@@ -0,0 +1,183 @@
+"""
+Incremental rollups behind the instructor dashboard.
+
+Each run finds the courses touched since the previous run (course edits,
+relation changes, learner progress or new views), computes their figures in
+a handful of grouped queries plus NumPy for the distributions, and upserts
+today's CourseDailyStats row for each of them.
+
+Hourly view counts are written after their hour ends (see rollup_events), so
+changes are found by when a count was written, not by its hour. Counts that
+land for an earlier day, the last hours of yesterday typically, update that
+day's views.
+"""
+
+import numpy as np
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from analytics.models import CourseDailyStats, EventKind, HourlyCourseStat
+from courses.models import Course, Lesson
+from progress.models import Enrollment
+
+STATS_FIELDS = [
+    "lessons",
+    "favorites",
+    "collaborators",
+    "enrollments",
+    "completed_enrollments",
+    "views",
+    "completion_histogram",
+    "completion_median",
+    "lesson_length_median",
+    "lesson_length_p90",
+    "computed_at",
+]
+
+
+def touched_courses(since):
+    """Ids of courses with anything new since `since` (all when None)."""
+    if since is None:
+        return set(Course.objects.values_list("pk", flat=True))
+    ids = set(Course.objects.filter(updated_at__gt=since).values_list("pk", flat=True))
+    ids |= set(
+        Enrollment.objects.filter(updated_at__gt=since).values_list(
+            "course_id", flat=True
+        )
+    )
+    ids |= set(
+        HourlyCourseStat.objects.filter(
+            updated_at__gt=since, course_id__gt=0
+        ).values_list("course_id", flat=True)
+    )
+    return ids & set(Course.objects.filter(pk__in=ids).values_list("pk", flat=True))
+
+
+def late_views(since, today):
+    """{day before `today`: course ids} of view counts written since `since`."""
+    days = {}
+    if since is None:
+        return days
+    rows = HourlyCourseStat.objects.filter(
+        updated_at__gt=since,
+        course_id__gt=0,
+        kind=EventKind.COURSE_VIEW,
+        hour__date__lt=today,
+    ).values_list("course_id", "hour")
+    for course_id, hour in rows:
+        days.setdefault(timezone.localdate(hour), set()).add(course_id)
+    return days
+
+
+def counts_by_course(queryset, course_ids):
+    return dict(
+        queryset.filter(course_id__in=course_ids)
+        .values("course_id")
+        .annotate(n=Count("pk"))
+        .values_list("course_id", "n")
+    )
+
+
+def grouped(course_ids, keys, values):
+    """Split `values` into one array per course id, following `keys`."""
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], values[order]
+    starts = np.searchsorted(keys, course_ids, side="left")
+    ends = np.searchsorted(keys, course_ids, side="right")
+    return {c: values[s:e] for c, s, e in zip(course_ids, starts, ends)}
+
+
+def compute(course_ids, day, now):
+    course_ids = np.array(sorted(course_ids), dtype=np.int64)
+    ids = course_ids.tolist()
+    lesson_count = dict(
+        Course.objects.filter(pk__in=ids).values_list("pk", "lesson_count")
+    )
+    favorites = counts_by_course(Course.favorites.through.objects, ids)
+    collaborators = counts_by_course(Course.collaborators.through.objects, ids)
+    views = dict(
+        HourlyCourseStat.objects.filter(
+            course_id__in=ids, kind=EventKind.COURSE_VIEW, hour__date=day
+        )
+        .values("course_id")
+        .annotate(n=Sum("count"))
+        .values_list("course_id", "n")
+    )
+
+    enrollment_rows = np.array(
+        list(
+            Enrollment.objects.filter(course_id__in=ids).values_list(
+                "course_id", "completed_count"
+            )
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    totals = np.array([lesson_count.get(c, 0) for c in enrollment_rows[:, 0]])
+    percent = np.where(
+        totals > 0,
+        np.minimum(100.0, 100.0 * enrollment_rows[:, 1] / np.maximum(totals, 1)),
+        0.0,
+    )
+    completion = grouped(ids, enrollment_rows[:, 0], percent)
+
+    length_rows = np.array(
+        list(
+            Lesson.objects.filter(course_id__in=ids)
+            .annotate(length=Length("content_html"))
+            .values_list("course_id", "length")
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    lengths = grouped(ids, length_rows[:, 0], length_rows[:, 1])
+
+    stats = []
+    for course_id in ids:
+        done = completion[course_id]
+        sizes = lengths[course_id]
+        histogram, _ = np.histogram(done, bins=10, range=(0, 100))
+        stats.append(
+            CourseDailyStats(
+                course_id=course_id,
+                day=day,
+                lessons=lesson_count.get(course_id, 0),
+                favorites=favorites.get(course_id, 0),
+                collaborators=collaborators.get(course_id, 0),
+                enrollments=len(done),
+                completed_enrollments=int(np.count_nonzero(done >= 100)),
+                views=views.get(course_id, 0),
+                completion_histogram=histogram.tolist(),
+                completion_median=float(np.median(done)) if len(done) else 0.0,
+                lesson_length_median=float(np.median(sizes)) if len(sizes) else 0.0,
+                lesson_length_p90=(
+                    float(np.percentile(sizes, 90)) if len(sizes) else 0.0
+                ),
+                computed_at=now,
+            )
+        )
+    return stats
+
+
+def upsert(course_ids, day, now, fields, batch_size):
+    course_ids = sorted(course_ids)
+    for start in range(0, len(course_ids), batch_size):
+        CourseDailyStats.objects.bulk_create(
+            compute(course_ids[start : start + batch_size], day, now),
+            update_conflicts=True,
+            unique_fields=["course", "day"],
+            update_fields=fields,
+        )
+
+
+def rollup(since, batch_size=500):
+    """Recompute today's stats for courses touched since `since`."""
+    now = timezone.now()
+    day = timezone.localdate(now)
+    course_ids = touched_courses(since)
+    # Earlier days keep the figures they were computed with, only their
+    # views change
+    for late_day, late_ids in sorted(late_views(since, day).items()):
+        late_ids = Course.objects.filter(pk__in=late_ids).values_list("pk", flat=True)
+        upsert(list(late_ids), late_day, now, ["views"], batch_size)
+    upsert(course_ids, day, now, STATS_FIELDS, batch_size)
+    return now, len(course_ids)
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from LibreCourse.buffering import BatchBuffer
+from analytics.models import Event, EventKind, HourlyCourseStat
+
+
+def write_events(items):
+    Event.objects.bulk_create(
+        [
+            Event(kind=kind, course_id=course_id, occurred_at=occurred_at)
+            for kind, course_id, occurred_at in items
+        ]
+    )
+
+
+buffer = BatchBuffer(
+    write_events,
+    max_items=settings.ANALYTICS_FLUSH_EVENTS,
+    max_age=settings.ANALYTICS_FLUSH_SECONDS,
+)
+
+
+def track(kind, course_id=None):
+    """Record an event; only appends to the in-process buffer."""
+    buffer.append((kind, course_id, timezone.now()))
+
+
+async def atrack(kind, course_id=None):
+    await buffer.aappend((kind, course_id, timezone.now()))
+
+
+def course_views(course_id):
+    """Rolled-up view count of a course (lags by up to one rollup run)."""
+    return (
+        HourlyCourseStat.objects.filter(
+            course_id=course_id, kind=EventKind.COURSE_VIEW
+        ).aggregate(total=Sum("count"))["total"]
+        or 0
+    )
+
+
+async def acourse_views(course_id):
+    stats = HourlyCourseStat.objects.filter(
+        course_id=course_id, kind=EventKind.COURSE_VIEW
+    )
+    return (await stats.aaggregate(total=Sum("count")))["total"] or 0
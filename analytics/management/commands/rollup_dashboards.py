@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from analytics.dashboards import rollup
+from analytics.models import RollupState
+
+STATE = "course_daily_stats"
+
+
+class Command(BaseCommand):
+    help = "Refresh instructor dashboard stats for courses changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true", help="Recompute every course."
+        )
+
+    def handle(self, *args, **options):
+        state = RollupState.objects.filter(name=STATE).first()
+        since = None if options["full"] or not state else state.position
+        started, count = rollup(since)
+        RollupState.objects.update_or_create(name=STATE, defaults={"position": started})
+        self.stdout.write(self.style.SUCCESS(f"Refreshed stats for {count} courses."))
@@ -0,0 +1,85 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+from analytics import partitions
+from analytics.models import Event, HourlyCourseStat, RollupState
+
+STATE = "hourly_course_stats"
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll raw analytics events up into hourly per-course counts, "
+        "maintain event partitions and drop expired raw events."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lag",
+            type=int,
+            default=300,
+            help="Seconds to wait after an hour ends before rolling it up, so "
+            "buffered events have been flushed.",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        for name in partitions.ensure_partitions(now.date()):
+            self.stdout.write(f"Created partition {name}")
+
+        end = (now - datetime.timedelta(seconds=options["lag"])).replace(
+            minute=0, second=0, microsecond=0
+        )
+        state = RollupState.objects.filter(name=STATE).first()
+        if state:
+            # Recount the last rolled-up hour too, in case events for it
+            # arrived late
+            start = state.position - datetime.timedelta(hours=1)
+        else:
+            first = Event.objects.order_by("occurred_at").first()
+            start = first.occurred_at if first else end
+
+        rows = (
+            Event.objects.filter(occurred_at__gte=start, occurred_at__lt=end)
+            .annotate(hour=TruncHour("occurred_at"), course=Coalesce("course_id", 0))
+            .values("course", "kind", "hour")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        stats = [
+            HourlyCourseStat(
+                course_id=row["course"],
+                kind=row["kind"],
+                hour=row["hour"],
+                count=row["count"],
+            )
+            for row in rows
+        ]
+        with transaction.atomic():
+            # Recounts replace the previous value, so reruns are idempotent
+            HourlyCourseStat.objects.bulk_create(
+                stats,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["course_id", "kind", "hour"],
+                update_fields=["count", "updated_at"],
+            )
+            RollupState.objects.update_or_create(
+                name=STATE, defaults={"position": max(end, start)}
+            )
+
+        cutoff = now - datetime.timedelta(days=settings.ANALYTICS_RETENTION_DAYS)
+        dropped = partitions.drop_before(cutoff)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rolled up {len(stats)} hourly counts until {end:%Y-%m-%d %H:%M}, "
+                f"dropped {dropped} expired partitions/rows."
+            )
+        )
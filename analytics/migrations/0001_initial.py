@@ -0,0 +1,109 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:33
+
+from django.db import migrations, models
+
+from analytics import partitions
+
+
+def create_events_table(apps, schema_editor):
+    partitions.create_table(schema_editor)
+
+
+def drop_events_table(apps, schema_editor):
+    partitions.drop_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Event",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("course_view", "Course view"),
+                            ("signup", "Signup"),
+                            ("course_create", "Course creation"),
+                            ("enrollment", "Enrollment"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ("course_id", models.BigIntegerField(null=True)),
+                ("occurred_at", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "analytics_events",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_events_table, drop_events_table),
+        migrations.CreateModel(
+            name="RollupState",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("position", models.DateTimeField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "analytics_rollup_state",
+            },
+        ),
+        migrations.CreateModel(
+            name="HourlyCourseStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("course_id", models.BigIntegerField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("course_view", "Course view"),
+                            ("signup", "Signup"),
+                            ("course_create", "Course creation"),
+                            ("enrollment", "Enrollment"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "analytics_hourly_course_stats",
+                "indexes": [models.Index(fields=["hour"], name="hourly_stat_hour_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="hourlycoursestat",
+            constraint=models.UniqueConstraint(
+                fields=("course_id", "kind", "hour"), name="unique_hourly_course_stat"
+            ),
+        ),
+    ]
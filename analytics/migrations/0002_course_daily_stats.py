@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0009_course_lesson_count"),
+        ("analytics", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("lessons", models.PositiveIntegerField(default=0)),
+                ("favorites", models.PositiveIntegerField(default=0)),
+                ("collaborators", models.PositiveIntegerField(default=0)),
+                ("enrollments", models.PositiveIntegerField(default=0)),
+                ("completed_enrollments", models.PositiveIntegerField(default=0)),
+                ("views", models.PositiveIntegerField(default=0)),
+                ("completion_histogram", models.JSONField(default=list)),
+                ("completion_median", models.FloatField(default=0)),
+                ("lesson_length_median", models.FloatField(default=0)),
+                ("lesson_length_p90", models.FloatField(default=0)),
+                ("computed_at", models.DateTimeField()),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="courses.course",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "analytics_course_daily_stats",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="coursedailystats",
+            constraint=models.UniqueConstraint(
+                fields=("course", "day"), name="unique_course_daily_stats"
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_course_daily_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hourlycoursestat",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="hourlycoursestat",
+            index=models.Index(fields=["updated_at"], name="hourly_stat_updated_idx"),
+        ),
+    ]
@@ -0,0 +1,96 @@
+from django.db import models
+
+
+class EventKind(models.TextChoices):
+    COURSE_VIEW = "course_view", "Course view"
+    SIGNUP = "signup", "Signup"
+    COURSE_CREATE = "course_create", "Course creation"
+    ENROLLMENT = "enrollment", "Enrollment"
+
+
+class Event(models.Model):
+    """
+    Raw server-side events. Append-only and anonymous: only what happened,
+    to which course and when.
+
+    The table is created by the migrations rather than by Django so that on
+    PostgreSQL it can be range-partitioned by month on `occurred_at` (old
+    months are dropped as whole partitions). `course_id` is a plain integer
+    so events outlive the courses they refer to.
+    """
+
+    kind = models.CharField(max_length=32, choices=EventKind.choices)
+    course_id = models.BigIntegerField(null=True)
+    occurred_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = "analytics_events"
+
+
+class HourlyCourseStat(models.Model):
+    """Events per course, kind and hour; course_id 0 holds site-wide events."""
+
+    course_id = models.BigIntegerField()
+    kind = models.CharField(max_length=32, choices=EventKind.choices)
+    hour = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    # When the count was last written; hours are recounted after they end, so
+    # the dashboard rollup follows this rather than `hour`
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "analytics_hourly_course_stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course_id", "kind", "hour"], name="unique_hourly_course_stat"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["hour"], name="hourly_stat_hour_idx"),
+            models.Index(fields=["updated_at"], name="hourly_stat_updated_idx"),
+        ]
+
+
+class RollupState(models.Model):
+    """Progress marker for a background rollup job."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "analytics_rollup_state"
+
+
+class CourseDailyStats(models.Model):
+    """
+    Per-course snapshot for the instructor dashboard, recomputed by
+    `manage.py rollup_dashboards` for courses that changed since its last run.
+    """
+
+    course = models.ForeignKey(
+        "courses.Course", on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    day = models.DateField()
+    lessons = models.PositiveIntegerField(default=0)
+    favorites = models.PositiveIntegerField(default=0)
+    collaborators = models.PositiveIntegerField(default=0)
+    enrollments = models.PositiveIntegerField(default=0)
+    completed_enrollments = models.PositiveIntegerField(default=0)
+    views = models.PositiveIntegerField(default=0)
+    # Distribution of learners' percent complete in ten 10% buckets
+    completion_histogram = models.JSONField(default=list)
+    completion_median = models.FloatField(default=0)
+    # Rendered lesson length in characters
+    lesson_length_median = models.FloatField(default=0)
+    lesson_length_p90 = models.FloatField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "analytics_course_daily_stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "day"], name="unique_course_daily_stats"
+            )
+        ]
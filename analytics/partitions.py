@@ -0,0 +1,105 @@
+"""
+Physical layout of the raw event table.
+
+On PostgreSQL `analytics_events` is range-partitioned by month on
+`occurred_at`, with a default partition catching rows for months that have no
+partition yet. Other databases get a plain table and retention falls back to
+DELETE.
+"""
+
+import datetime
+
+from django.db import connection
+
+TABLE = "analytics_events"
+
+POSTGRESQL_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    kind varchar(32) NOT NULL,
+    course_id bigint NULL,
+    occurred_at timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, occurred_at)
+) PARTITION BY RANGE (occurred_at);
+CREATE TABLE IF NOT EXISTS {TABLE}_default PARTITION OF {TABLE} DEFAULT;
+CREATE INDEX IF NOT EXISTS {TABLE}_occurred_at_idx ON {TABLE} (occurred_at);
+"""
+
+SQLITE_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    id integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+    kind varchar(32) NOT NULL,
+    course_id bigint NULL,
+    occurred_at datetime NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {TABLE}_occurred_at_idx ON {TABLE} (occurred_at);
+"""
+
+
+def create_table(schema_editor):
+    sql = (
+        POSTGRESQL_TABLE
+        if schema_editor.connection.vendor == "postgresql"
+        else SQLITE_TABLE
+    )
+    for statement in filter(str.strip, sql.split(";")):
+        schema_editor.execute(statement)
+
+
+def drop_table(schema_editor):
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (month_start(day) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def partition_name(month):
+    return f"{TABLE}_{month:%Y%m}"
+
+
+def ensure_partitions(today, months_ahead=1):
+    """Create monthly partitions from this month up to `months_ahead` on."""
+    if connection.vendor != "postgresql":
+        return []
+    created = []
+    month = month_start(today)
+    with connection.cursor() as cursor:
+        for _ in range(months_ahead + 1):
+            name = partition_name(month)
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is None:
+                cursor.execute(
+                    f"CREATE TABLE {name} PARTITION OF {TABLE} "
+                    f"FOR VALUES FROM (%s) TO (%s)",
+                    [month, next_month(month)],
+                )
+                created.append(name)
+            month = next_month(month)
+    return created
+
+
+def drop_before(cutoff):
+    """Remove raw events older than `cutoff` (whole months on PostgreSQL)."""
+    with connection.cursor() as cursor:
+        if connection.vendor != "postgresql":
+            cursor.execute(f"DELETE FROM {TABLE} WHERE occurred_at < %s", [cutoff])
+            return cursor.rowcount
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND c.relname ~ %s",
+            [TABLE, rf"^{TABLE}_\d{{6}}$"],
+        )
+        dropped = 0
+        for (name,) in cursor.fetchall():
+            month = datetime.datetime.strptime(name[-6:], "%Y%m").date()
+            if next_month(month) <= cutoff.date():
+                cursor.execute(f"DROP TABLE {name}")
+                dropped += 1
+        return dropped
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path(
+        "<int:pk>/dashboard/",
+        views.CourseDashboardView.as_view(),
+        name="course-dashboard",
+    ),
+]
@@ -0,0 +1,36 @@
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.shortcuts import get_object_or_404
+from django.views.generic import TemplateView
+
+from analytics.models import CourseDailyStats
+from courses.models import Course
+from quizzes.models import CourseQuizStats
+
+
+class CourseDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Instructor dashboard, read from the precomputed daily rollups."""
+
+    template_name = "analytics/course_dashboard.html"
+
+    def get_course(self):
+        if not hasattr(self, "course"):
+            self.course = get_object_or_404(Course, pk=self.kwargs["pk"])
+        return self.course
+
+    def test_func(self):
+        return self.request.user == self.get_course().creator
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        history = list(
+            CourseDailyStats.objects.filter(course=self.get_course()).order_by("-day")[
+                :30
+            ]
+        )
+        context["course"] = self.get_course()
+        context["stats"] = history[0] if history else None
+        context["history"] = history
+        context["quiz_stats"] = CourseQuizStats.objects.filter(
+            course=self.get_course()
+        ).first()
+        return context
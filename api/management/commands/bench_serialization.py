@@ -0,0 +1,121 @@
+import json
+import random
+import time
+
+from django.core import serializers
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api import serialization
+from api.views import COURSE, LESSON
+from courses.models import Course, Lesson, Tag
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare serializing courses and lessons with django.core.serializers "
+        "against the API's projected rows and fast encoder."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=5000)
+        parser.add_argument("--lessons", type=int, default=5000)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def load(self, course_count, lesson_count):
+        run = random.randrange(10**6)
+        creator = User.objects.order_by("pk").first()
+        tags = Tag.objects.bulk_create(Tag(name=f"bench-{run}-{i}") for i in range(20))
+        courses = Course.objects.bulk_create(
+            Course(
+                title=f"Bench {run} {i}",
+                description=f"Synthetic course {i}. " * 10,
+                creator=creator,
+                status="pub",
+            )
+            for i in range(course_count)
+        )
+        through = Course.tags.through
+        through.objects.bulk_create(
+            through(course_id=course.pk, tag_id=tag.pk)
+            for course in courses
+            for tag in random.sample(tags, 3)
+        )
+        Lesson.objects.bulk_create(
+            Lesson(
+                title=f"Lesson {i}",
+                content=f"Lesson {i} text. " * 50,
+                content_html=f"<p>Lesson {i} text. </p>" * 50,
+                course=courses[i % len(courses)],
+                position=i,
+            )
+            for i in range(lesson_count)
+        )
+        return [course.pk for course in courses], [tag.pk for tag in tags]
+
+    def measure(self, fn, rounds):
+        best, size = None, 0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            size = len(fn())
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, size
+
+    def projected(self, projection, queryset, names, encode):
+        def run():
+            rows = projection.rows(queryset, names)
+            return encode({"results": [data for _, data in rows]})
+
+        return run
+
+    def handle(self, *args, **options):
+        course_ids, tag_ids = self.load(options["courses"], options["lessons"])
+        courses = Course.objects.filter(pk__in=course_ids).order_by("pk")
+        lessons = Lesson.objects.filter(course_id__in=course_ids).order_by("pk")
+
+        def stdlib(data):
+            return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+        try:
+            for label, queryset, projection in (
+                ("courses", courses, COURSE),
+                ("lessons", lessons, LESSON),
+            ):
+                count = queryset.count()
+                cases = [
+                    (
+                        "django.core.serializers",
+                        lambda: serializers.serialize("json", queryset).encode(),
+                    ),
+                    (
+                        "projection + json",
+                        self.projected(
+                            projection, queryset, projection.default, stdlib
+                        ),
+                    ),
+                ]
+                if serialization.orjson is not None:
+                    cases.append(
+                        (
+                            "projection + orjson",
+                            self.projected(
+                                projection,
+                                queryset,
+                                projection.default,
+                                serialization.dumps,
+                            ),
+                        )
+                    )
+                self.stdout.write(f"{count} {label}, default fields")
+                for name, fn in cases:
+                    elapsed, size = self.measure(fn, options["rounds"])
+                    self.stdout.write(
+                        f"  {name:<24} {count / elapsed:10,.0f} rows/s   "
+                        f"{size / 2**20:6.1f} MB"
+                    )
+        finally:
+            # Tags first: the bulk inserted relations never counted as usage
+            Tag.objects.filter(pk__in=tag_ids).delete()
+            Course.objects.filter(pk__in=course_ids).delete()
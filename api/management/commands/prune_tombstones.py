@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than SYNC_TOMBSTONE_DAYS."
+
+    def handle(self, *args, **options):
+        # Cursors this old are refused, so nothing reads these any more
+        cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(f"Deleted {deleted} tombstones")
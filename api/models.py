@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class Tombstone(models.Model):
+    """A deleted course, lesson or tag, kept for the delta sync (api.sync)."""
+
+    class Kind(models.TextChoices):
+        COURSE = "course"
+        LESSON = "lesson"
+        TAG = "tag"
+
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    # The lesson's course, so lesson deletions are only sent to its readers
+    course_id = models.BigIntegerField(null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted_at", "id"], name="tombstone_deleted_idx"),
+        ]
@@ -0,0 +1,177 @@
+"""
+Delta sync for offline clients (/api/v1/sync/).
+
+A client keeps a cursor holding one watermark per stream, the (updated_at,
+id) of the last course, lesson and tag it received and the (deleted_at, id)
+of the last tombstone. Each stream is read in that order from its index,
+after the watermark, so a call returns what changed since the previous one
+and a page never skips or repeats rows that share a timestamp.
+
+Rows are only read up to SYNC_SETTLE_SECONDS in the past: a transaction can
+commit after rows with a later updated_at were already handed out, and the
+margin lets it land before the watermark moves past it.
+
+Deletions come from tombstones written by the post_delete receivers below;
+they are kept for SYNC_TOMBSTONE_DAYS, and older cursors must sync from
+scratch. A course the client can no longer see (unpublished, or the client
+was removed as a collaborator) is sent as deleted. A course it can newly see
+arrives in the course stream without its older lessons, which the client
+fetches from the course's lessons endpoint.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from api.models import Tombstone
+from courses.models import Course, Lesson, Tag
+
+STREAMS = ("courses", "lessons", "tags", "deleted")
+
+
+class CursorExpired(Exception):
+    """The cursor is older than the tombstones kept."""
+
+
+def encode(watermarks):
+    data = {name: [ts.isoformat(), pk] for name, (ts, pk) in watermarks.items()}
+    return urlsafe_base64_encode(json.dumps(data, separators=(",", ":")).encode())
+
+
+def decode(cursor):
+    """{stream: (datetime, pk)}, empty for no cursor; raises ValueError."""
+    if not cursor:
+        return {}
+    try:
+        data = json.loads(urlsafe_base64_decode(cursor))
+        watermarks = {
+            name: (datetime.fromisoformat(data[name][0]), int(data[name][1]))
+            for name in STREAMS
+        }
+    except (TypeError, KeyError, IndexError, AttributeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if any(timezone.is_naive(ts) for ts, _ in watermarks.values()):
+        raise ValueError("Invalid cursor")
+    return watermarks
+
+
+def horizon():
+    """Rows changed after this may still have company on its way."""
+    return timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+
+
+def scan(queryset, column, watermark, until, limit):
+    """
+    Up to `limit` (pk, timestamp) pairs of `queryset` changed after
+    `watermark` and up to `until`, in (column, pk) order, plus whether more
+    remain.
+    """
+    queryset = queryset.filter(**{f"{column}__lte": until})
+    if watermark is not None:
+        ts, pk = watermark
+        queryset = queryset.filter(
+            Q(**{f"{column}__gt": ts}) | Q(**{column: ts, "pk__gt": pk})
+        )
+    rows = list(queryset.order_by(column, "pk").values_list("pk", column)[: limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def changes(watermarks, visible, limit):
+    """
+    Changes after `watermarks` (empty for an initial sync) among the courses
+    in the `visible` queryset, as {stream: [pk]} plus {"deleted": {kind:
+    [pk]}}, with the next watermarks and whether any stream has more.
+    """
+    until = horizon()
+    initial = not watermarks
+    if initial:
+        # Nothing to delete on the client yet
+        watermarks = {"deleted": (until, 0)}
+    elif watermarks["deleted"][0] < timezone.now() - timedelta(
+        days=settings.SYNC_TOMBSTONE_DAYS
+    ):
+        raise CursorExpired
+
+    scanned, more = {}, False
+    streams = {
+        # Hidden courses are read too, to tell the client to drop them
+        "courses": (visible if initial else Course.objects.all(), "updated_at"),
+        "lessons": (
+            Lesson.objects.filter(course__in=visible.values("pk")),
+            "updated_at",
+        ),
+        "tags": (Tag.objects.all(), "updated_at"),
+        "deleted": (Tombstone.objects.all(), "deleted_at"),
+    }
+    for name, (queryset, column) in streams.items():
+        rows, truncated = scan(queryset, column, watermarks.get(name), until, limit)
+        more = more or truncated
+        if rows:
+            watermarks[name] = (rows[-1][1], rows[-1][0])
+        if not truncated:
+            # Everything up to the horizon was read; moving the watermark
+            # there keeps the next scan short and the cursor from expiring
+            watermarks[name] = max(watermarks.get(name, (until, 0)), (until, 0))
+        scanned[name] = [pk for pk, _ in rows]
+
+    deleted = {"courses": [], "lessons": [], "tags": []}
+    courses = scanned["courses"]
+    if not initial and courses:
+        shown = set(visible.filter(pk__in=courses).values_list("pk", flat=True))
+        deleted["courses"] = [pk for pk in courses if pk not in shown]
+        courses = [pk for pk in courses if pk in shown]
+
+    tombstones = list(
+        Tombstone.objects.filter(pk__in=scanned["deleted"])
+        .order_by("deleted_at", "pk")
+        .values_list("kind", "object_id", "course_id")
+    )
+    lesson_courses = {c for kind, _, c in tombstones if kind == Tombstone.Kind.LESSON}
+    if lesson_courses:
+        lesson_courses = set(
+            visible.filter(pk__in=lesson_courses).values_list("pk", flat=True)
+        )
+    for kind, object_id, course_id in tombstones:
+        if kind == Tombstone.Kind.COURSE:
+            deleted["courses"].append(object_id)
+        elif kind == Tombstone.Kind.TAG:
+            deleted["tags"].append(object_id)
+        # Lessons of a deleted course go with its tombstone
+        elif course_id in lesson_courses:
+            deleted["lessons"].append(object_id)
+
+    result = {
+        "courses": courses,
+        "lessons": scanned["lessons"],
+        "tags": scanned["tags"],
+        "deleted": deleted,
+    }
+    return result, watermarks, more
+
+
+def bury(kind, instance, course_id=None):
+    Tombstone.objects.create(kind=kind, object_id=instance.pk, course_id=course_id)
+
+
+@receiver(post_delete, sender=Course)
+def bury_course(sender, instance, **kwargs):
+    bury(Tombstone.Kind.COURSE, instance)
+
+
+@receiver(post_delete, sender=Lesson)
+def bury_lesson(sender, instance, origin=None, **kwargs):
+    # Lessons deleted along with their course go with the course's tombstone
+    if isinstance(origin, Course) or getattr(origin, "model", None) is Course:
+        return
+    bury(Tombstone.Kind.LESSON, instance, instance.course_id)
+
+
+@receiver(post_delete, sender=Tag)
+def bury_tag(sender, instance, **kwargs):
+    bury(Tombstone.Kind.TAG, instance)
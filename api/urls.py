@@ -0,0 +1,25 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path("courses/", views.course_list, name="api-courses"),
+    path("courses/<int:course_id>/", views.course_detail, name="api-course"),
+    path("courses/<int:course_id>/lessons/", views.lesson_list, name="api-lessons"),
+    path(
+        "courses/<int:course_id>/lessons/<int:lesson_id>/",
+        views.lesson_detail,
+        name="api-lesson",
+    ),
+    path(
+        "courses/<int:course_id>/collaborators/",
+        views.collaborator_list,
+        name="api-collaborators",
+    ),
+    path(
+        "courses/<int:course_id>/collaborators/<int:user_id>/",
+        views.collaborator_detail,
+        name="api-collaborator",
+    ),
+    path("tags/", views.tag_list, name="api-tags"),
+    path("sync/", views.sync_changes, name="api-sync"),
+]
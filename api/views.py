@@ -0,0 +1,496 @@
+"""
+/api/v1/: courses, their lessons and collaborators, tags, and a delta sync
+for offline clients (api.sync).
+
+Reads take `fields` (sparse fieldsets) and, for lists, `limit` and `cursor`.
+Representations of a course and of everything nested under it carry an ETag
+derived from Course.updated_at, which lesson, tag and collaborator changes
+also bump, so clients can revalidate (If-None-Match) and make conditional
+writes (If-Match). Writes take a JSON body, validated by the same forms as
+the site, and authenticate with the session.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.http import require_GET, require_http_methods
+
+from analytics.events import track
+from analytics.models import EventKind
+from api import pagination, sync
+from api.serialization import Field, Projection, Related, json_response, loads
+from courses import tags
+from courses.forms import CourseForm, LessonForm
+from courses.models import Course, Lesson, Tag
+from history.recorder import form_changes, record
+from users.models import User
+
+
+def course_tags(course_ids):
+    names = {}
+    rows = Course.tags.through.objects.filter(course_id__in=course_ids).values_list(
+        "course_id", "tag__name"
+    )
+    for course_id, name in rows.order_by("tag__name"):
+        names.setdefault(course_id, []).append(name)
+    return names
+
+
+COURSE = Projection(
+    {
+        "id": Field("id"),
+        "title": Field("title"),
+        "description": Field("description"),
+        "status": Field("status"),
+        "creator": Field("creator__username"),
+        "creator_id": Field("creator_id"),
+        "lesson_count": Field("lesson_count"),
+        "created_at": Field("created_at"),
+        "updated_at": Field("updated_at"),
+        "tags": Related(course_tags),
+    },
+    default=["id", "title", "status", "creator", "lesson_count", "tags", "updated_at"],
+)
+
+LESSON = Projection(
+    {
+        "id": Field("id"),
+        "course_id": Field("course_id"),
+        "title": Field("title"),
+        "position": Field("position"),
+        "created_at": Field("created_at"),
+        "updated_at": Field("updated_at"),
+        "content": Field("content"),
+        "content_html": Field("content_html"),
+    },
+    default=["id", "title", "position"],
+)
+LESSON_DETAIL_FIELDS = ["id", "course_id", "title", "position", "content_html"]
+LESSON_SYNC_FIELDS = [*LESSON_DETAIL_FIELDS, "updated_at"]
+
+TAG = Projection(
+    {
+        "id": Field("id"),
+        "name": Field("name"),
+        "usage_count": Field("usage_count"),
+        "updated_at": Field("updated_at"),
+    },
+    default=["id", "name", "usage_count", "updated_at"],
+)
+
+COLLABORATOR = Projection(
+    {
+        "id": Field("id"),
+        "username": Field("username"),
+        "display_name": Field(
+            "username", "id", get=lambda row: f"{row['username']}#{row['id']}"
+        ),
+        "profile_picture": Field(
+            "profile_picture",
+            get=lambda row: row["profile_picture"] or "/static/default_avatar.png",
+        ),
+    },
+    default=["id", "display_name", "profile_picture"],
+)
+
+
+def error(status, message, **extra):
+    return json_response({"error": message, **extra}, status=status)
+
+
+def form_error(form):
+    return error(400, "invalid data", fields=form.errors.get_json_data())
+
+
+def parse_body(request):
+    """The JSON object in the request body, or None."""
+    try:
+        data = loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def fields_param(request, projection, default=None):
+    """Requested field names; raises ValueError for unknown ones."""
+    value = request.GET.get("fields")
+    if not value and default:
+        return list(default)
+    return projection.select(value)
+
+
+def get_course(course_id):
+    return (
+        Course.objects.only("title", "status", "creator_id", "updated_at")
+        .filter(pk=course_id)
+        .first()
+    )
+
+
+def course_etag(request, course):
+    # The representation is a function of the course's state and the query
+    key = f"{course.pk}:{course.updated_at.isoformat()}:{request.GET.urlencode()}"
+    return quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+
+def etag_matches(header, etag):
+    # Weak comparison for If-Match too: the ETag stands for the course's
+    # version rather than exact bytes, and response compression weakens it
+    tags = parse_etags(header)
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def conditional(request, course, build):
+    """
+    Answer 304/412 from the course's ETag, or the response of `build()`
+    with the ETag set.
+    """
+    etag = course_etag(request, course)
+    if_match = request.META.get("HTTP_IF_MATCH")
+    if if_match is not None and not etag_matches(if_match, etag):
+        return error(412, "the course has changed")
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        if request.method in ("GET", "HEAD"):
+            return HttpResponseNotModified(headers={"ETag": etag})
+        return error(412, "the course has changed")
+    response = build()
+    if response.status_code == 200 and request.method in ("GET", "HEAD"):
+        response["ETag"] = etag
+    return response
+
+
+def represent(projection, queryset, names):
+    rows = projection.rows(queryset, names, limit=1)
+    return rows[0][1] if rows else None
+
+
+def course_form_data(data, course=None):
+    """CourseForm data from a JSON body, falling back to the course's values."""
+    form_data = {}
+    for name in ("title", "description", "status"):
+        if course is not None:
+            default = getattr(course, name)
+        else:
+            default = Course._meta.get_field(name).get_default()
+        form_data[name] = data.get(name, default)
+    if "tags" in data:
+        value = data["tags"]
+        form_data["tags_input"] = (
+            ",".join(map(str, value)) if isinstance(value, list) else str(value)
+        )
+    elif course is not None:
+        form_data["tags_input"] = ",".join(course.tags.values_list("name", flat=True))
+    return form_data
+
+
+# Courses
+
+
+@require_http_methods(["GET", "HEAD", "POST"])
+def course_list(request):
+    if request.method == "POST":
+        return create_course(request)
+    try:
+        names = fields_param(request, COURSE)
+        page = pagination.paginate(
+            request, Course.objects.visible_to(request.user), COURSE, names
+        )
+    except ValueError as e:
+        return error(400, str(e))
+    return json_response(page)
+
+
+def create_course(request):
+    if not request.user.is_authenticated:
+        return error(401, "authentication required")
+    data = parse_body(request)
+    if data is None:
+        return error(400, "expected a JSON object")
+    form = CourseForm(course_form_data(data))
+    if not form.is_valid():
+        return form_error(form)
+    form.instance.creator = request.user
+    course = form.save()
+    track(EventKind.COURSE_CREATE, course.pk)
+    record("create", course, request.user, form_changes(form, False))
+    return json_response(
+        represent(COURSE, Course.objects.filter(pk=course.pk), COURSE.default),
+        status=201,
+        headers={"Location": reverse("api-course", args=[course.pk])},
+    )
+
+
+@require_http_methods(["GET", "HEAD", "PATCH", "DELETE"])
+def course_detail(request, course_id):
+    course = get_course(course_id)
+    if course is None or not course.can_view(request.user):
+        return error(404, "not found")
+    if request.method in ("PATCH", "DELETE") and request.user.pk != course.creator_id:
+        return error(403, "only the course creator can change it")
+    try:
+        names = fields_param(request, COURSE)
+    except ValueError as e:
+        return error(400, str(e))
+
+    def build():
+        if request.method == "DELETE":
+            record("delete", course, request.user)
+            course.delete()
+            return HttpResponse(status=204)
+        if request.method == "PATCH":
+            data = parse_body(request)
+            if data is None:
+                return error(400, "expected a JSON object")
+            form = CourseForm(course_form_data(data, course), instance=course)
+            if not form.is_valid():
+                return form_error(form)
+            form.save()
+            if form.has_changed():
+                record("update", course, request.user, form_changes(form))
+        return json_response(
+            represent(COURSE, Course.objects.filter(pk=course.pk), names)
+        )
+
+    return conditional(request, course, build)
+
+
+# Lessons
+
+
+@require_http_methods(["GET", "HEAD", "POST"])
+def lesson_list(request, course_id):
+    course = get_course(course_id)
+    if course is None or not course.can_view(request.user):
+        return error(404, "not found")
+    if request.method == "POST":
+        return create_lesson(request, course)
+    try:
+        names = fields_param(request, LESSON)
+        pagination.page_size(request)
+        pagination.decode(request.GET.get("cursor"))
+    except ValueError as e:
+        return error(400, str(e))
+    lessons = Lesson.objects.filter(course_id=course.pk)
+    return conditional(
+        request,
+        course,
+        lambda: json_response(pagination.paginate(request, lessons, LESSON, names)),
+    )
+
+
+def lesson_position(data, default):
+    """The `position` of a JSON body as an int; raises ValueError."""
+    position = data.get("position", default)
+    if isinstance(position, bool) or not isinstance(position, (int, str)):
+        raise ValueError("position must be an integer")
+    return int(position)
+
+
+def create_lesson(request, course):
+    if not course.can_edit(request.user):
+        return error(403, "only the creator and collaborators can add lessons")
+    data = parse_body(request)
+    if data is None:
+        return error(400, "expected a JSON object")
+    form = LessonForm(
+        {"title": data.get("title", ""), "content": data.get("content", "")}
+    )
+    try:
+        position = lesson_position(data, course.lesson_set.count() + 1)
+    except ValueError as e:
+        return error(400, str(e))
+    if not form.is_valid():
+        return form_error(form)
+    form.instance.course = course
+    form.instance.position = position
+    lesson = form.save()
+    record("create", lesson, request.user, form_changes(form, False))
+    return json_response(
+        represent(LESSON, Lesson.objects.filter(pk=lesson.pk), LESSON_DETAIL_FIELDS),
+        status=201,
+        headers={"Location": reverse("api-lesson", args=[course.pk, lesson.pk])},
+    )
+
+
+@require_http_methods(["GET", "HEAD", "PATCH", "DELETE"])
+def lesson_detail(request, course_id, lesson_id):
+    course = get_course(course_id)
+    if course is None or not course.can_view(request.user):
+        return error(404, "not found")
+    lessons = Lesson.objects.filter(pk=lesson_id, course_id=course.pk)
+    if request.method == "DELETE" and request.user.pk != course.creator_id:
+        return error(403, "only the course creator can delete lessons")
+    if request.method == "PATCH" and not course.can_edit(request.user):
+        return error(403, "only the creator and collaborators can edit lessons")
+    try:
+        names = fields_param(request, LESSON, LESSON_DETAIL_FIELDS)
+    except ValueError as e:
+        return error(400, str(e))
+
+    def build():
+        if request.method in ("GET", "HEAD"):
+            data = represent(LESSON, lessons, names)
+            if data is None:
+                return error(404, "not found")
+            return json_response(data)
+        lesson = lessons.first()
+        if lesson is None:
+            return error(404, "not found")
+        if request.method == "DELETE":
+            record("delete", lesson, request.user)
+            lesson.delete()
+            return HttpResponse(status=204)
+        data = parse_body(request)
+        if data is None:
+            return error(400, "expected a JSON object")
+        form = LessonForm(
+            {
+                "title": data.get("title", lesson.title),
+                "content": data.get("content", lesson.content),
+            },
+            instance=lesson,
+        )
+        try:
+            lesson.position = lesson_position(data, lesson.position)
+        except ValueError as e:
+            return error(400, str(e))
+        if not form.is_valid():
+            return form_error(form)
+        form.save()
+        if form.has_changed():
+            record("update", lesson, request.user, form_changes(form))
+        return json_response(represent(LESSON, lessons, names))
+
+    return conditional(request, course, build)
+
+
+# Collaborators
+
+
+@require_http_methods(["GET", "HEAD", "POST"])
+def collaborator_list(request, course_id):
+    course = get_course(course_id)
+    if course is None or not course.can_edit(request.user):
+        return error(404, "not found")
+    if request.method == "POST":
+        return add_collaborator(request, course)
+    try:
+        names = fields_param(request, COLLABORATOR)
+        pagination.page_size(request)
+        pagination.decode(request.GET.get("cursor"))
+    except ValueError as e:
+        return error(400, str(e))
+    users = User.objects.filter(collaborating_courses=course.pk)
+    return conditional(
+        request,
+        course,
+        lambda: json_response(pagination.paginate(request, users, COLLABORATOR, names)),
+    )
+
+
+def add_collaborator(request, course):
+    """Add {"user": id or username}, as CollaboratorsForm does on the site."""
+    if request.user.pk != course.creator_id:
+        return error(403, "only the course creator can add collaborators")
+    data = parse_body(request)
+    if data is None:
+        return error(400, "expected a JSON object")
+    identifier = str(data.get("user") or "").strip()
+    user = None
+    if identifier.isdigit():
+        user = User.objects.filter(pk=int(identifier)).first()
+    if user is None and identifier:
+        user = User.objects.filter(username__iexact=identifier).first()
+    if user is None:
+        return error(400, "no such user")
+    if user.pk == course.creator_id:
+        return error(400, "the creator can't be a collaborator")
+    course.collaborators.add(user)
+    return json_response(
+        represent(COLLABORATOR, User.objects.filter(pk=user.pk), COLLABORATOR.default),
+        status=201,
+    )
+
+
+@require_http_methods(["DELETE"])
+def collaborator_detail(request, course_id, user_id):
+    course = get_course(course_id)
+    if course is None or not course.can_edit(request.user):
+        return error(404, "not found")
+    if request.user.pk != course.creator_id:
+        return error(403, "only the course creator can remove collaborators")
+    course.collaborators.remove(user_id)
+    return HttpResponse(status=204)
+
+
+# Tags
+
+
+@require_GET
+def tag_list(request):
+    """Tags in use, most used first, or those starting with `q`."""
+    vocabulary = tags.vocabulary()
+    query = request.GET.get("q", "")
+    names = vocabulary.prefix(query, limit=50) if query else vocabulary.used()
+    return json_response(
+        {
+            "results": [
+                {"name": name, "usage_count": vocabulary.counts[name]} for name in names
+            ]
+        },
+        headers={"Cache-Control": "private, max-age=60"},
+    )
+
+
+# Delta sync
+
+
+@require_GET
+def sync_changes(request):
+    """
+    Courses, lessons and tags changed since `cursor`, and the ids of those
+    deleted; see api.sync. Without a cursor, everything the client can see.
+    Call again with the returned cursor, right away while `more` is true.
+    """
+    try:
+        watermarks = sync.decode(request.GET.get("cursor"))
+        limit = pagination.page_size(request)
+    except ValueError as e:
+        return error(400, str(e))
+    try:
+        changed, watermarks, more = sync.changes(
+            watermarks, Course.objects.visible_to(request.user), limit
+        )
+    except sync.CursorExpired:
+        return error(
+            410,
+            f"cursor older than {settings.SYNC_TOMBSTONE_DAYS} days, "
+            "sync again without one",
+        )
+    projections = {
+        "courses": (COURSE, Course, list(COURSE.fields)),
+        "lessons": (LESSON, Lesson, LESSON_SYNC_FIELDS),
+        "tags": (TAG, Tag, TAG.default),
+    }
+    data = {
+        name: [
+            row
+            for _, row in projection.rows(
+                model.objects.filter(pk__in=changed[name]).order_by("pk"), names
+            )
+        ]
+        for name, (projection, model, names) in projections.items()
+    }
+    return json_response(
+        {
+            **data,
+            "deleted": changed["deleted"],
+            "cursor": sync.encode(watermarks),
+            "more": more,
+        },
+        headers={"Cache-Control": "private, no-cache"},
+    )
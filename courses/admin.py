@@ -1,4 +1,5 @@
 from django.contrib import admin
+from . import search
 from .models import Course, Lesson, Tag
 
 
@@ -7,7 +8,7 @@ from .models import Course, Lesson, Tag
 # -------------------------
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ("name",)
+    list_display = ("name", "usage_count")
     search_fields = ("name",)
 
 
@@ -53,7 +54,17 @@ class CourseAdmin(admin.ModelAdmin):
 @admin.register(Lesson)
 class LessonAdmin(admin.ModelAdmin):
     list_display = ("title", "course", "position", "created_at")
-    search_fields = ("title", "content", "course__title")
+    # Lesson bodies are matched through the full-text index below
+    search_fields = ("title", "course__title")
     list_filter = ("course",)
     ordering = ("course", "position")
     readonly_fields = ("created_at",)
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        if search_term:
+            ids = [hit["id"] for hit in search.search(search_term, limit=500)]
+            results |= queryset.filter(pk__in=ids)
+        return results, may_have_duplicates
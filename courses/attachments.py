@@ -0,0 +1,208 @@
+"""
+Storage for lesson attachments.
+
+Uploads arrive in chunks and are appended to a temporary file under
+ATTACHMENT_ROOT/uploads/. Once complete the file is hashed and stored as
+ATTACHMENT_ROOT/blobs/<sha256>, so identical files are stored once no matter
+how many lessons attach them. The upload row stays behind, linked to the
+attachment, and answers requests retried after completion.
+"""
+
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header
+
+from courses.models import AttachmentBlob, LessonAttachment
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def root():
+    return Path(settings.ATTACHMENT_ROOT)
+
+
+def upload_path(upload):
+    return root() / "uploads" / str(upload.pk)
+
+
+def blob_path(sha256):
+    return root() / "blobs" / sha256[:2] / sha256[2:4] / sha256
+
+
+def write_chunk(upload, stream, length):
+    """
+    Copy `length` bytes from `stream` to the end of the upload's temp file,
+    CHUNK_SIZE at a time. Returns the number of bytes written.
+    """
+    path = upload_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with open(path, "r+b" if path.exists() else "wb") as f:
+        # Drop bytes a failed earlier attempt left behind
+        f.truncate(upload.received)
+        f.seek(upload.received)
+        while written < length:
+            data = stream.read(min(CHUNK_SIZE, length - written))
+            if not data:
+                break
+            f.write(data)
+            written += len(data)
+    return written
+
+
+def discard_upload(upload):
+    upload_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+def finalize(upload):
+    """
+    Move a completed upload into content-addressed storage and record its
+    attachment on it. Call inside a transaction holding the upload's row
+    lock. The upload file is only removed once that commits, so a failed
+    attempt can be retried.
+    """
+    path = upload_path(upload)
+    if upload.size == 0:
+        # Nothing was ever written
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while data := f.read(CHUNK_SIZE):
+            digest.update(data)
+    sha256 = digest.hexdigest()
+
+    target = blob_path(sha256)
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, target)
+        except FileExistsError:
+            # The same file was finalized by another upload meanwhile
+            pass
+
+    blob, _ = AttachmentBlob.objects.get_or_create(
+        sha256=sha256, defaults={"size": upload.size}
+    )
+    upload.attachment = LessonAttachment.objects.create(
+        lesson_id=upload.lesson_id,
+        blob=blob,
+        filename=upload.filename,
+        content_type=upload.content_type,
+        uploaded_by_id=upload.uploaded_by_id,
+    )
+    upload.save(update_fields=["attachment"])
+    transaction.on_commit(lambda: path.unlink(missing_ok=True))
+    return upload.attachment
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) for a single-range `Range` header, None when the
+    whole file should be sent, or raise ValueError if it can't be satisfied.
+    """
+    match = RANGE_RE.match(header or "")
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last `end` bytes
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+class RangeFile:
+    """Read-only view of `length` bytes of an open file."""
+
+    def __init__(self, f, length):
+        self.f = f
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # Lets wsgi.file_wrapper implementations use sendfile() from the
+        # current offset for Content-Length bytes.
+        return self.f.fileno()
+
+    def close(self):
+        self.f.close()
+
+
+class AttachmentResponse(FileResponse):
+    block_size = CHUNK_SIZE
+
+
+def serve(request, attachment, public):
+    """Respond with an attachment, honoring ETag and single byte ranges."""
+    blob = attachment.blob
+    etag = f'"{blob.sha256}"'
+    headers = {
+        "ETag": etag,
+        # Blobs never change under their hash
+        "Cache-Control": f"{'public' if public else 'private'}, "
+        f"max-age={settings.ATTACHMENT_MAX_AGE}, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if request.headers.get("If-None-Match") == etag:
+        return HttpResponse(status=304, headers=headers)
+
+    if settings.ATTACHMENT_SENDFILE_HEADER:
+        # Let the front server (nginx X-Accel-Redirect, Apache X-Sendfile)
+        # stream the file, it handles ranges itself.
+        response = HttpResponse(content_type=attachment.content_type, headers=headers)
+        response["Content-Disposition"] = content_disposition_header(
+            True, attachment.filename
+        )
+        response[settings.ATTACHMENT_SENDFILE_HEADER] = (
+            settings.ATTACHMENT_SENDFILE_PREFIX
+            + blob_path(blob.sha256).relative_to(root()).as_posix()
+        )
+        return response
+
+    byte_range = None
+    if request.headers.get("If-Range", etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get("Range"), blob.size)
+        except ValueError:
+            return HttpResponse(
+                status=416, headers={**headers, "Content-Range": f"bytes */{blob.size}"}
+            )
+
+    f = open(blob_path(blob.sha256), "rb")
+    if byte_range is None:
+        body, status, length = f, 200, blob.size
+    else:
+        start, end = byte_range
+        f.seek(start)
+        body, status, length = RangeFile(f, end - start + 1), 206, end - start + 1
+        headers["Content-Range"] = f"bytes {start}-{end}/{blob.size}"
+
+    response = AttachmentResponse(
+        body,
+        status=status,
+        content_type=attachment.content_type,
+        as_attachment=True,
+        filename=attachment.filename,
+        headers=headers,
+    )
+    response["Content-Length"] = length
+    return response
@@ -0,0 +1,196 @@
+"""
+Static export of the public site.
+
+Published course pages, their lesson pages and the catalog pages are
+rendered by the site's own views, as an anonymous visitor sees them, into
+<url>/index.html files under STATIC_EXPORT_ROOT, next to a sitemap. Catalog
+pages are exported under /courses/page/<n>/, which the dynamic site serves
+too. A front end (CDN, nginx, WhiteNoise with index files) can answer
+anonymous GETs without a query string from the directory and send everything
+else, including any request with a session cookie, to Django.
+
+A manifest in the directory records each exported course's updated_at and
+files, so an export only re-renders courses that changed since the last one
+(lesson edits bump their course) and removes those no longer published.
+"""
+
+import json
+import os
+from xml.sax.saxutils import escape
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import reverse
+
+from courses import facets
+from courses.models import Course, Lesson
+from courses.snapshot import catalog
+from courses.views import CourseDetailView, CourseListView, LessonDetailView
+
+MANIFEST = ".export-manifest.json"
+# Most URLs a sitemap file may list
+SITEMAP_URLS = 50_000
+
+
+class StaticCourseListView(CourseListView):
+    def page_url(self, number):
+        return catalog_url(number)
+
+
+def catalog_url(number):
+    if number == 1:
+        return reverse("course-list")
+    return reverse("course-list-page", args=[number])
+
+
+def anonymous_request(path):
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    return request
+
+
+def output_path(root, url):
+    return os.path.join(root, url.strip("/"), "index.html")
+
+
+def write(path, content):
+    """Replace `path` atomically, so the directory can be served meanwhile."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def remove(root, files):
+    """Delete exported files and the directories they leave empty."""
+    for name in files:
+        path = os.path.join(root, name)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        directory = os.path.dirname(path)
+        while os.path.abspath(directory) != os.path.abspath(root):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+def render_course(pk):
+    """{url: html} of a course page and its lesson pages."""
+    url = reverse("course-detail", args=[pk])
+    view = CourseDetailView()
+    view.setup(anonymous_request(url), pk=pk)
+
+    async def context():
+        view.object = await view.aget_object()
+        return await view.aget_context_data(view.request.user)
+
+    pages = {url: view.render_to_response(async_to_sync(context)()).render().content}
+    lesson_view = LessonDetailView.as_view()
+    for lesson_id in Lesson.objects.filter(course_id=pk).values_list("pk", flat=True):
+        url = reverse("lesson-detail", args=[pk, lesson_id])
+        try:
+            response = lesson_view(
+                anonymous_request(url), course_id=pk, lesson_id=lesson_id
+            )
+        except Http404:
+            # Deleted since it was listed
+            continue
+        pages[url] = response.render().content
+    return pages
+
+
+def export_courses(root, pks):
+    """
+    Render courses into `root`; returns {pk: [files]}, no files for a course
+    deleted meanwhile. Runs in the worker processes.
+    """
+    exported = {}
+    for pk in pks:
+        files = []
+        try:
+            pages = render_course(pk)
+        except Http404:
+            pages = {}
+        for url, html in pages.items():
+            path = output_path(root, url)
+            write(path, html)
+            files.append(os.path.relpath(path, root))
+        exported[pk] = files
+    return exported
+
+
+def render_catalog():
+    """{url: html} of every catalog page."""
+    # From the database as it is now, not this process's snapshot
+    facets.index.rebuild()
+    catalog.rebuild()
+    view = StaticCourseListView.as_view()
+    pages, number, num_pages = {}, 1, 1
+    while number <= num_pages:
+        url = catalog_url(number)
+        response = async_to_sync(view)(anonymous_request(url), page=number)
+        num_pages = response.context_data["paginator"].num_pages
+        pages[url] = response.render().content
+        number += 1
+    return pages
+
+
+def sitemaps(base_url):
+    """{filename: xml}: sitemap.xml, an index of numbered files if needed."""
+    base_url = base_url.rstrip("/")
+    entries = [(reverse("course-list"), None)]
+    published = Course.objects.filter(status="pub").order_by("pk")
+    for pk, updated_at in published.values_list("pk", "updated_at").iterator():
+        entries.append((reverse("course-detail", args=[pk]), updated_at))
+    lessons = Lesson.objects.filter(course__status="pub").order_by("course_id", "pk")
+    for course_id, pk, updated_at in lessons.values_list(
+        "course_id", "pk", "updated_at"
+    ).iterator():
+        entries.append((reverse("lesson-detail", args=[course_id, pk]), updated_at))
+
+    def urlset(entries):
+        lines = ['<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for url, updated_at in entries:
+            lastmod = (
+                f"<lastmod>{updated_at.date().isoformat()}</lastmod>"
+                if updated_at
+                else ""
+            )
+            lines.append(f"<url><loc>{escape(base_url + url)}</loc>{lastmod}</url>")
+        lines.append("</urlset>")
+        return document(lines)
+
+    if len(entries) <= SITEMAP_URLS:
+        return {"sitemap.xml": urlset(entries)}
+    files = {}
+    index = ['<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for start in range(0, len(entries), SITEMAP_URLS):
+        name = f"sitemap-{start // SITEMAP_URLS + 1}.xml"
+        files[name] = urlset(entries[start : start + SITEMAP_URLS])
+        index.append(f"<sitemap><loc>{escape(f'{base_url}/{name}')}</loc></sitemap>")
+    index.append("</sitemapindex>")
+    files["sitemap.xml"] = document(index)
+    return files
+
+
+def document(lines):
+    return "\n".join(['<?xml version="1.0" encoding="UTF-8"?>', *lines]).encode()
+
+
+def load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"courses": {}, "catalog": [], "sitemaps": []}
+
+
+def save_manifest(root, manifest):
+    write(os.path.join(root, MANIFEST), json.dumps(manifest).encode())
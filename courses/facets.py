@@ -0,0 +1,183 @@
+"""
+Per-process facet index over the published catalog.
+
+Every tag maps to a bitset (a Python int, bit n set for course id n) of the
+published courses carrying it, next to one bitset of all published courses.
+Multi-tag filters are AND/OR of those ints and facet counts are popcounts of
+their intersection with the current result set, so the database is only
+asked for the rows of the page being shown.
+
+The index follows Course.updated_at (which tag changes also bump) every
+FACET_INDEX_REFRESH_SECONDS and is rebuilt from scratch every
+FACET_INDEX_REBUILD_SECONDS, which also drops deleted courses and renamed
+tags. Deleted courses noticed earlier, when a page comes back short, are
+discarded right away.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from courses.models import Course
+
+# Re-read changes this far back, for transactions that committed after the
+# previous refresh with an earlier updated_at
+OVERLAP = timedelta(seconds=5)
+# Refreshes read the primary, whose clock synced_at comes from, see
+# courses.snapshot.DATABASE
+DATABASE = "default"
+
+
+def from_ids(ids):
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return 0
+    flags = np.zeros(int(ids.max()) + 1, dtype=bool)
+    flags[ids] = True
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+
+def members(bits):
+    """Ids in the bitset, ascending."""
+    if not bits:
+        return np.empty(0, dtype=np.int64)
+    raw = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, "little"), np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+
+class FacetIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.published = 0
+        self.tags = defaultdict(int)
+        self.course_tags = {}
+        self.synced_at = None
+        self.checked_at = 0.0
+        self.built_at = 0.0
+
+    def stale(self):
+        return (
+            time.monotonic() - self.checked_at >= settings.FACET_INDEX_REFRESH_SECONDS
+        )
+
+    def refresh(self):
+        if not self.stale():
+            return
+        now = time.monotonic()
+        with self.lock:
+            if not self.stale():
+                return
+            if (
+                self.synced_at is None
+                or now - self.built_at >= settings.FACET_INDEX_REBUILD_SECONDS
+            ):
+                self._rebuild()
+            else:
+                self._update()
+            self.checked_at = time.monotonic()
+
+    async def arefresh(self):
+        """refresh() for async code; only a due refresh leaves the event loop."""
+        if self.stale():
+            await sync_to_async(self.refresh)()
+
+    def rebuild(self):
+        with self.lock:
+            self._rebuild()
+            self.checked_at = time.monotonic()
+
+    def _rebuild(self):
+        synced_at = timezone.now()
+        published = Course.objects.using(DATABASE).filter(status="pub")
+        rows = (
+            Course.tags.through.objects.using(DATABASE)
+            .filter(course__status="pub")
+            .values_list("tag__name", "course_id")
+        )
+        by_tag = defaultdict(list)
+        course_tags = defaultdict(list)
+        for name, course_id in rows:
+            by_tag[name].append(course_id)
+            course_tags[course_id].append(name)
+        self.published = from_ids(list(published.values_list("pk", flat=True)))
+        self.tags = defaultdict(
+            int, {name: from_ids(ids) for name, ids in by_tag.items()}
+        )
+        self.course_tags = {pk: tuple(names) for pk, names in course_tags.items()}
+        self.synced_at = synced_at
+        self.built_at = time.monotonic()
+
+    def _update(self):
+        synced_at = timezone.now()
+        changed = dict(
+            Course.objects.using(DATABASE)
+            .filter(updated_at__gte=self.synced_at - OVERLAP)
+            .values_list("pk", "status")
+        )
+        if changed:
+            names = defaultdict(list)
+            for course_id, name in (
+                Course.tags.through.objects.using(DATABASE)
+                .filter(course_id__in=list(changed))
+                .values_list("course_id", "tag__name")
+            ):
+                names[course_id].append(name)
+            for course_id, status in changed.items():
+                self._remove(course_id)
+                if status == "pub":
+                    self._add(course_id, names[course_id])
+        self.synced_at = synced_at
+
+    def _add(self, course_id, names):
+        bit = 1 << course_id
+        self.published |= bit
+        for name in names:
+            self.tags[name] |= bit
+        if names:
+            self.course_tags[course_id] = tuple(names)
+
+    def _remove(self, course_id):
+        mask = ~(1 << course_id)
+        self.published &= mask
+        for name in self.course_tags.pop(course_id, ()):
+            self.tags[name] &= mask
+            if not self.tags[name]:
+                del self.tags[name]
+
+    def discard(self, course_ids):
+        with self.lock:
+            for course_id in course_ids:
+                self._remove(course_id)
+
+    def select(self, names, match_all=True):
+        """Bitset of published courses with all (or any) of the tags."""
+        if not names:
+            return self.published
+        sets = [self.tags.get(name, 0) for name in names]
+        result = sets[0]
+        for bits in sets[1:]:
+            result = result & bits if match_all else result | bits
+        return result & self.published
+
+    def counts(self, bits):
+        """{tag name: courses in `bits` with that tag}, for tags present."""
+        counts = {
+            name: (bits & tag_bits).bit_count() for name, tag_bits in self.tags.items()
+        }
+        return {name: n for name, n in counts.items() if n}
+
+
+index = FacetIndex()
+
+
+@receiver(post_delete, sender=Course)
+def discard_deleted_course(sender, instance, **kwargs):
+    index.discard([instance.pk])
@@ -0,0 +1,71 @@
+import base64
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+# Compressed values are stored as MARKER + base64(zlib(utf-8 text)), so they
+# still fit a plain text column. The "z1" names the codec, leaving room for
+# other formats later. Plain text that happens to start with the marker is
+# always stored framed, which keeps decoding unambiguous.
+MARKER = "\x1bz1:"
+
+
+def compress_text(value, threshold):
+    """Frame `value` if it is at least `threshold` bytes and compresses well."""
+    if value.startswith(MARKER):
+        threshold = 0
+    elif not threshold:
+        return value
+    raw = value.encode("utf-8")
+    if len(raw) < threshold:
+        return value
+    framed = MARKER + base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+    if len(framed) >= len(raw) and not value.startswith(MARKER):
+        return value
+    return framed
+
+
+def decompress_text(value):
+    if value is None or not value.startswith(MARKER):
+        return value
+    return zlib.decompress(base64.b64decode(value[len(MARKER) :])).decode("utf-8")
+
+
+class CompressedTextField(models.TextField):
+    """
+    TextField that transparently compresses large values when they are saved.
+
+    Compression is controlled by the `threshold_setting` setting (in bytes,
+    0 disables it). Reads always decode, so rows written under either mode can
+    coexist and be converted in place with `manage.py compress_lessons`.
+    Lookups compare against the stored text, so searching a compressed column
+    only matches rows that were left plain.
+    """
+
+    def __init__(self, *args, threshold_setting=None, **kwargs):
+        self.threshold_setting = threshold_setting
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.threshold_setting:
+            kwargs["threshold_setting"] = self.threshold_setting
+        return name, path, args, kwargs
+
+    @property
+    def threshold(self):
+        return (
+            getattr(settings, self.threshold_setting, 0)
+            if self.threshold_setting
+            else 0
+        )
+
+    def from_db_value(self, value, expression, connection):
+        return decompress_text(value)
+
+    def get_db_prep_save(self, value, connection):
+        value = super().get_db_prep_save(value, connection)
+        if isinstance(value, str):
+            value = compress_text(value, self.threshold)
+        return value
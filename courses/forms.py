@@ -1,5 +1,6 @@
 from django import forms
-from .models import Course, Lesson, Tag
+from . import tags
+from .models import Course, Lesson
 from users.models import User
 
 
@@ -18,7 +19,7 @@ class CourseForm(forms.ModelForm):
         if self.instance.pk:
             # Prepopulate tags_input with existing tags
             self.fields["tags_input"].initial = ", ".join(
-                tag.name for tag in self.instance.tags.all()
+                self.instance.tags.values_list("name", flat=True)
             )
 
     def save(self, commit=True):
@@ -26,10 +27,7 @@ class CourseForm(forms.ModelForm):
         if commit:
             instance.save()
         # Update tags
-        tags_list = [
-            t.strip() for t in self.cleaned_data["tags_input"].split(",") if t.strip()
-        ]
-        instance.tags.set([Tag.objects.get_or_create(name=t)[0] for t in tags_list])
+        instance.tags.set(tags.resolve(tags.parse(self.cleaned_data["tags_input"])))
         return instance
 
 
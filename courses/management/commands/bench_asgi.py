@@ -0,0 +1,161 @@
+import asyncio
+import multiprocessing
+import random
+import socket
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Q
+from django.http import JsonResponse
+from django.test import override_settings
+from django.urls import include, path
+from django.views.decorators.http import require_GET
+
+from users.models import User
+
+
+@require_GET
+def sync_user_autocomplete(request):
+    # courses.views.user_autocomplete as it was before it went async
+    query = request.GET.get("q", "").strip()
+    results = []
+    if query:
+        qs = User.objects.filter(
+            Q(username__icontains=query) | Q(id__iexact=query)
+        ).exclude(pk=request.user.pk)[:10]
+        results = [
+            {
+                "id": u.id,
+                "display_name": u.display_name,
+                "username": u.username,
+                "profile_picture": u.profile_picture or "/static/default_avatar.png",
+            }
+            for u in qs
+        ]
+    return JsonResponse(results, safe=False)
+
+
+# The server runs the project's URLs plus the sync twin
+urlpatterns = [
+    path("bench/sync-autocomplete/", sync_user_autocomplete),
+    path("", include("LibreCourse.urls")),
+]
+
+ENDPOINTS = {
+    "sync": "/bench/sync-autocomplete/?q={q}",
+    "async": "/courses/collaborators/autocomplete/?q={q}",
+}
+
+
+def serve(port):
+    import uvicorn
+    from django.core.asgi import get_asgi_application
+
+    # As served by LibreCourse.asgi, see DATABASE_CONN_MAX_AGE
+    for connection in connections.all():
+        connection.settings_dict["CONN_MAX_AGE"] = 0
+    with override_settings(ROOT_URLCONF=__name__):
+        uvicorn.run(
+            get_asgi_application(),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+            lifespan="off",
+        )
+
+
+async def client(port, url, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = f"GET {url} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def load(port, url, concurrency, seconds):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(
+        *(client(port, url, deadline, latencies, errors) for _ in range(concurrency))
+    )
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the collaborator autocomplete under uvicorn, as a sync view "
+        "run on ASGI's thread adapter and as the native async view."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument("--seconds", type=float, default=10.0)
+        parser.add_argument("--users", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError("The load test needs uvicorn: pip install uvicorn")
+
+        run = random.randrange(10**6)
+        prefix = f"bench{run}"
+        User.objects.bulk_create(
+            User(email=f"{prefix}-{i}@example.com", username=f"{prefix}-{i}")
+            for i in range(options["users"])
+        )
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        # The server process mustn't share our database connection
+        connections.close_all()
+        server = multiprocessing.get_context("fork").Process(
+            target=serve, args=(port,), daemon=True
+        )
+        server.start()
+        try:
+            self.wait_for(port)
+            self.stdout.write(
+                f"{options['concurrency']} connections, {options['seconds']:g} s each"
+            )
+            for mode, url in ENDPOINTS.items():
+                url = url.format(q=f"{prefix}-1")
+                asyncio.run(load(port, url, options["concurrency"], 1.0))  # warm up
+                latencies, errors = asyncio.run(
+                    load(port, url, options["concurrency"], options["seconds"])
+                )
+                latencies.sort()
+                self.stdout.write(
+                    f"{mode:<6} {len(latencies) / options['seconds']:9,.0f} req/s   "
+                    f"p50 {latencies[len(latencies) // 2] * 1000:7.1f} ms   "
+                    f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.1f} ms   "
+                    f"errors {len(errors)}"
+                )
+        finally:
+            server.terminate()
+            server.join()
+            User.objects.filter(username__startswith=f"{prefix}-").delete()
+
+    def wait_for(self, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError("uvicorn didn't start")
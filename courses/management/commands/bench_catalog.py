@@ -0,0 +1,127 @@
+import random
+import time
+import tracemalloc
+
+from asgiref.sync import async_to_sync
+from django.core.paginator import Paginator
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+
+from courses import facets
+from courses.models import Course, Tag
+from courses.snapshot import Snapshot, catalog, description_excerpt
+from courses.views import CourseListView
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Load synthetic published courses and report the catalog snapshot's "
+        "memory and page latency against the ORM path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=100_000)
+        parser.add_argument("--tags", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=200)
+
+    def load(self, count, tag_count):
+        run = random.randrange(10**6)
+        creator = User.objects.order_by("pk").first()
+        tags = Tag.objects.bulk_create(
+            Tag(name=f"bench-{run}-{i}") for i in range(tag_count)
+        )
+        through = Course.tags.through
+        for start in range(0, count, 2000):
+            courses = Course.objects.bulk_create(
+                Course(
+                    title=f"Bench course {i}",
+                    description=f"Synthetic course {i}. " * 20,
+                    creator=creator,
+                    status="pub",
+                )
+                for i in range(start, min(start + 2000, count))
+            )
+            through.objects.bulk_create(
+                through(course_id=course.pk, tag_id=tag.pk)
+                for course in courses
+                for tag in random.sample(tags, 3)
+            )
+        return [tag.pk for tag in tags]
+
+    def cleanup(self, tag_ids):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {quote(Course.tags.through._meta.db_table)} "
+                f"WHERE course_id IN (SELECT id FROM {quote(Course._meta.db_table)} "
+                f"WHERE title LIKE %s)",
+                ["Bench course %"],
+            )
+            cursor.execute(
+                f"DELETE FROM {quote(Course._meta.db_table)} WHERE title LIKE %s",
+                ["Bench course %"],
+            )
+        Tag.objects.filter(pk__in=tag_ids).delete()
+
+    def orm_page(self, page, sort):
+        queryset = (
+            Course.objects.filter(status="pub")
+            .select_related("creator")
+            .prefetch_related("tags")
+            .only("title", "created_at", "creator", "creator__username")
+            .annotate(description_excerpt=description_excerpt())
+            .order_by(sort)
+        )
+        return list(Paginator(queryset, 10).page(page).object_list)
+
+    def time_per_request(self, fn, requests):
+        start = time.perf_counter()
+        for _ in range(requests):
+            fn()
+        return (time.perf_counter() - start) / requests * 1000
+
+    def handle(self, *args, **options):
+        count = options["courses"]
+        tag_ids = self.load(count, options["tags"])
+        try:
+            self.stdout.write(f"Loaded {count} published courses")
+
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            snapshot = Snapshot.load()
+            held = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+            per_100k = held / max(len(snapshot), 1) * 100_000
+            self.stdout.write(
+                f"Snapshot: {len(snapshot)} courses, {held / 2**20:.1f} MB "
+                f"({per_100k / 2**20:.1f} MB per 100k, columns "
+                f"{snapshot.nbytes() / 2**20:.1f} MB)"
+            )
+
+            catalog.rebuild()
+            facets.index.rebuild()
+            factory = RequestFactory()
+            view = async_to_sync(CourseListView.as_view())
+            pages = max(1, len(snapshot) // 10)
+            sorts = {"newest": "-created_at", "oldest": "created_at", "title": "title"}
+
+            def snapshot_request():
+                sort = random.choice(list(sorts))
+                page = random.randint(1, pages)
+                view(factory.get("/courses/", {"page": page, "sort": sort}))
+
+            def orm_request():
+                sort = random.choice(list(sorts.values()))
+                self.orm_page(random.randint(1, pages), sort)
+
+            requests = options["requests"]
+            self.stdout.write(
+                f"Snapshot page: {self.time_per_request(snapshot_request, requests):8.2f} ms"
+            )
+            self.stdout.write(
+                f"ORM page:      {self.time_per_request(orm_request, requests):8.2f} ms"
+            )
+        finally:
+            self.cleanup(tag_ids)
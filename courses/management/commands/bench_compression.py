@@ -0,0 +1,94 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from LibreCourse import compression
+from courses.models import Course, Lesson
+from users.models import User
+
+SIZES = (1024, 4096, 16384, 65536)
+# Chunk size of the streamed variant
+CHUNK = 4096
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure bytes on the wire and CPU time of gzip and Brotli on real "
+        "course page HTML and API JSON, at several response sizes, whole and "
+        "streamed in flushed chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lessons", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if compression.brotli is None:
+            raise CommandError("The benchmark needs Brotli: pip install Brotli")
+
+        prefix = f"bench{random.randrange(10**6)}"
+        user = User.objects.create_user(f"{prefix}@example.com", prefix, None)
+        course = Course.objects.create(
+            title=f"{prefix} course", description="", creator=user, status="pub"
+        )
+        lessons = [
+            Lesson(
+                title=f"Lesson {i}: {random.choice(['Intro', 'Setup', 'Basics'])}",
+                content="Some **text** with `code`.\n" * 20,
+                course=course,
+                position=i,
+            )
+            for i in range(options["lessons"])
+        ]
+        for lesson in lessons:
+            lesson.render()
+        Lesson.objects.bulk_create(lessons)
+        try:
+            client = Client(HTTP_ACCEPT_ENCODING="identity")
+            payloads = {
+                "html": client.get(reverse("course-detail", args=[course.pk])).content,
+                "json": client.get(
+                    reverse("api-lessons", args=[course.pk]),
+                    {"limit": 200, "fields": "id,title,position,content_html"},
+                ).content,
+            }
+        finally:
+            course.delete()
+            user.delete()
+
+        self.stdout.write(
+            f"{'body':<5} {'size':>7} {'enc':<5} {'wire':>8} {'ratio':>6} "
+            f"{'whole µs':>9} {'stream µs':>10} {'stream wire':>12}"
+        )
+        for kind, payload in payloads.items():
+            # Prefixes of the real body, repetition would flatter the ratios
+            for size in [size for size in SIZES if size < len(payload)] + [
+                len(payload)
+            ]:
+                body = payload[:size]
+                chunks = [body[i : i + CHUNK] for i in range(0, len(body), CHUNK)]
+                for encoding in ("gzip", "br"):
+                    whole, whole_time = self.time(
+                        lambda: compression.compress(body, encoding), options["repeat"]
+                    )
+                    streamed, stream_time = self.time(
+                        lambda: b"".join(compression.stream(chunks, encoding)),
+                        options["repeat"],
+                    )
+                    self.stdout.write(
+                        f"{kind:<5} {size:>7} {encoding:<5} {len(whole):>8} "
+                        f"{size / len(whole):>5.1f}x {whole_time * 1e6:>9.0f} "
+                        f"{stream_time * 1e6:>10.0f} {len(streamed):>12}"
+                    )
+
+    def time(self, compress, repeat):
+        """The output of `compress()` and its best time of `repeat` runs."""
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = compress()
+            best = min(best, time.perf_counter() - start)
+        return output, best
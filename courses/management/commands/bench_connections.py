@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare a short catalog request opening a new database connection "
+        "each time with one reusing a persistent connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--database", default="default")
+
+    def run(self, alias, requests, conn_max_age):
+        connection = connections[alias]
+        settings_dict = connection.settings_dict
+        saved = settings_dict["CONN_MAX_AGE"]
+        settings_dict["CONN_MAX_AGE"] = conn_max_age
+        try:
+            connection.close()
+            timings = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                # What Django does around every request
+                close_old_connections()
+                list(
+                    Course.objects.using(alias)
+                    .filter(status="pub")
+                    .values_list("pk", "title")[:10]
+                )
+                close_old_connections()
+                timings.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+            settings_dict["CONN_MAX_AGE"] = saved
+        timings.sort()
+        return (
+            sum(timings) / len(timings) * 1000,
+            timings[len(timings) // 2] * 1000,
+            timings[int(len(timings) * 0.99)] * 1000,
+        )
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        settings_dict = connections[alias].settings_dict
+        self.stdout.write(
+            f"{connections[alias].vendor} at {settings_dict.get('HOST') or settings_dict['NAME']}"
+        )
+        modes = [
+            ("connect per request", 0),
+            ("persistent", max(settings_dict["CONN_MAX_AGE"] or 0, 600)),
+        ]
+        for label, conn_max_age in modes:
+            mean, p50, p99 = self.run(alias, options["requests"], conn_max_age)
+            self.stdout.write(
+                f"{label:<20} mean {mean:7.2f} ms   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms"
+            )
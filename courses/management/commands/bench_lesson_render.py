@@ -0,0 +1,75 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.models import Course, Lesson
+from courses.rendering import render_content
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do".split()
+
+
+def synthetic_lesson(size):
+    """Markdown-ish text of roughly `size` bytes."""
+    blocks = []
+    length = 0
+    while length < size:
+        kind = random.random()
+        if kind < 0.1:
+            block = "## " + " ".join(random.choices(WORDS, k=4))
+        elif kind < 0.3:
+            block = "\n".join(
+                "- " + " ".join(random.choices(WORDS, k=6)) for _ in range(5)
+            )
+        elif kind < 0.4:
+            block = "```\n" + "\n".join(random.choices(WORDS, k=10)) + "\n```"
+        else:
+            block = " ".join(random.choices(WORDS, k=80)) + " **bold** `code`"
+        blocks.append(block)
+        length += len(block) + 2
+    return "\n\n".join(blocks)
+
+
+class Command(BaseCommand):
+    help = "Compare render-on-read with render-on-write for large lessons."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size-kb", type=int, default=50)
+        parser.add_argument("--reads", type=int, default=200)
+
+    def handle(self, *args, **options):
+        content = synthetic_lesson(options["size_kb"] * 1024)
+        reads = options["reads"]
+
+        # Everything is rolled back at the end
+        with transaction.atomic():
+            course = Course.objects.create(
+                title="bench-render", description="", status="dra"
+            )
+            start = time.perf_counter()
+            lesson = Lesson.objects.create(
+                title="bench", content=content, course=course, position=1
+            )
+            write = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(reads):
+                text = Lesson.objects.values_list("content", flat=True).get(
+                    pk=lesson.pk
+                )
+                render_content(text)
+            on_read = (time.perf_counter() - start) / reads
+
+            start = time.perf_counter()
+            for _ in range(reads):
+                Lesson.objects.values_list("content_html", flat=True).get(pk=lesson.pk)
+            on_write = (time.perf_counter() - start) / reads
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Lesson size:         {len(content) / 1024:.1f} KB")
+        self.stdout.write(f"Save (with render):  {write * 1000:.2f} ms")
+        self.stdout.write(f"Render on read:      {on_read * 1000:.3f} ms/read")
+        self.stdout.write(f"Render on write:     {on_write * 1000:.3f} ms/read")
+        self.stdout.write(f"Speedup per read:    {on_read / on_write:.1f}x")
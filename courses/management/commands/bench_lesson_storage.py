@@ -0,0 +1,90 @@
+import random
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.test.utils import override_settings
+
+from courses.management.commands.bench_lesson_render import synthetic_lesson
+from courses.models import Course, Lesson
+
+
+def table_size(table):
+    """Bytes used by `table` (and its TOAST/indexes on PostgreSQL)."""
+    with connection.cursor() as cursor:
+        try:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT pg_total_relation_size(%s)", [table])
+            else:
+                cursor.execute(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [table]
+                )
+        except DatabaseError:
+            return None
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a synthetic lesson corpus and report table size and read "
+        "latency with plain and compressed content."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size-mb", type=int, default=1024)
+        parser.add_argument("--lesson-kb", type=int, default=50)
+        parser.add_argument("--threshold", type=int, default=4096)
+        parser.add_argument("--reads", type=int, default=500)
+
+    def read_latency(self, pks, reads):
+        start = time.perf_counter()
+        for pk in random.choices(pks, k=reads):
+            Lesson.objects.values_list("content", flat=True).get(pk=pk)
+        return (time.perf_counter() - start) / reads
+
+    def report(self, label, pks, reads):
+        size = table_size(Lesson._meta.db_table)
+        latency = self.read_latency(pks, reads)
+        size = f"{size / 2**20:,.1f} MB" if size is not None else "n/a"
+        self.stdout.write(
+            f"{label:<12} table {size:>12}   read {latency * 1000:.3f} ms"
+        )
+
+    def handle(self, *args, **options):
+        lesson_bytes = options["lesson_kb"] * 1024
+        count = max(1, options["size_mb"] * 2**20 // lesson_bytes)
+        # A pool of distinct bodies; rows differ by a suffix so each one still
+        # has to be compressed on its own.
+        pool = [synthetic_lesson(lesson_bytes) for _ in range(20)]
+
+        course = Course.objects.create(
+            title=f"bench-storage-{random.randrange(10**6)}", status="dra"
+        )
+        try:
+            with override_settings(LESSON_CONTENT_COMPRESS_THRESHOLD=0):
+                for start in range(0, count, 200):
+                    Lesson.objects.bulk_create(
+                        Lesson(
+                            title=f"bench {i}",
+                            content=f"{pool[i % len(pool)]}\n\n{i}",
+                            course=course,
+                            position=i,
+                        )
+                        for i in range(start, min(start + 200, count))
+                    )
+            pks = list(course.lesson_set.values_list("pk", flat=True))
+            self.stdout.write(f"Loaded {count} lessons of {options['lesson_kb']} KB")
+
+            self.report("plain", pks, options["reads"])
+            call_command("compress_lessons", threshold=options["threshold"])
+            self.report("compressed", pks, options["reads"])
+        finally:
+            # Skip the per-lesson signals of a cascading delete
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {connection.ops.quote_name(Lesson._meta.db_table)} "
+                    f"WHERE course_id = %s",
+                    [course.pk],
+                )
+            course.delete()
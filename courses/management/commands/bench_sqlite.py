@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+ROWS = 10_000
+# Connection alias of the benchmark database, in each process
+ALIAS = "bench_sqlite"
+
+PROFILES = {
+    # Django's SQLite backend with its defaults
+    "default": {"ENGINE": "django.db.backends.sqlite3", "OPTIONS": {"timeout": 5}},
+    # The project's backend, as configured by settings.sqlite_database()
+    "tuned": {
+        "ENGINE": "LibreCourse.sqlite_backend",
+        "OPTIONS": {
+            "transaction_mode": "IMMEDIATE",
+            "timeout": settings.SQLITE_PRAGMAS["busy_timeout"] / 1000,
+        },
+    },
+}
+
+
+def connect(path, profile):
+    """A Django connection to the benchmark database at `path`."""
+    config = {**PROFILES[profile], "NAME": path}
+    connections.settings[ALIAS] = connections.configure_settings(
+        {DEFAULT_DB_ALIAS: config}
+    )[DEFAULT_DB_ALIAS]
+    return connections[ALIAS]
+
+
+def disconnect():
+    connections[ALIAS].close()
+    del connections[ALIAS]
+
+
+def worker(path, profile, seconds, write_ratio, seed):
+    """Mixed reads and read-modify-write transactions; returns counters."""
+    connection = connect(path, profile)
+    rng = random.Random(seed)
+    reads = writes = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pk = rng.randrange(1, ROWS + 1)
+        try:
+            if rng.random() < write_ratio:
+                with transaction.atomic(using=ALIAS), connection.cursor() as cursor:
+                    cursor.execute("SELECT title FROM course WHERE id = %s", [pk])
+                    (title,) = cursor.fetchone()
+                    cursor.execute(
+                        "UPDATE course SET title = %s, updated_at = %s WHERE id = %s",
+                        [title[:20] + str(rng.random())[:8], time.time(), pk],
+                    )
+                writes += 1
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id, title FROM course WHERE id >= %s "
+                        "ORDER BY id LIMIT 10",
+                        [pk],
+                    )
+                    cursor.fetchall()
+                reads += 1
+        except OperationalError:
+            # "database is locked"
+            errors += 1
+    disconnect()
+    return reads, writes, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare SQLite read/write throughput of Django's SQLite backend and "
+        "the project's tuned one, with several worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+
+    def setup(self, path, profile):
+        # The tuned backend sets the (persistent) WAL journal mode on connect
+        connection = connect(path, profile)
+        with transaction.atomic(using=ALIAS), connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE course (id integer PRIMARY KEY, title text, "
+                "updated_at real, body text)"
+            )
+            cursor.executemany(
+                "INSERT INTO course VALUES (%s, %s, %s, %s)",
+                [
+                    (i, f"Course {i}", time.time(), "x" * 400)
+                    for i in range(1, ROWS + 1)
+                ],
+            )
+        # Workers open their own connections
+        disconnect()
+
+    def handle(self, *args, **options):
+        workers, seconds = options["workers"], options["seconds"]
+        self.stdout.write(f"{workers} processes, {seconds:g} s each")
+        for profile in PROFILES:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "bench.sqlite3")
+                self.setup(path, profile)
+                with multiprocessing.Pool(workers) as pool:
+                    results = pool.starmap(
+                        worker,
+                        [
+                            (path, profile, seconds, options["write_ratio"], seed)
+                            for seed in range(workers)
+                        ],
+                    )
+            reads, writes, errors = (sum(column) for column in zip(*results))
+            self.stdout.write(
+                f"{profile:<8} reads {reads / seconds:10,.0f}/s   "
+                f"writes {writes / seconds:8,.0f}/s   locked errors {errors}"
+            )
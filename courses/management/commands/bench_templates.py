@@ -0,0 +1,102 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import RequestContext, engines
+from django.template.engine import Engine
+from django.test import RequestFactory
+from django.urls import reverse
+
+from courses.snapshot import CatalogEntry
+
+TEMPLATE = "courses/course_list.html"
+
+
+class Command(BaseCommand):
+    help = (
+        "Render a catalog page of many courses with the Django engine, "
+        "reparsing and cached, and with Jinja2."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=100)
+        parser.add_argument("--renders", type=int, default=300)
+
+    def handle(self, *args, **options):
+        try:
+            from django.template.backends.jinja2 import Jinja2
+
+            params = {**settings.JINJA2_ENGINE, "NAME": "jinja2", "APP_DIRS": False}
+            del params["BACKEND"]
+            jinja2 = Jinja2(params)
+        except ImportError:
+            raise CommandError("The benchmark needs Jinja2: pip install Jinja2")
+
+        request = RequestFactory().get(reverse("course-list"))
+        request.user = AnonymousUser()
+        context = self.context(options["courses"])
+
+        django = engines["django"]
+        # The Django engine without the cached loader: parsed on every render
+        uncached = Engine(
+            dirs=django.engine.dirs,
+            context_processors=settings.TEMPLATE_CONTEXT_PROCESSORS,
+            libraries=django.engine.libraries,
+            loaders=[
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ],
+        )
+        renderers = {
+            "django, reparsed": lambda: uncached.get_template(TEMPLATE).render(
+                RequestContext(request, context)
+            ),
+            "django, cached": lambda: django.get_template(TEMPLATE).render(
+                context, request
+            ),
+            "jinja2": lambda: jinja2.get_template(TEMPLATE).render(context, request),
+        }
+
+        self.stdout.write(
+            f"{TEMPLATE}, {options['courses']} courses, "
+            f"best of {options['renders']} renders"
+        )
+        baseline = None
+        for name, render in renderers.items():
+            size = len(render())  # warm up
+            best = float("inf")
+            for _ in range(options["renders"]):
+                start = time.perf_counter()
+                render()
+                best = min(best, time.perf_counter() - start)
+            baseline = baseline or best
+            self.stdout.write(
+                f"{name:<17} {best * 1000:7.2f} ms  {baseline / best:5.1f}x  "
+                f"{size:,} chars"
+            )
+
+    def context(self, count):
+        courses = [
+            CatalogEntry(
+                pk,
+                f"Course {pk}: an introduction",
+                "A short description of what the course covers & why. " * 2,
+                f"author{pk % 17}",
+                ["python", "web", "data"][: pk % 4],
+                1.7e9 + pk,
+            )
+            for pk in range(1, count + 1)
+        ]
+        facets = [
+            {"name": f"tag{i}", "count": 100 - i, "selected": i == 3} for i in range(30)
+        ]
+        return {
+            "courses": courses,
+            "facets": facets,
+            "current_q": "",
+            "match_any": False,
+            "sort": "newest",
+            "is_paginated": False,
+            "page_obj": None,
+        }
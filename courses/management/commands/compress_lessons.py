@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from courses.fields import compress_text, decompress_text
+from courses.models import Lesson
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite stored lesson content to match the compression threshold, "
+        "in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threshold",
+            type=int,
+            default=None,
+            help="Bytes above which content is compressed "
+            "(default: LESSON_CONTENT_COMPRESS_THRESHOLD).",
+        )
+        parser.add_argument(
+            "--decompress",
+            action="store_true",
+            help="Store every lesson as plain text again.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        field = Lesson._meta.get_field("content")
+        threshold = options["threshold"]
+        if threshold is None:
+            threshold = field.threshold
+        if options["decompress"]:
+            threshold = 0
+
+        qn = connection.ops.quote_name
+        table, pk, column = (
+            qn(Lesson._meta.db_table),
+            qn(Lesson._meta.pk.column),
+            qn(field.column),
+        )
+        select = (
+            f"SELECT {pk}, {column} FROM {table} WHERE {pk} > %s "
+            f"ORDER BY {pk} LIMIT %s"
+        )
+        update = f"UPDATE {table} SET {column} = %s WHERE {pk} = %s"
+
+        # Work on the stored representation directly so rows that are already
+        # in the right form are neither decoded nor rewritten.
+        last_pk, seen, rewritten = 0, 0, 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(select, [last_pk, options["batch_size"]])
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                changes = []
+                for row_pk, stored in rows:
+                    new = compress_text(decompress_text(stored), threshold)
+                    if new != stored:
+                        changes.append((new, row_pk))
+                cursor.executemany(update, changes)
+            last_pk = rows[-1][0]
+            seen += len(rows)
+            rewritten += len(changes)
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{seen} lessons scanned, {rewritten} rewritten")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scanned {seen} lessons, rewrote {rewritten} "
+                f"(threshold {threshold or 'off'})."
+            )
+        )
@@ -0,0 +1,114 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from courses import export
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the published courses, their lessons and the catalog to static "
+        "HTML, re-rendering only courses changed since the last export."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.STATIC_EXPORT_ROOT,
+            help="Directory to export into.",
+        )
+        parser.add_argument(
+            "--base-url",
+            default=settings.STATIC_EXPORT_BASE_URL,
+            help="Site URL for the sitemap, e.g. https://example.com.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-render every course, not only changed ones.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of rendering processes.",
+        )
+        parser.add_argument("--batch-size", type=int, default=20)
+
+    def handle(self, *args, **options):
+        root = str(options["output"])
+        os.makedirs(root, exist_ok=True)
+        manifest = export.load_manifest(root)
+        exported = manifest["courses"]
+
+        published = {
+            str(pk): updated_at.isoformat()
+            for pk, updated_at in Course.objects.filter(status="pub").values_list(
+                "pk", "updated_at"
+            )
+        }
+        for pk in set(exported) - set(published):
+            export.remove(root, exported.pop(pk)["files"])
+        stale = [
+            int(pk)
+            for pk, updated_at in published.items()
+            if options["all"] or exported.get(pk, {}).get("updated_at") != updated_at
+        ]
+
+        batch_size = options["batch_size"]
+        batches = [stale[i : i + batch_size] for i in range(0, len(stale), batch_size)]
+        pages = 0
+        if options["workers"] > 1:
+            # Workers open their own connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=options["workers"])
+            run = pool.map
+        else:
+            pool, run = nullcontext(), map
+        with pool:
+            for results in run(export.export_courses, [root] * len(batches), batches):
+                for pk, files in results.items():
+                    previous = exported.pop(str(pk), {"files": []})["files"]
+                    export.remove(root, set(previous) - set(files))
+                    if files:
+                        exported[str(pk)] = {
+                            "updated_at": published[str(pk)],
+                            "files": files,
+                        }
+                    pages += len(files)
+                # Progress survives an interrupted export
+                export.save_manifest(root, manifest)
+
+        # Any course change can show on any catalog page, so all are rendered
+        catalog = []
+        for url, html in export.render_catalog().items():
+            path = export.output_path(root, url)
+            export.write(path, html)
+            catalog.append(os.path.relpath(path, root))
+        export.remove(root, set(manifest["catalog"]) - set(catalog))
+        manifest["catalog"] = catalog
+
+        if options["base_url"]:
+            sitemaps = export.sitemaps(options["base_url"])
+            for name, xml in sitemaps.items():
+                export.write(os.path.join(root, name), xml)
+            export.remove(root, set(manifest["sitemaps"]) - set(sitemaps))
+            manifest["sitemaps"] = list(sitemaps)
+        else:
+            self.stderr.write(
+                "No sitemap: set STATIC_EXPORT_BASE_URL or pass --base-url."
+            )
+        export.save_manifest(root, manifest)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {pages} course and lesson pages of {len(stale)} changed "
+                f"courses ({len(published) - len(stale)} unchanged) and "
+                f"{len(catalog)} catalog pages to {root}."
+            )
+        )
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Client slots on top of the web workers' for management commands and shells
+SPARE_CLIENTS = 10
+
+
+def pool_settings():
+    """PgBouncer [pgbouncer] settings sized for the web workers."""
+    clients = max(settings.WEB_CONCURRENCY, 1) * max(settings.WEB_THREADS, 1)
+    return {
+        "pool_mode": "transaction",
+        # One server connection per thread at most, within the server's budget
+        "default_pool_size": max(1, min(clients, settings.DATABASE_MAX_CONNECTIONS)),
+        "max_db_connections": settings.DATABASE_MAX_CONNECTIONS,
+        "max_client_conn": clients + SPARE_CLIENTS,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the PgBouncer pool settings for WEB_CONCURRENCY processes of "
+        "WEB_THREADS threads sharing DATABASE_MAX_CONNECTIONS server "
+        "connections. Run the app with DATABASE_PGBOUNCER=1 behind it."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write("[pgbouncer]")
+        for name, value in pool_settings().items():
+            self.stdout.write(f"{name} = {value}")
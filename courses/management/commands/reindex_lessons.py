@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from courses import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the lesson full-text search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = search.reindex(options["batch_size"])
+        self.stdout.write(f"Indexed {count} lessons.")
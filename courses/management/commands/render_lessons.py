@@ -0,0 +1,94 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from courses import search
+from courses.models import Course, Lesson
+from courses.rendering import RENDERER_VERSION, render_batch
+
+
+class Command(BaseCommand):
+    help = "Recompile stored lesson HTML that is missing or out of date."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-render every lesson, not only stale ones.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of rendering processes.",
+        )
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        lessons = Lesson.objects.order_by("pk")
+        if not options["all"]:
+            lessons = lessons.exclude(renderer_version=RENDERER_VERSION)
+
+        batch_size = options["batch_size"]
+        # Workers only run the pure render function, the database is only
+        # touched from this process.
+        connections.close_all()
+        rendered = 0
+        last_pk = 0
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            while True:
+                # Fetch a window of batches, render them in parallel, then
+                # write them back before fetching the next window.
+                rows = list(
+                    lessons.filter(pk__gt=last_pk).values_list("pk", "content")[
+                        : batch_size * options["workers"]
+                    ]
+                )
+                if not rows:
+                    break
+                last_pk = rows[-1][0]
+                batches = [
+                    rows[i : i + batch_size] for i in range(0, len(rows), batch_size)
+                ]
+                for results in pool.map(render_batch, batches):
+                    now = timezone.now()
+                    Lesson.objects.bulk_update(
+                        [
+                            Lesson(
+                                pk=pk,
+                                content_html=html,
+                                content_hash=digest,
+                                renderer_version=RENDERER_VERSION,
+                                updated_at=now,
+                            )
+                            for pk, html, digest in results
+                        ],
+                        [
+                            "content_html",
+                            "content_hash",
+                            "renderer_version",
+                            "updated_at",
+                        ],
+                    )
+                    # bulk_update doesn't send the signals that keep search current
+                    search.index_rows(
+                        Lesson.objects.filter(
+                            pk__in=[pk for pk, _, _ in results]
+                        ).values_list("pk", "course_id", "title", "content_html")
+                    )
+                    # Nor the ones that bump the course (API ETags, delta sync)
+                    Course.objects.filter(
+                        pk__in=Lesson.objects.filter(
+                            pk__in=[pk for pk, _, _ in results]
+                        ).values("course_id")
+                    ).update(updated_at=now)
+                    rendered += len(results)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {rendered} lessons (renderer v{RENDERER_VERSION})."
+            )
+        )
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0004_remove_pendingcollaborator_invited_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                condition=models.Q(("status", "pub")),
+                fields=["-created_at"],
+                include=("id", "title", "creator"),
+                name="course_pub_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                fields=["creator", "status"], name="course_creator_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["course", "position"], name="lesson_course_position_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pendingcollaborator",
+            index=models.Index(
+                fields=["course", "email"], name="pending_course_email_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:28
+
+import hashlib
+import re
+
+from django.db import migrations, models
+from django.utils.html import escape
+
+# courses.rendering as of this migration (version 1), kept here so later
+# renderer changes don't change what it does; `manage.py render_lessons`
+# brings lessons up to the current version
+RENDERER_VERSION = 1
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+LIST_ITEM_RE = re.compile(r"^[-*]\s+(.*)$")
+CODE_SPAN_RE = re.compile(r"(`[^`\n]+`)")
+STRONG_RE = re.compile(r"\*\*(.+?)\*\*")
+EM_RE = re.compile(r"\*(.+?)\*")
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def render_inline(text):
+    parts = []
+    for part in CODE_SPAN_RE.split(escape(text)):
+        if CODE_SPAN_RE.fullmatch(part):
+            parts.append(f"<code>{part[1:-1]}</code>")
+        else:
+            part = STRONG_RE.sub(r"<strong>\1</strong>", part)
+            parts.append(EM_RE.sub(r"<em>\1</em>", part))
+    return "".join(parts)
+
+
+def render_content(content):
+    html = []
+    paragraph = []
+    items = []
+
+    def flush():
+        if paragraph:
+            html.append("<p>" + "<br>".join(paragraph) + "</p>")
+            paragraph.clear()
+        if items:
+            html.append("<ul>" + "".join(f"<li>{i}</li>" for i in items) + "</ul>")
+            items.clear()
+
+    lines = iter(content.replace("\r\n", "\n").split("\n"))
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            flush()
+            code = []
+            for code_line in lines:
+                if code_line.strip().startswith("```"):
+                    break
+                code.append(code_line)
+            html.append("<pre><code>" + escape("\n".join(code)) + "</code></pre>")
+        elif not stripped:
+            flush()
+        elif heading := HEADING_RE.match(stripped):
+            flush()
+            level = len(heading.group(1))
+            html.append(f"<h{level}>{render_inline(heading.group(2))}</h{level}>")
+        elif item := LIST_ITEM_RE.match(stripped):
+            if paragraph:
+                flush()
+            items.append(render_inline(item.group(1)))
+        else:
+            if items:
+                flush()
+            paragraph.append(render_inline(stripped))
+    flush()
+    return "\n".join(html)
+
+
+def render_existing(apps, schema_editor):
+    Lesson = apps.get_model("courses", "Lesson")
+    lessons = (
+        Lesson.objects.using(schema_editor.connection.alias)
+        .only("content")
+        .order_by("pk")
+    )
+    batch = []
+    for lesson in lessons.iterator(chunk_size=500):
+        lesson.content_html = render_content(lesson.content)
+        lesson.content_hash = content_hash(lesson.content)
+        lesson.renderer_version = RENDERER_VERSION
+        batch.append(lesson)
+        if len(batch) == 500:
+            lessons.bulk_update(
+                batch, ["content_html", "content_hash", "renderer_version"]
+            )
+            batch = []
+    lessons.bulk_update(batch, ["content_html", "content_hash", "renderer_version"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0005_catalog_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lesson",
+            name="content_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="content_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="renderer_version",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:29
+
+import courses.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0006_lesson_content_html"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="lesson",
+            name="content",
+            field=courses.fields.CompressedTextField(
+                threshold_setting="LESSON_CONTENT_COMPRESS_THRESHOLD",
+                verbose_name="lesson_contents",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:32
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_lessons(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    for course in Course.objects.annotate(lessons=Count("lesson")).filter(
+        lessons__gt=0
+    ):
+        Course.objects.filter(pk=course.pk).update(lesson_count=course.lessons)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0008_lesson_attachments"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="lesson_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_lessons, migrations.RunPython.noop),
+    ]
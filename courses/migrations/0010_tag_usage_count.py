@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:40
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def normalize_tags(apps, schema_editor):
+    Tag = apps.get_model("courses", "Tag")
+    Through = apps.get_model("courses", "Course").tags.through
+
+    # Merge tags that only differed in case or spacing into one row
+    keep = {}
+    renames = []
+    for tag in Tag.objects.order_by("pk"):
+        name = " ".join(tag.name.split()).lower()[:30].strip()
+        if name in keep:
+            target = keep[name]
+            courses = Through.objects.filter(tag_id=target).values("course_id")
+            Through.objects.filter(tag_id=tag.pk).exclude(course_id__in=courses).update(
+                tag_id=target
+            )
+            tag.delete()
+        else:
+            keep[name] = tag.pk
+            if tag.name != name:
+                renames.append((tag.pk, name))
+    for pk, name in renames:
+        Tag.objects.filter(pk=pk).update(name=name)
+
+    for tag in Tag.objects.annotate(n=Count("courses")).filter(n__gt=0):
+        Tag.objects.filter(pk=tag.pk).update(usage_count=tag.n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0009_course_lesson_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tag",
+            name="usage_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(normalize_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0010_tag_usage_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(fields=["updated_at"], name="course_updated_idx"),
+        ),
+    ]
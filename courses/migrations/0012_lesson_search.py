@@ -0,0 +1,94 @@
+from html import unescape
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# The DDL and indexing as of this migration, kept here so later changes to
+# courses.search don't change what it does
+TABLE = "courses_lesson_search"
+
+SQLITE_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+    title, body, course, tokenize = 'unicode61', prefix = '2 3'
+)
+"""
+
+POSTGRESQL_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    lesson_id bigint PRIMARY KEY REFERENCES {lessons} (id) ON DELETE CASCADE,
+    course_id bigint NOT NULL,
+    title text NOT NULL,
+    body text NOT NULL,
+    document tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', title), 'A')
+        || setweight(to_tsvector('english', body), 'B')
+    ) STORED
+);
+CREATE INDEX IF NOT EXISTS {table}_document_idx ON {table} USING gin (document);
+CREATE INDEX IF NOT EXISTS {table}_course_idx ON {table} (course_id)
+"""
+
+
+def index_rows(connection, rows):
+    rows = [
+        (pk, course_id, title, " ".join(unescape(strip_tags(html)).split()))
+        for pk, course_id, title, html in rows
+    ]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, title, body, course) "
+                f"VALUES (%s, %s, %s, %s)",
+                [(pk, title, body, f"c{course}") for pk, course, title, body in rows],
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (lesson_id, course_id, title, body) "
+                f"VALUES (%s, %s, %s, %s) ON CONFLICT (lesson_id) DO NOTHING",
+                rows,
+            )
+
+
+def create_search_table(apps, schema_editor):
+    connection = schema_editor.connection
+    Lesson = apps.get_model("courses", "Lesson")
+    if connection.vendor == "sqlite":
+        sql = SQLITE_TABLE
+    elif connection.vendor == "postgresql":
+        sql = POSTGRESQL_TABLE.format(
+            table=TABLE, lessons=schema_editor.quote_name(Lesson._meta.db_table)
+        )
+    else:
+        return
+    for statement in filter(str.strip, sql.split(";")):
+        schema_editor.execute(statement)
+
+    lessons = (
+        Lesson.objects.using(connection.alias)
+        .order_by("pk")
+        .values_list("pk", "course_id", "title", "content_html")
+    )
+    batch = []
+    for row in lessons.iterator(chunk_size=500):
+        batch.append(row)
+        if len(batch) >= 500:
+            index_rows(connection, batch)
+            batch = []
+    index_rows(connection, batch)
+
+
+def drop_search_table(apps, schema_editor):
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0011_course_updated_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
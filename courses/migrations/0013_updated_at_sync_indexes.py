@@ -0,0 +1,44 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0012_lesson_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lesson",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RemoveIndex(
+            model_name="course",
+            name="course_updated_idx",
+        ),
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(fields=["updated_at", "id"], name="course_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(fields=["updated_at", "id"], name="lesson_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(fields=["updated_at", "id"], name="tag_updated_idx"),
+        ),
+    ]
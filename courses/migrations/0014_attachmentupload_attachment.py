@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0013_updated_at_sync_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachmentupload",
+            name="attachment",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="upload",
+                to="courses.lessonattachment",
+            ),
+        ),
+    ]
@@ -1,8 +1,13 @@
+import uuid
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.utils import timezone
 from django.dispatch import receiver
 from users.models import User
+from courses.fields import CompressedTextField
+from courses.rendering import RENDERER_VERSION, content_hash, render_content
 
 
 def get_deleted_user():
@@ -14,12 +19,35 @@ def get_deleted_user():
 
 
 class Tag(models.Model):
+    # Stored normalized, see courses.tags.normalize
     name = models.CharField(max_length=30, unique=True)
+    # Number of courses using the tag, maintained by courses.tags
+    usage_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Delta sync scans by (updated_at, id) watermark
+            models.Index(fields=["updated_at", "id"], name="tag_updated_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class CourseQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Courses `user` can view, see Course.can_view."""
+        if not user.is_authenticated:
+            return self.filter(status="pub")
+        collaborating = Course.collaborators.through.objects.filter(user_id=user.pk)
+        return self.filter(
+            models.Q(status="pub")
+            | models.Q(creator_id=user.pk)
+            | models.Q(pk__in=collaborating.values("course_id"))
+        )
+
+
 class Course(models.Model):
     title = models.CharField(max_length=30)
     description = models.TextField(max_length=450)
@@ -37,6 +65,9 @@ class Course(models.Model):
         default="dra",
     )
     updated_at = models.DateTimeField(auto_now=True)
+    # Kept in step with the lesson table, so progress can be shown without
+    # counting lessons
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
     tags = models.ManyToManyField(Tag, blank=True, related_name="courses")
     favorites = models.ManyToManyField(
         User, blank=True, related_name="favorite_courses"
@@ -45,9 +76,21 @@ class Course(models.Model):
         User, blank=True, related_name="collaborating_courses"
     )
 
+    objects = CourseQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} #{self.id}"
 
+    def can_edit(self, user):
+        """`user` is its creator or a collaborator."""
+        return user.is_authenticated and (
+            self.creator_id == user.pk or self.collaborators.filter(pk=user.pk).exists()
+        )
+
+    def can_view(self, user):
+        """Published, or `user` can edit it; see also CourseQuerySet.visible_to."""
+        return self.status == "pub" or self.can_edit(user)
+
     class Meta:
         ordering = ["-created_at"]
         verbose_name = "Course"
@@ -58,16 +101,41 @@ class Course(models.Model):
                 fields=["title", "status"], name="unique_course_title_status"
             )
         ]
+        indexes = [
+            # Public catalog: status="pub" ordered by -created_at. The card
+            # fields ride along as non-key columns on PostgreSQL so the list
+            # page can be answered from the index alone.
+            models.Index(
+                fields=["-created_at"],
+                name="course_pub_created_idx",
+                condition=models.Q(status="pub"),
+                include=["id", "title", "creator"],
+            ),
+            models.Index(
+                fields=["creator", "status"], name="course_creator_status_idx"
+            ),
+            # Jobs, caches and delta sync that follow changed courses, the
+            # latter by (updated_at, id) watermark
+            models.Index(fields=["updated_at", "id"], name="course_updated_idx"),
+        ]
 
 
 class Lesson(models.Model):
     title = models.CharField(max_length=30)
-    content = models.TextField(_("lesson_contents"))
+    content = CompressedTextField(
+        _("lesson_contents"), threshold_setting="LESSON_CONTENT_COMPRESS_THRESHOLD"
+    )
     course = models.ForeignKey(
         Course, verbose_name=_("lessons"), on_delete=models.CASCADE
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     position = models.IntegerField(_("Lesson Order"))
+    # Compiled form of `content`, refreshed on save when the content or the
+    # renderer changes
+    content_html = models.TextField(blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    renderer_version = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["-position"]
@@ -79,12 +147,110 @@ class Lesson(models.Model):
                 fields=["title", "course"], name="unique_colessourse_lesson_status"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["course", "position"], name="lesson_course_position_idx"
+            ),
+            # Delta sync scans by (updated_at, id) watermark
+            models.Index(fields=["updated_at", "id"], name="lesson_updated_idx"),
+        ]
+
+    def render(self):
+        """Recompile content_html if content or the renderer changed."""
+        digest = content_hash(self.content)
+        if digest == self.content_hash and self.renderer_version == RENDERER_VERSION:
+            return False
+        self.content_html = render_content(self.content)
+        self.content_hash = digest
+        self.renderer_version = RENDERER_VERSION
+        return True
+
+    def save(self, *args, **kwargs):
+        if self.render() and kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {
+                *kwargs["update_fields"],
+                "content_html",
+                "content_hash",
+                "renderer_version",
+            }
+        super().save(*args, **kwargs)
+
+
+class AttachmentBlob(models.Model):
+    """File contents, stored once per distinct SHA-256."""
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+
+class LessonAttachment(models.Model):
+    lesson = models.ForeignKey(
+        Lesson, on_delete=models.CASCADE, related_name="attachments"
+    )
+    blob = models.ForeignKey(AttachmentBlob, on_delete=models.PROTECT)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, default="application/octet-stream")
+    uploaded_by = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.filename
+
+
+class AttachmentUpload(models.Model):
+    """
+    An attachment upload, resumable from `received`. Once finalized it keeps
+    pointing at its attachment, so retried requests get that back.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, default="application/octet-stream")
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attachment = models.OneToOneField(
+        LessonAttachment,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="upload",
+    )
 
 
 @receiver([post_save, post_delete], sender=Lesson)
 def update_course_timestamp(sender, instance, **kwargs):
-    course = instance.course
-    course.save()
+    Course.objects.filter(pk=instance.course_id).update(
+        updated_at=timezone.now(),
+        lesson_count=Lesson.objects.filter(course_id=instance.course_id).count(),
+    )
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+@receiver(m2m_changed, sender=Course.favorites.through)
+@receiver(m2m_changed, sender=Course.collaborators.through)
+def touch_course_on_relation_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    # Relation changes don't save the course, bump updated_at so jobs that
+    # look for changed courses see them
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        course_ids = [instance.pk]
+    elif pk_set:
+        course_ids = pk_set
+    else:
+        return
+    Course.objects.filter(pk__in=course_ids).update(updated_at=timezone.now())
 
 
 class PendingCollaborator(models.Model):
@@ -98,6 +264,11 @@ class PendingCollaborator(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["course", "email"], name="pending_course_email_idx"),
+        ]
+
     def display_name(self):
         if self.username:
             user = User.objects.filter(username=self.username).first()
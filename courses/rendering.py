@@ -0,0 +1,85 @@
+import hashlib
+import re
+
+from django.utils.html import escape
+
+# Bump whenever the output of render_content changes, so stored HTML gets
+# recompiled by `manage.py render_lessons`.
+RENDERER_VERSION = 1
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+LIST_ITEM_RE = re.compile(r"^[-*]\s+(.*)$")
+CODE_SPAN_RE = re.compile(r"(`[^`\n]+`)")
+STRONG_RE = re.compile(r"\*\*(.+?)\*\*")
+EM_RE = re.compile(r"\*(.+?)\*")
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def render_inline(text):
+    parts = []
+    for part in CODE_SPAN_RE.split(escape(text)):
+        if CODE_SPAN_RE.fullmatch(part):
+            parts.append(f"<code>{part[1:-1]}</code>")
+        else:
+            part = STRONG_RE.sub(r"<strong>\1</strong>", part)
+            parts.append(EM_RE.sub(r"<em>\1</em>", part))
+    return "".join(parts)
+
+
+def render_content(content):
+    """
+    Compile lesson text to HTML.
+
+    Supports a small Markdown subset: headings, bullet lists, fenced code,
+    inline code, bold and italics. Everything is escaped before markup is
+    added, so the output is safe to render without further sanitizing.
+    """
+    html = []
+    paragraph = []
+    items = []
+
+    def flush():
+        if paragraph:
+            html.append("<p>" + "<br>".join(paragraph) + "</p>")
+            paragraph.clear()
+        if items:
+            html.append("<ul>" + "".join(f"<li>{i}</li>" for i in items) + "</ul>")
+            items.clear()
+
+    lines = iter(content.replace("\r\n", "\n").split("\n"))
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            flush()
+            code = []
+            for code_line in lines:
+                if code_line.strip().startswith("```"):
+                    break
+                code.append(code_line)
+            html.append("<pre><code>" + escape("\n".join(code)) + "</code></pre>")
+        elif not stripped:
+            flush()
+        elif heading := HEADING_RE.match(stripped):
+            flush()
+            level = len(heading.group(1))
+            html.append(f"<h{level}>{render_inline(heading.group(2))}</h{level}>")
+        elif item := LIST_ITEM_RE.match(stripped):
+            if paragraph:
+                flush()
+            items.append(render_inline(item.group(1)))
+        else:
+            if items:
+                flush()
+            paragraph.append(render_inline(stripped))
+    flush()
+    return "\n".join(html)
+
+
+def render_batch(rows):
+    """Render (pk, content) pairs; runs inside worker processes."""
+    return [
+        (pk, render_content(content), content_hash(content)) for pk, content in rows
+    ]
@@ -0,0 +1,189 @@
+"""
+Full-text search over lesson titles and bodies.
+
+Lesson content may be stored compressed, so it is indexed through a separate
+table kept up to date from the lesson save/delete signals:
+
+- SQLite: an FTS5 table. The course id is an indexed column too ("c<id>"),
+  so restricting a search to one course is part of the index lookup. No
+  stemming, as every word is matched as a prefix.
+- PostgreSQL: a table with a weighted tsvector column (title over body)
+  under a GIN index, next to a btree index on course_id.
+
+The table is created by the courses/0012_lesson_search migration.
+
+The indexed body is the rendered lesson with its markup stripped. Snippets
+come from the database (snippet() / ts_headline()) with control characters
+as match markers, so they can be escaped before the markers become <mark>.
+"""
+
+import re
+from html import unescape
+
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from courses.models import Lesson
+
+TABLE = "courses_lesson_search"
+START, STOP = "\x02", "\x03"
+# Words around each match in a snippet
+SNIPPET_WORDS = 24
+
+
+def supported():
+    return connection.vendor in ("sqlite", "postgresql")
+
+
+def plain_text(html):
+    return " ".join(unescape(strip_tags(html)).split())
+
+
+def index_rows(rows):
+    """Index (lesson_id, course_id, title, content_html) rows."""
+    rows = [
+        (lesson_id, course_id, title, plain_text(html))
+        for lesson_id, course_id, title, html in rows
+    ]
+    if not rows or not supported():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.executemany(
+                f"DELETE FROM {TABLE} WHERE rowid = %s", [(row[0],) for row in rows]
+            )
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, title, body, course) "
+                f"VALUES (%s, %s, %s, %s)",
+                [(pk, title, body, f"c{course}") for pk, course, title, body in rows],
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (lesson_id, course_id, title, body) "
+                f"VALUES (%s, %s, %s, %s) ON CONFLICT (lesson_id) DO UPDATE "
+                f"SET course_id = EXCLUDED.course_id, title = EXCLUDED.title, "
+                f"body = EXCLUDED.body",
+                rows,
+            )
+
+
+def unindex(lesson_ids):
+    if not supported():
+        return
+    column = "rowid" if connection.vendor == "sqlite" else "lesson_id"
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {TABLE} WHERE {column} = %s", [(pk,) for pk in lesson_ids]
+        )
+
+
+def reindex(batch_size=500):
+    """Rebuild the whole index; returns the number of lessons indexed."""
+    if not supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+    lessons = Lesson.objects.order_by("pk").values_list(
+        "pk", "course_id", "title", "content_html"
+    )
+    count, batch = 0, []
+    for row in lessons.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            index_rows(batch)
+            count, batch = count + len(batch), []
+    index_rows(batch)
+    return count + len(batch)
+
+
+def terms(query):
+    return re.findall(r"\w+", query.lower())[:16]
+
+
+def highlight(snippet):
+    return mark_safe(escape(snippet).replace(START, "<mark>").replace(STOP, "</mark>"))
+
+
+def search(query, course_id=None, limit=50):
+    """
+    Best matches for `query` as dicts with id, course_id, title and snippet
+    (safe HTML with <mark>ed matches), optionally within one course.
+    """
+    words = terms(query)
+    if not words:
+        return []
+    if connection.vendor == "sqlite":
+        # Every word, as a prefix; quoted so FTS5 operators stay literal
+        match = " ".join(f'"{word}"*' for word in words)
+        if course_id is not None:
+            match = f'course:"c{int(course_id)}" AND ({match})'
+        sql = f"""
+            SELECT rowid, CAST(substr(course, 2) AS integer), title,
+                   snippet({TABLE}, 1, %s, %s, '…', %s)
+            FROM {TABLE}
+            WHERE {TABLE} MATCH %s
+            ORDER BY bm25({TABLE}, 4.0, 1.0, 0.0)
+            LIMIT %s
+        """
+        params = [START, STOP, SNIPPET_WORDS, match, limit]
+    elif connection.vendor == "postgresql":
+        tsquery = " & ".join(f"{word}:*" for word in words)
+        sql = f"""
+            SELECT lesson_id, course_id, title,
+                   ts_headline('english', body, q, %s)
+            FROM {TABLE}, to_tsquery('english', %s) q
+            WHERE document @@ q {"AND course_id = %s" if course_id is not None else ""}
+            ORDER BY ts_rank_cd(document, q) DESC
+            LIMIT %s
+        """
+        options = (
+            f"StartSel={START}, StopSel={STOP}, MaxWords={SNIPPET_WORDS}, "
+            f"MinWords={SNIPPET_WORDS // 2}, MaxFragments=2, FragmentDelimiter=' … '"
+        )
+        params = [options, tsquery]
+        if course_id is not None:
+            params.append(course_id)
+        params.append(limit)
+    else:
+        lessons = Lesson.objects.filter(title__icontains=query)
+        if course_id is not None:
+            lessons = lessons.filter(course_id=course_id)
+        return [
+            {"id": pk, "course_id": course, "title": title, "snippet": ""}
+            for pk, course, title in lessons.values_list("pk", "course_id", "title")[
+                :limit
+            ]
+        ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            {
+                "id": pk,
+                "course_id": course,
+                "title": title,
+                "snippet": highlight(snippet),
+            }
+            for pk, course, title, snippet in cursor.fetchall()
+        ]
+
+
+@receiver(post_save, sender=Lesson)
+def index_lesson(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not {"title", "content_html", "course"} & set(
+        update_fields
+    ):
+        return
+    index_rows(
+        [(instance.pk, instance.course_id, instance.title, instance.content_html)]
+    )
+
+
+@receiver(post_delete, sender=Lesson)
+def unindex_lesson(sender, instance, **kwargs):
+    unindex([instance.pk])
@@ -0,0 +1,358 @@
+"""
+Compact per-process snapshot of the published catalog.
+
+The catalog page only needs a few small fields of published courses, so each
+worker keeps them in memory and answers listing, sorting and tag filtering
+without the database. Rows are stored column-wise, sorted by id:
+
+- numeric columns (id, created_at, creator) are NumPy arrays,
+- titles and description excerpts are UTF-8 packed into one bytes object
+  per column plus an offsets array,
+- tags are one array of tag ids plus offsets, with the tag and creator names
+  interned once in lookup tables.
+
+A snapshot is immutable; refreshing builds a new one (from the previous
+snapshot and the courses whose updated_at moved) and swaps it in, so
+readers never wait. Deleted courses are dropped by the signal below in the
+process that deleted them and by the periodic rebuild everywhere else.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Case, TextField, Value, When
+from django.db.models.functions import Concat, Length, Substr
+from django.db.models.lookups import GreaterThan
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from courses.models import Course, Tag
+from users.models import User
+
+# Re-read changes this far back, for transactions that committed after the
+# previous refresh with an earlier updated_at
+OVERLAP = timedelta(seconds=5)
+# Loads read the primary even inside replica-routed views: synced_at is the
+# primary's clock, so a lagging replica would make later refreshes skip the
+# changes it hadn't applied yet
+DATABASE = "default"
+
+SORTS = ("newest", "oldest", "title")
+
+# Characters of the description shown on catalog cards
+DESCRIPTION_EXCERPT_LENGTH = 140
+
+
+def description_excerpt(length=DESCRIPTION_EXCERPT_LENGTH):
+    """Truncated course description, computed by the database."""
+    return Case(
+        When(
+            GreaterThan(Length("description"), length),
+            then=Concat(Substr("description", 1, length), Value("…")),
+        ),
+        default="description",
+        output_field=TextField(),
+    )
+
+
+class StringColumn:
+    __slots__ = ("data", "offsets")
+
+    def __init__(self, chunks):
+        self.data = b"".join(chunks)
+        self.offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in chunks], out=self.offsets[1:])
+
+    def raw(self, i):
+        return self.data[self.offsets[i] : self.offsets[i + 1]]
+
+    def __getitem__(self, i):
+        return self.raw(i).decode()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def nbytes(self):
+        return len(self.data) + self.offsets.nbytes
+
+
+class RaggedColumn:
+    __slots__ = ("values", "offsets")
+
+    def __init__(self, lists):
+        self.values = np.fromiter(
+            (v for values in lists for v in values), dtype=np.int32
+        )
+        self.offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(values) for values in lists], out=self.offsets[1:])
+
+    def __getitem__(self, i):
+        return self.values[self.offsets[i] : self.offsets[i + 1]]
+
+    def nbytes(self):
+        return self.values.nbytes + self.offsets.nbytes
+
+
+class CatalogEntry:
+    """A published course as the catalog cards show it."""
+
+    __slots__ = ("pk", "title", "description_excerpt", "creator_name", "tags", "ts")
+
+    def __init__(self, pk, title, description_excerpt, creator_name, tags, ts):
+        self.pk = pk
+        self.title = title
+        self.description_excerpt = description_excerpt
+        self.creator_name = creator_name
+        self.tags = tags
+        self.ts = ts
+
+    @property
+    def created_at(self):
+        return datetime.fromtimestamp(self.ts, tz=dt_timezone.utc)
+
+
+class Snapshot:
+    __slots__ = (
+        "ids",
+        "created",
+        "creators",
+        "titles",
+        "excerpts",
+        "tags",
+        "tag_names",
+        "creator_names",
+        "newest_rank",
+        "title_rank",
+        "synced_at",
+    )
+
+    def __init__(self, rows, tag_names, creator_names, synced_at):
+        """`rows`: (id, title, excerpt, creator_id, created_ts, tag_ids)."""
+        rows = sorted(rows, key=lambda row: row[0])
+        self.ids = np.fromiter(
+            (row[0] for row in rows), dtype=np.int64, count=len(rows)
+        )
+        self.created = np.fromiter(
+            (row[4] for row in rows), dtype=np.float64, count=len(rows)
+        )
+        self.creators = np.fromiter(
+            (row[3] or 0 for row in rows), dtype=np.int64, count=len(rows)
+        )
+        self.titles = StringColumn([row[1].encode() for row in rows])
+        self.excerpts = StringColumn([row[2].encode() for row in rows])
+        self.tags = RaggedColumn([row[5] for row in rows])
+        self.tag_names = tag_names
+        self.creator_names = creator_names
+        self.synced_at = synced_at
+
+        # Position of every row in each sort order; int32 keeps them small
+        newest = np.lexsort((-self.ids, -self.created))
+        self.newest_rank = np.empty(len(rows), dtype=np.int32)
+        self.newest_rank[newest] = np.arange(len(rows), dtype=np.int32)
+        by_title = sorted(range(len(rows)), key=lambda i: (rows[i][1].lower(), i))
+        self.title_rank = np.empty(len(rows), dtype=np.int32)
+        self.title_rank[by_title] = np.arange(len(rows), dtype=np.int32)
+
+    @classmethod
+    def load(cls, since=None, previous=None, removed=()):
+        """
+        Snapshot of the database, or of `previous` updated with the courses
+        changed since `since` and without the `removed` ids.
+        """
+        synced_at = timezone.now()
+        if since is None:
+            changed = Course.objects.using(DATABASE).filter(status="pub")
+        else:
+            changed = Course.objects.using(DATABASE).filter(
+                updated_at__gte=since - OVERLAP
+            )
+        changed = changed.annotate(excerpt=description_excerpt()).values_list(
+            "pk", "status", "title", "excerpt", "creator_id", "created_at"
+        )
+        changed = {row[0]: row for row in changed}
+        course_tags = {pk: [] for pk in changed}
+        if since is None:
+            through = Course.tags.through.objects.using(DATABASE).filter(
+                course__status="pub"
+            )
+        else:
+            through = Course.tags.through.objects.using(DATABASE).filter(
+                course_id__in=list(changed)
+            )
+        for course_id, tag_id in through.values_list("course_id", "tag_id"):
+            if course_id in course_tags:
+                course_tags[course_id].append(tag_id)
+
+        if previous is not None and not changed and not removed:
+            previous.synced_at = synced_at
+            return previous
+
+        rows = []
+        tag_names = dict(previous.tag_names) if previous else {}
+        creator_names = dict(previous.creator_names) if previous else {}
+        if previous is not None:
+            drop = set(changed) | set(removed)
+            rows = [row for row in previous.rows() if row[0] not in drop]
+        new_rows = [
+            (pk, title, excerpt, creator_id, created_at.timestamp(), course_tags[pk])
+            for pk, status, title, excerpt, creator_id, created_at in changed.values()
+            if status == "pub"
+        ]
+        rows.extend(new_rows)
+
+        missing_tags = {t for row in new_rows for t in row[5]} - tag_names.keys()
+        if missing_tags:
+            tag_names.update(
+                (pk, name)
+                for pk, name in Tag.objects.using(DATABASE)
+                .filter(pk__in=missing_tags)
+                .values_list("pk", "name")
+            )
+        missing_creators = {row[3] for row in new_rows} - creator_names.keys()
+        missing_creators.discard(None)
+        if missing_creators:
+            creator_names.update(
+                User.objects.using(DATABASE)
+                .filter(pk__in=missing_creators)
+                .values_list("pk", "username")
+            )
+        return cls(rows, tag_names, creator_names, synced_at)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self):
+        """All rows as tuples, as taken by the constructor."""
+        for i in range(len(self.ids)):
+            yield (
+                int(self.ids[i]),
+                self.titles[i],
+                self.excerpts[i],
+                int(self.creators[i]) or None,
+                float(self.created[i]),
+                self.tags[i].tolist(),
+            )
+
+    def positions(self, course_ids):
+        """Row positions of the ids present in the snapshot, in input order."""
+        course_ids = np.asarray(course_ids, dtype=np.int64)
+        found = np.searchsorted(self.ids, course_ids).clip(0, max(len(self.ids) - 1, 0))
+        if not len(self.ids):
+            return found[:0]
+        return found[self.ids[found] == course_ids]
+
+    def sort(self, rows, order="newest"):
+        if order == "title":
+            return rows[np.argsort(self.title_rank[rows], kind="stable")]
+        ranks = self.newest_rank[rows]
+        if order == "oldest":
+            ranks = -ranks
+        return rows[np.argsort(ranks, kind="stable")]
+
+    def entry(self, i):
+        return CatalogEntry(
+            int(self.ids[i]),
+            self.titles[i],
+            self.excerpts[i],
+            self.creator_names.get(int(self.creators[i]), ""),
+            [self.tag_names.get(t, "") for t in self.tags[i].tolist()],
+            float(self.created[i]),
+        )
+
+    def nbytes(self):
+        """Approximate memory held by the columns."""
+        return (
+            self.ids.nbytes
+            + self.created.nbytes
+            + self.creators.nbytes
+            + self.titles.nbytes()
+            + self.excerpts.nbytes()
+            + self.tags.nbytes()
+            + self.newest_rank.nbytes
+            + self.title_rank.nbytes
+        )
+
+
+class Catalog:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = None
+        self.checked_at = 0.0
+        self.built_at = 0.0
+        self.removed = set()
+
+    def fresh(self):
+        return (
+            self.current is not None
+            and time.monotonic() - self.checked_at
+            < settings.CATALOG_SNAPSHOT_REFRESH_SECONDS
+        )
+
+    def snapshot(self):
+        if self.fresh():
+            return self.current
+        now = time.monotonic()
+        with self.lock:
+            if (
+                self.current is None
+                or now - self.built_at >= settings.CATALOG_SNAPSHOT_REBUILD_SECONDS
+            ):
+                self.current = Snapshot.load()
+                self.built_at = time.monotonic()
+            elif now - self.checked_at >= settings.CATALOG_SNAPSHOT_REFRESH_SECONDS:
+                self.current = Snapshot.load(
+                    self.current.synced_at, self.current, self.removed
+                )
+            self.removed = set()
+            self.checked_at = time.monotonic()
+            return self.current
+
+    async def asnapshot(self):
+        """snapshot() for async code; only a due refresh leaves the event loop."""
+        if self.fresh():
+            return self.current
+        return await sync_to_async(self.snapshot)()
+
+    def rebuild(self):
+        with self.lock:
+            self.current = Snapshot.load()
+            self.built_at = self.checked_at = time.monotonic()
+            self.removed = set()
+
+    def discard(self, course_ids):
+        # Picked up by the next refresh, in the same pass as other changes
+        with self.lock:
+            self.removed.update(course_ids)
+            self.checked_at = 0.0
+
+
+catalog = Catalog()
+
+
+@receiver(post_delete, sender=Course)
+def discard_deleted_course(sender, instance, **kwargs):
+    catalog.discard([instance.pk])
+
+
+class CatalogPage:
+    """Sequence of catalog entries over snapshot row positions, for the paginator."""
+
+    def __init__(self, snapshot, rows):
+        self.snapshot = snapshot
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def count(self):
+        return len(self.rows)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.snapshot.entry(i) for i in self.rows[key].tolist()]
+        return self.snapshot.entry(int(self.rows[key]))
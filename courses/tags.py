@@ -0,0 +1,198 @@
+"""
+Tag service.
+
+Tag names are normalized (trimmed, single-spaced, lower case) before they are
+stored or looked up, and resolve() turns a list of names into Tag rows with
+one SELECT plus one bulk INSERT for the names that don't exist yet.
+
+Tag.usage_count is kept in step with the course/tag relation by the signal
+handlers below. The vocabulary (every tag name with its usage count) is held
+per process and rebuilt when the shared version number in the cache moves,
+which happens whenever tags or their counts change. With a per-process cache
+backend the version isn't shared, so the vocabulary also expires after
+TAG_VOCABULARY_TTL seconds.
+"""
+
+import bisect
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from courses.models import Course, Tag
+
+VERSION_KEY = "courses:tag-vocabulary-version"
+MAX_LENGTH = Tag._meta.get_field("name").max_length
+
+
+def normalize(name):
+    return " ".join(name.split()).lower()[:MAX_LENGTH].strip()
+
+
+def parse(value):
+    """Normalized, de-duplicated tag names from a comma separated string."""
+    names = (normalize(name) for name in value.split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def resolve(names):
+    """Tags for `names`, in order, creating the missing ones."""
+    names = list(dict.fromkeys(name for name in map(normalize, names) if name))
+    if not names:
+        return []
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in tags]
+    if missing:
+        # Another request may create the same names concurrently
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in missing], ignore_conflicts=True
+        )
+        tags.update((tag.name, tag) for tag in Tag.objects.filter(name__in=missing))
+        invalidate()
+    return [tags[name] for name in names]
+
+
+class Vocabulary:
+    def __init__(self, rows):
+        # rows: (name, usage_count), sorted by name for prefix lookups
+        self.names = [name for name, _ in rows]
+        self.counts = dict(rows)
+        self.by_usage = sorted(self.names, key=lambda name: -self.counts[name])
+
+    def used(self):
+        """Names of tags used by at least one course, most used first."""
+        return [name for name in self.by_usage if self.counts[name]]
+
+    def prefix(self, prefix, limit=10):
+        """Names starting with `prefix`, most used first."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.names, prefix)
+        end = bisect.bisect_left(self.names, prefix + "\U0010ffff", lo=start)
+        matches = sorted(self.names[start:end], key=lambda name: -self.counts[name])
+        return matches[:limit]
+
+
+_lock = threading.Lock()
+_cached = {"version": None, "loaded_at": 0.0, "vocabulary": None}
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def acurrent_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def fresh(version):
+    return (
+        _cached["vocabulary"] is not None
+        and _cached["version"] == version
+        and time.monotonic() - _cached["loaded_at"] < settings.TAG_VOCABULARY_TTL
+    )
+
+
+def vocabulary():
+    version = current_version()
+    if fresh(version):
+        return _cached["vocabulary"]
+    return load_vocabulary(version)
+
+
+async def avocabulary():
+    """vocabulary() for async code; only a reload leaves the event loop."""
+    version = await acurrent_version()
+    if fresh(version):
+        return _cached["vocabulary"]
+    return await sync_to_async(load_vocabulary)(version)
+
+
+def load_vocabulary(version):
+    with _lock:
+        # Another thread may have rebuilt it while we waited
+        if not fresh(version):
+            rows = Tag.objects.order_by("name").values_list("name", "usage_count")
+            _cached.update(
+                version=version,
+                loaded_at=time.monotonic(),
+                vocabulary=Vocabulary(list(rows)),
+            )
+        return _cached["vocabulary"]
+
+
+def invalidate():
+    def bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def adjust_counts(deltas):
+    """Apply {tag_id: delta} to Tag.usage_count."""
+    for delta in set(deltas.values()) - {0}:
+        tag_ids = [tag_id for tag_id, d in deltas.items() if d == delta]
+        Tag.objects.filter(pk__in=tag_ids).update(
+            usage_count=F("usage_count") + delta, updated_at=timezone.now()
+        )
+    invalidate()
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def update_usage_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # The cleared rows are gone by post_clear, remember them now
+        if reverse:
+            instance._cleared_tag_courses = instance.courses.count()
+        else:
+            instance._cleared_tag_ids = list(instance.tags.values_list("pk", flat=True))
+        return
+    sign = {"post_add": 1, "post_remove": -1, "post_clear": -1}.get(action)
+    if sign is None:
+        return
+    if reverse:
+        if action == "post_clear":
+            count = instance.__dict__.pop("_cleared_tag_courses", 0)
+        else:
+            count = len(pk_set)
+        if count:
+            adjust_counts({instance.pk: sign * count})
+    else:
+        if action == "post_clear":
+            tag_ids = instance.__dict__.pop("_cleared_tag_ids", [])
+        else:
+            tag_ids = pk_set
+        if tag_ids:
+            adjust_counts({tag_id: sign for tag_id in tag_ids})
+
+
+@receiver(pre_delete, sender=Course)
+def release_course_tags(sender, instance, **kwargs):
+    # The relation rows are deleted by cascade, without m2m_changed
+    tag_ids = list(instance.tags.values_list("pk", flat=True))
+    if tag_ids:
+        adjust_counts({tag_id: -1 for tag_id in tag_ids})
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tag_changed(sender, **kwargs):
+    invalidate()
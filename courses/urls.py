@@ -1,10 +1,21 @@
 from django.urls import path
+from LibreCourse.routers import read_from_replica
 from . import views
 
 urlpatterns = [
-    path("", views.CourseListView.as_view(), name="course-list"),
+    path("", read_from_replica(views.CourseListView.as_view()), name="course-list"),
+    # Catalog pages by path, as the static export has them
+    path(
+        "page/<int:page>/",
+        read_from_replica(views.CourseListView.as_view()),
+        name="course-list-page",
+    ),
     path("create/", views.CourseCreateView.as_view(), name="course-create"),
-    path("<int:pk>/", views.CourseDetailView.as_view(), name="course-detail"),
+    path(
+        "<int:pk>/",
+        read_from_replica(views.CourseDetailView.as_view()),
+        name="course-detail",
+    ),
     path("<int:pk>/update/", views.CourseUpdateView.as_view(), name="course-update"),
     path("<int:pk>/delete/", views.CourseDeleteView.as_view(), name="course-delete"),
     path(
@@ -12,6 +23,16 @@ urlpatterns = [
         views.LessonCreateView.as_view(),
         name="lesson-create",
     ),
+    path(
+        "<int:course_id>/lessons/search/",
+        views.LessonSearchView.as_view(),
+        name="lesson-search",
+    ),
+    path(
+        "<int:course_id>/lessons/<int:lesson_id>/",
+        views.LessonDetailView.as_view(),
+        name="lesson-detail",
+    ),
     path(
         "<int:course_id>/lessons/<int:lesson_id>/update/",
         views.LessonUpdateView.as_view(),
@@ -28,6 +49,24 @@ urlpatterns = [
         name="course-manage-collaborators",
     ),
     path(
-        "collaborators/autocomplete/", views.user_autocomplete, name="user-autocomplete"
+        "<int:course_id>/lessons/<int:lesson_id>/attachments/",
+        views.attachment_upload_create,
+        name="attachment-upload-create",
+    ),
+    path(
+        "attachments/uploads/<uuid:upload_id>/",
+        views.attachment_upload,
+        name="attachment-upload",
+    ),
+    path(
+        "attachments/<int:attachment_id>/",
+        views.attachment_download,
+        name="attachment-download",
+    ),
+    path("tags/autocomplete/", views.tag_autocomplete, name="tag-autocomplete"),
+    path(
+        "collaborators/autocomplete/",
+        read_from_replica(views.user_autocomplete),
+        name="user-autocomplete",
     ),
 ]
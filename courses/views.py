@@ -1,6 +1,10 @@
+import numpy as np
 from django.conf import settings
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.exceptions import PermissionDenied
 from django.core.mail import send_mail
+from django.db import transaction
 from django.db.models import Case, When, Value, IntegerField, Q
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
@@ -11,31 +15,69 @@ from django.views.generic import (
     CreateView,
     UpdateView,
     DeleteView,
+    TemplateView,
 )
 from courses.forms import CourseForm, LessonForm, CollaboratorsForm
-from courses.models import Course, Lesson, Tag, PendingCollaborator
+from analytics.events import acourse_views, atrack, track
+from analytics.models import EventKind
+from LibreCourse import asyncviews
+from courses import attachments, facets, search, tags
+from courses.snapshot import SORTS, CatalogPage, catalog
+from history.recorder import form_changes, record
+from courses.models import (
+    Course,
+    Lesson,
+    PendingCollaborator,
+    AttachmentUpload,
+    LessonAttachment,
+)
+from progress.buffer import apercent_complete, mark_complete
+from ratelimit.limits import rate_limit
 from users.models import User
-from django.http import JsonResponse
-from django.views.decorators.http import require_GET
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.http import (
+    require_GET,
+    require_POST,
+    require_http_methods,
+)
 from django.core.signing import Signer
 
 
 # Create your views here.
+# The catalog and course pages and the autocomplete endpoints are async, so
+# under ASGI they don't hold a thread while waiting on the database. Read
+# replica routing is applied in urls.py, around as_view().
 class CourseListView(ListView):
     model = Course
     template_name = "courses/course_list.html"
     context_object_name = "courses"
     paginate_by = 10
 
-    def get_queryset(self):
-        queryset = Course.objects.filter(status="pub").distinct()
+    async def get(self, request, *args, **kwargs):
+        self.object_list = await self.aget_queryset()
+        context = self.get_context_data()
+        return self.render_to_response(context)
+
+    async def aget_queryset(self):
         q = self.request.GET.get("q", "").strip()
-        tag_filter = self.request.GET.get("tag", "").strip()
+        self.selected_tags = tags.parse(",".join(self.request.GET.getlist("tag")))
+        self.match_all = self.request.GET.get("match") != "any"
+
+        # Tag filtering and facet counts come from the in-memory index
+        await facets.index.arefresh()
+        selected = facets.index.select(self.selected_tags, self.match_all)
+
+        # Rows come from the in-memory snapshot of the published catalog
+        snapshot = await catalog.asnapshot()
+        self.sort = self.request.GET.get("sort", "")
+        if self.sort not in SORTS:
+            self.sort = "" if q else "newest"
 
         if q:
             # Search priority: title=1, tag=2, description=3
-            queryset = (
-                queryset.annotate(
+            matches = (
+                Course.objects.filter(status="pub")
+                .annotate(
                     priority=Case(
                         When(title__icontains=q, then=Value(1)),
                         When(tags__name__icontains=q, then=Value(2)),
@@ -50,40 +92,144 @@ class CourseListView(ListView):
                     | Q(description__icontains=q)
                 )
                 .order_by("priority", "title")
+                .values_list("pk", flat=True)
             )
-
-        if tag_filter:
-            queryset = queryset.filter(tags__name__iexact=tag_filter)
-
-        return queryset.distinct()
+            matches = [pk async for pk in matches.aiterator()]
+            ids = np.fromiter(dict.fromkeys(matches), dtype=np.int64)
+            if self.selected_tags:
+                ids = ids[np.isin(ids, facets.members(selected))]
+            rows = snapshot.positions(ids)
+        else:
+            rows = snapshot.positions(facets.members(selected))
+        if self.sort:
+            rows = snapshot.sort(rows, self.sort)
+
+        self.result = facets.from_ids(snapshot.ids[rows])
+        return CatalogPage(snapshot, rows)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["all_tags"] = Tag.objects.all()
+        counts = facets.index.counts(self.result)
+        for name in self.selected_tags:
+            counts.setdefault(name, 0)
+        context["facets"] = [
+            {"name": name, "count": count, "selected": name in self.selected_tags}
+            for name, count in sorted(
+                counts.items(), key=lambda item: (-item[1], item[0])
+            )
+        ]
         context["current_q"] = self.request.GET.get("q", "")
-        context["current_tag"] = self.request.GET.get("tag", "")
+        context["match_any"] = not self.match_all
+        context["sort"] = self.sort
+        page = context["page_obj"]
+        if page is not None:
+            if page.has_previous():
+                context["previous_page_url"] = self.page_url(
+                    page.previous_page_number()
+                )
+            if page.has_next():
+                context["next_page_url"] = self.page_url(page.next_page_number())
         return context
 
+    def page_url(self, number):
+        # Always the query string, even when this page came from /page/<n>/
+        params = self.request.GET.copy()
+        params["page"] = number
+        return f"{reverse('course-list')}?{params.urlencode()}"
+
 
 class CourseDetailView(DetailView):
     model = Course
     context_object_name = "course"
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        self.object = await self.aget_object()
+        user = await asyncviews.auser(request)
+        context = await self.aget_context_data(user)
+
+        await atrack(EventKind.COURSE_VIEW, self.object.pk)
+        if user == self.object.creator:
+            context["view_count"] = await acourse_views(self.object.pk)
+
+        return self.render_to_response(context)
+
+    async def aget_object(self):
+        # Everything the template reads is loaded here, rendering only formats
+        try:
+            return await (
+                Course.objects.select_related("creator")
+                .prefetch_related("collaborators", "quizzes")
+                .aget(pk=self.kwargs["pk"])
+            )
+        except Course.DoesNotExist:
+            raise Http404(_("No course found matching the query"))
+
+    async def aget_context_data(self, user):
+        """The page's context for `user`; viewing it isn't recorded here."""
+        context = self.get_context_data(object=self.object)
         course = self.object
 
-        # Lessons ordered by position
-        context["lessons"] = course.lesson_set.all().order_by("position")
+        # Lessons ordered by position, without their content
+        lessons = course.lesson_set.only("id", "title", "position", "course_id")
+        context["lessons"] = [
+            lesson async for lesson in lessons.order_by("position").aiterator()
+        ]
 
         # Related courses: share at least one tag or same creator, exclude self
-        context["related_courses"] = (
+        related = (
             Course.objects.filter(status="pub")
             .filter(Q(tags__in=course.tags.all()) | Q(creator=course.creator))
             .exclude(id=course.id)
+            .only("id", "title")
             .distinct()[:5]
         )
+        context["related_courses"] = [c async for c in related.aiterator()]
 
+        context["percent_complete"] = await apercent_complete(user, course)
+        return context
+
+
+class LessonDetailView(DetailView):
+    model = Lesson
+    template_name = "courses/lesson_detail.html"
+    context_object_name = "lesson"
+
+    def get_object(self, queryset=None):
+        # Serve the compiled HTML, the raw content isn't needed to read
+        lesson = get_object_or_404(
+            Lesson.objects.select_related("course").defer("content"),
+            id=self.kwargs["lesson_id"],
+            course_id=self.kwargs["course_id"],
+        )
+        # Lessons of a draft or private course don't exist for others
+        if not lesson.course.can_view(self.request.user):
+            raise Http404(_("No lesson found matching the query"))
+        return lesson
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # Reading a lesson counts as completing it
+        if request.user.is_authenticated:
+            mark_complete(request.user, self.object)
+        return response
+
+
+class LessonSearchView(TemplateView):
+    template_name = "courses/lesson_search.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        course = get_object_or_404(
+            Course.objects.only("id", "title", "status", "creator_id"),
+            pk=self.kwargs["course_id"],
+        )
+        # Nor can others search a draft or private course
+        if not course.can_view(self.request.user):
+            raise Http404(_("No course found matching the query"))
+        query = self.request.GET.get("q", "").strip()
+        context["course"] = course
+        context["query"] = query
+        context["results"] = search.search(query, course_id=course.pk) if query else []
         return context
 
 
@@ -95,7 +241,10 @@ class CourseCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         # assign creator before saving
         form.instance.creator = self.request.user
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        track(EventKind.COURSE_CREATE, self.object.pk)
+        record("create", self.object, self.request.user, form_changes(form, False))
+        return response
 
     def get_success_url(self):
         return reverse("course-detail", kwargs={"pk": self.object.pk})
@@ -108,6 +257,10 @@ class CourseDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     def test_func(self):
         return self.request.user == self.get_object().creator
 
+    def form_valid(self, form):
+        record("delete", self.object, self.request.user)
+        return super().form_valid(form)
+
     def get_success_url(self):
         return reverse("course-list")
 
@@ -121,11 +274,11 @@ class CourseUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         # Only the creator can edit the course
         return self.request.user == self.get_object().creator
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        # Pass a plain list of tag names
-        context["all_tags"] = list(Tag.objects.values_list("name", flat=True))
-        return context
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if form.has_changed():
+            record("update", self.object, self.request.user, form_changes(form))
+        return response
 
     def get_success_url(self):
         return reverse("course-detail", kwargs={"pk": self.object.pk})
@@ -139,15 +292,14 @@ class LessonCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     def test_func(self):
         course_id = self.kwargs["course_id"]
         course = get_object_or_404(Course, id=course_id)
-        return (
-            self.request.user == course.creator
-            or self.request.user in course.collaborators.all()
-        )
+        return course.can_edit(self.request.user)
 
     def form_valid(self, form):
         course_id = self.kwargs["course_id"]
         form.instance.course = get_object_or_404(Course, id=course_id)
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        record("create", self.object, self.request.user, form_changes(form, False))
+        return response
 
     def get_success_url(self):
         return reverse("course-detail", kwargs={"pk": self.object.course.pk})
@@ -168,15 +320,18 @@ class LessonUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     def test_func(self):
         lesson = self.get_object()
         course = lesson.course
-        return (
-            self.request.user == course.creator
-            or self.request.user in course.collaborators.all()
-        )
+        return course.can_edit(self.request.user)
 
     def get_object(self, queryset=None):
         lesson_id = self.kwargs.get("lesson_id")
         return get_object_or_404(Lesson, id=lesson_id)
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if form.has_changed():
+            record("update", self.object, self.request.user, form_changes(form))
+        return response
+
     def get_success_url(self):
         return reverse("course-detail", kwargs={"pk": self.object.course.pk})
 
@@ -190,6 +345,15 @@ class LessonDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         course = lesson.course
         return self.request.user == course.creator  # collaborators cannot delete
 
+    def get_object(self, queryset=None):
+        return get_object_or_404(
+            Lesson, id=self.kwargs["lesson_id"], course_id=self.kwargs["course_id"]
+        )
+
+    def form_valid(self, form):
+        record("delete", self.object, self.request.user)
+        return super().form_valid(form)
+
     def get_success_url(self):
         return reverse("course-detail", kwargs={"pk": self.object.course.pk})
 
@@ -307,14 +471,16 @@ class ManageCollaboratorsView(LoginRequiredMixin, UserPassesTestMixin, UpdateVie
 # JSON endpoint for autocomplete
 
 
-@require_GET
-def user_autocomplete(request):
+@rate_limit("autocomplete")
+@asyncviews.require_GET
+async def user_autocomplete(request):
     query = request.GET.get("q", "").strip()
     results = []
     if query:
+        user = await asyncviews.auser(request)
         qs = User.objects.filter(
             Q(username__icontains=query) | Q(id__iexact=query)
-        ).exclude(pk=request.user.pk)[:10]
+        ).exclude(pk=user.pk)[:10]
 
         results = [
             {
@@ -323,6 +489,142 @@ def user_autocomplete(request):
                 "username": u.username,
                 "profile_picture": u.profile_picture or "/static/default_avatar.png",
             }
-            for u in qs
+            async for u in qs.aiterator()
         ]
     return JsonResponse(results, safe=False)
+
+
+@rate_limit("autocomplete")
+@asyncviews.require_GET
+async def tag_autocomplete(request):
+    vocabulary = await tags.avocabulary()
+    return JsonResponse(
+        {"tags": vocabulary.prefix(request.GET.get("q", ""))},
+        headers={"Cache-Control": "private, max-age=60"},
+    )
+
+
+# Lesson attachments
+
+
+def attachment_json(attachment):
+    return {
+        "id": attachment.id,
+        "filename": attachment.filename,
+        "size": attachment.blob.size,
+        "sha256": attachment.blob.sha256,
+        "url": reverse("attachment-download", kwargs={"attachment_id": attachment.id}),
+    }
+
+
+@login_required
+@require_POST
+def attachment_upload_create(request, course_id, lesson_id):
+    """Start a resumable upload; the file itself is sent to the returned url."""
+    lesson = get_object_or_404(
+        Lesson.objects.select_related("course").only("course"),
+        id=lesson_id,
+        course_id=course_id,
+    )
+    course = lesson.course
+    if not course.can_edit(request.user):
+        raise PermissionDenied
+
+    try:
+        filename = request.POST["filename"].strip()[:255]
+        size = int(request.POST["size"])
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "filename and size are required"}, status=400)
+    if not filename or size < 0:
+        return JsonResponse({"error": "invalid filename or size"}, status=400)
+    if size > settings.ATTACHMENT_MAX_SIZE:
+        return JsonResponse({"error": "file too large"}, status=413)
+
+    upload = AttachmentUpload.objects.create(
+        lesson=lesson,
+        filename=filename,
+        content_type=request.POST.get("content_type") or "application/octet-stream",
+        size=size,
+        uploaded_by=request.user,
+    )
+    if size == 0:
+        with transaction.atomic():
+            attachment = attachments.finalize(upload)
+        return JsonResponse(attachment_json(attachment), status=201)
+    return JsonResponse(
+        {
+            "id": str(upload.id),
+            "offset": 0,
+            "size": size,
+            "url": reverse("attachment-upload", kwargs={"upload_id": upload.id}),
+        },
+        status=201,
+    )
+
+
+@login_required
+@require_http_methods(["GET", "HEAD", "PATCH", "DELETE"])
+def attachment_upload(request, upload_id):
+    """
+    GET reports how much of the upload the server has, PATCH appends the
+    request body at the `Upload-Offset` header (which must match it), DELETE
+    abandons the upload. The request body is streamed straight to disk, and
+    the PATCH that completes the upload creates the attachment. Once it
+    exists GET includes it and PATCH returns it again, for clients retrying
+    a completing request whose response they missed.
+    """
+    upload = get_object_or_404(AttachmentUpload, id=upload_id, uploaded_by=request.user)
+    if request.method in ("GET", "HEAD"):
+        data = {"offset": upload.received, "size": upload.size}
+        if upload.attachment_id:
+            data["attachment"] = attachment_json(upload.attachment)
+        return JsonResponse(data)
+    if request.method == "DELETE":
+        if upload.attachment_id:
+            return JsonResponse({"error": "upload is complete"}, status=409)
+        attachments.discard_upload(upload)
+        return HttpResponse(status=204)
+
+    try:
+        offset = int(request.headers["Upload-Offset"])
+        # No Content-Length, no body
+        length = int(request.headers.get("Content-Length") or 0)
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {"error": "Upload-Offset is required, Content-Length must be valid"},
+            status=400,
+        )
+
+    with transaction.atomic():
+        # Concurrent requests for the upload wait here for each other
+        upload = AttachmentUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.attachment_id:
+            return JsonResponse(attachment_json(upload.attachment))
+        if offset != upload.received:
+            return JsonResponse(
+                {"error": "offset mismatch", "offset": upload.received}, status=409
+            )
+        if offset + length > upload.size:
+            return JsonResponse({"error": "chunk exceeds file size"}, status=400)
+        # An empty body only retries the completion of a sent file
+        if length == 0 and upload.received < upload.size:
+            return JsonResponse({"error": "empty chunk"}, status=400)
+        upload.received += attachments.write_chunk(upload, request, length)
+        upload.save(update_fields=["received"])
+        if upload.received < upload.size:
+            return JsonResponse({"offset": upload.received, "size": upload.size})
+        attachment = attachments.finalize(upload)
+    return JsonResponse(attachment_json(attachment), status=201)
+
+
+@require_GET
+def attachment_download(request, attachment_id):
+    attachment = get_object_or_404(
+        LessonAttachment.objects.select_related("blob", "lesson__course"),
+        id=attachment_id,
+    )
+    course = attachment.lesson.course
+    public = course.status == "pub"
+    if not course.can_view(request.user):
+        raise PermissionDenied
+    return attachments.serve(request, attachment, public)
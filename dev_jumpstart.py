@@ -15,6 +15,7 @@ PY_DEPS = [
     "django-widget-tweaks>=1.5",
     "psycopg2-binary>=2.9",
     "whitenoise>=6.4",
+    "numpy>=1.26",
     "pytest",
     "pytest-django",
     "black",
@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import ChangeHistory
+
+
+@admin.register(ChangeHistory)
+class ChangeHistoryAdmin(admin.ModelAdmin):
+    list_display = ("timestamp", "action", "object_type", "object_repr", "user_repr")
+    list_filter = ("action", "object_type")
+    search_fields = ("object_repr", "user_repr")
+
+    # Entries are immutable (also enforced by database triggers)
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:34
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeHistory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("course_id", models.BigIntegerField()),
+                (
+                    "object_type",
+                    models.CharField(
+                        choices=[("course", "Course"), ("lesson", "Lesson")],
+                        max_length=10,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                ("object_repr", models.CharField(max_length=200)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("create", "Create"),
+                            ("update", "Update"),
+                            ("delete", "Delete"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("user_id", models.BigIntegerField(null=True)),
+                ("user_repr", models.CharField(blank=True, max_length=200)),
+                ("timestamp", models.DateTimeField()),
+                (
+                    "changes",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Change history",
+                "db_table": "study_change_history",
+                "indexes": [
+                    models.Index(
+                        fields=["course_id", "-timestamp"],
+                        name="history_course_time_idx",
+                    )
+                ],
+            },
+        ),
+    ]
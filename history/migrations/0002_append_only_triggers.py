@@ -0,0 +1,50 @@
+from django.db import migrations
+
+TABLE = "study_change_history"
+
+SQLITE = [f"""
+    CREATE TRIGGER {TABLE}_no_{op.lower()} BEFORE {op} ON {TABLE}
+    BEGIN SELECT RAISE(ABORT, 'change history is append-only'); END
+    """ for op in ("UPDATE", "DELETE")]
+
+POSTGRESQL = [
+    f"""
+    CREATE FUNCTION {TABLE}_append_only() RETURNS trigger AS $$
+    BEGIN
+        RAISE EXCEPTION 'change history is append-only';
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE TRIGGER {TABLE}_append_only BEFORE UPDATE OR DELETE ON {TABLE}
+    FOR EACH ROW EXECUTE FUNCTION {TABLE}_append_only()
+    """,
+]
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {"sqlite": SQLITE, "postgresql": POSTGRESQL}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for op in ("update", "delete"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLE}_no_{op}")
+    elif vendor == "postgresql":
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLE}_append_only ON {TABLE}")
+        schema_editor.execute(f"DROP FUNCTION IF EXISTS {TABLE}_append_only()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("history", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
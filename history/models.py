@@ -0,0 +1,37 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class ChangeHistory(models.Model):
+    """
+    Immutable record of a change to a course or one of its lessons.
+
+    Rows are insert-only: database triggers reject UPDATE and DELETE, so even
+    admins can't rewrite history. References are plain integers (not foreign
+    keys) so entries outlive the objects and users they mention.
+    """
+
+    ACTIONS = [("create", "Create"), ("update", "Update"), ("delete", "Delete")]
+    OBJECT_TYPES = [("course", "Course"), ("lesson", "Lesson")]
+
+    course_id = models.BigIntegerField()
+    object_type = models.CharField(max_length=10, choices=OBJECT_TYPES)
+    object_id = models.BigIntegerField()
+    object_repr = models.CharField(max_length=200)
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    user_id = models.BigIntegerField(null=True)
+    user_repr = models.CharField(max_length=200, blank=True)
+    timestamp = models.DateTimeField()
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        db_table = "study_change_history"
+        verbose_name_plural = "Change history"
+        indexes = [
+            models.Index(
+                fields=["course_id", "-timestamp"], name="history_course_time_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.object_type} {self.object_repr}"
@@ -0,0 +1,77 @@
+"""
+Recording change history off the request path.
+
+Views call record() with the changes they made. The entry is only queued once
+the surrounding transaction commits, and queued entries are bulk inserted in
+batches by a BatchBuffer. Entries still queued when a process dies are lost.
+"""
+
+import difflib
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from LibreCourse.buffering import BatchBuffer
+from history.models import ChangeHistory
+
+# Text values longer than this are stored as a unified diff
+DIFF_THRESHOLD = 200
+
+
+def compact(before, after):
+    """Change of one field as [before, after], or a text diff for long text."""
+    if (
+        isinstance(before, str)
+        and isinstance(after, str)
+        and max(len(before), len(after)) > DIFF_THRESHOLD
+    ):
+        diff = difflib.unified_diff(
+            before.splitlines(), after.splitlines(), n=1, lineterm=""
+        )
+        # Drop the ---/+++ file headers
+        return {"diff": "\n".join(list(diff)[2:])}
+    return [before, after]
+
+
+def form_changes(form, initial=True):
+    """Changes made through a bound, valid form."""
+    changes = {}
+    names = form.changed_data if initial else form.fields
+    for name in names:
+        before = (
+            form.get_initial_for_field(form.fields[name], name) if initial else None
+        )
+        after = form.cleaned_data.get(name)
+        if hasattr(after, "pk"):
+            after = after.pk
+        changes[name] = compact(before, after)
+    return changes
+
+
+def write_entries(entries):
+    ChangeHistory.objects.bulk_create(entries)
+
+
+buffer = BatchBuffer(
+    write_entries,
+    max_items=settings.HISTORY_FLUSH_ENTRIES,
+    max_age=settings.HISTORY_FLUSH_SECONDS,
+)
+
+
+def record(action, obj, user, changes=None):
+    """Queue a history entry for `obj` (a Course or Lesson)."""
+    object_type = obj._meta.model_name
+    entry = ChangeHistory(
+        course_id=obj.pk if object_type == "course" else obj.course_id,
+        object_type=object_type,
+        object_id=obj.pk,
+        object_repr=str(getattr(obj, "title", obj))[:200],
+        action=action,
+        user_id=user.pk if user.is_authenticated else None,
+        user_repr=getattr(user, "display_name", "")[:200],
+        timestamp=timezone.now(),
+        changes=changes or {},
+    )
+    transaction.on_commit(lambda: buffer.append(entry))
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path("<int:pk>/history/", views.CourseHistoryView.as_view(), name="course-history"),
+]
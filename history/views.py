@@ -0,0 +1,32 @@
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.shortcuts import get_object_or_404
+from django.views.generic import ListView
+
+from courses.models import Course
+from history.models import ChangeHistory
+
+
+class CourseHistoryView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    template_name = "history/course_history.html"
+    context_object_name = "entries"
+    paginate_by = 25
+
+    def get_course(self):
+        if not hasattr(self, "course"):
+            self.course = get_object_or_404(Course, pk=self.kwargs["pk"])
+        return self.course
+
+    def test_func(self):
+        course = self.get_course()
+        return course.can_edit(self.request.user)
+
+    def get_queryset(self):
+        # Served by the (course_id, -timestamp) index
+        return ChangeHistory.objects.filter(course_id=self.get_course().pk).order_by(
+            "-timestamp", "-id"
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["course"] = self.get_course()
+        return context
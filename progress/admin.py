@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Enrollment
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(admin.ModelAdmin):
+    list_display = ("user", "course", "completed_count", "updated_at")
+    search_fields = ("user__email", "course__title")
+    readonly_fields = ("completed", "completed_count", "created_at", "updated_at")
@@ -0,0 +1,22 @@
+"""Helpers for the per-enrollment completion bitmaps."""
+
+# Positions beyond this are ignored (8 KB of bitmap per enrollment)
+MAX_POSITION = 65536
+
+
+def set_positions(bitmap, positions):
+    """Return `bitmap` (bytes) with the bits for `positions` set."""
+    bits = int.from_bytes(bitmap, "little")
+    for position in positions:
+        if 1 <= position <= MAX_POSITION:
+            bits |= 1 << (position - 1)
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def count(bitmap):
+    return int.from_bytes(bitmap, "little").bit_count()
+
+
+def positions(bitmap):
+    bits = int.from_bytes(bitmap, "little")
+    return {i + 1 for i in range(bits.bit_length()) if bits >> i & 1}
@@ -0,0 +1,108 @@
+"""
+Buffered write path for lesson progress.
+
+Marking a lesson complete only records (user, course, position) in an
+in-process BatchBuffer (see LibreCourse.buffering). It is flushed once it
+holds PROGRESS_FLUSH_MARKS marks or its oldest mark is PROGRESS_FLUSH_SECONDS
+old: all marks for the same enrollment are merged into its bitmap and every
+touched enrollment is written back with a single bulk UPDATE.
+
+Marks still in the buffer are lost if the process dies, which is acceptable
+for progress; they are also merged into reads from the same process so a
+learner always sees their own marks.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from LibreCourse.buffering import BatchBuffer
+from analytics.events import track
+from analytics.models import EventKind
+from progress import bitmap
+from progress.models import Enrollment
+
+
+def write_marks(marks):
+    """Merge (user_id, course_id, position) marks into the enrollment bitmaps."""
+    batch = defaultdict(set)
+    for user_id, course_id, position in marks:
+        batch[(user_id, course_id)].add(position)
+    user_ids = {user_id for user_id, _ in batch}
+    course_ids = {course_id for _, course_id in batch}
+    now = timezone.now()
+    with transaction.atomic():
+        Enrollment.objects.bulk_create(
+            [Enrollment(user_id=u, course_id=c) for u, c in batch],
+            ignore_conflicts=True,
+        )
+        enrollments = Enrollment.objects.select_for_update().filter(
+            user_id__in=user_ids, course_id__in=course_ids
+        )
+        changed = []
+        for enrollment in enrollments:
+            positions = batch.get((enrollment.user_id, enrollment.course_id))
+            if not positions:
+                continue
+            if enrollment.created_at >= now:
+                # Created by the bulk_create above
+                track(EventKind.ENROLLMENT, enrollment.course_id)
+            completed = bitmap.set_positions(bytes(enrollment.completed), positions)
+            if completed == bytes(enrollment.completed):
+                continue
+            enrollment.completed = completed
+            enrollment.completed_count = bitmap.count(completed)
+            enrollment.updated_at = now
+            changed.append(enrollment)
+        Enrollment.objects.bulk_update(
+            changed, ["completed", "completed_count", "updated_at"]
+        )
+
+
+buffer = BatchBuffer(
+    write_marks,
+    max_items=settings.PROGRESS_FLUSH_MARKS,
+    max_age=settings.PROGRESS_FLUSH_SECONDS,
+)
+
+
+def mark_complete(user, lesson):
+    buffer.append((user.pk, lesson.course_id, lesson.position))
+
+
+def percent_complete(user, course):
+    """Percent of `course` completed by `user`, including unflushed marks."""
+    if not user.is_authenticated or not course.lesson_count:
+        return 0
+    enrollment = (
+        Enrollment.objects.filter(user=user, course=course)
+        .only("completed", "completed_count")
+        .first()
+    )
+    return merge_pending(user, course, enrollment)
+
+
+async def apercent_complete(user, course):
+    if not user.is_authenticated or not course.lesson_count:
+        return 0
+    enrollment = (
+        await Enrollment.objects.filter(user=user, course=course)
+        .only("completed", "completed_count")
+        .afirst()
+    )
+    return merge_pending(user, course, enrollment)
+
+
+def merge_pending(user, course, enrollment):
+    completed = bytes(enrollment.completed) if enrollment else b""
+    done = enrollment.completed_count if enrollment else 0
+    pending = {
+        position
+        for user_id, course_id, position in buffer.pending()
+        if user_id == user.pk and course_id == course.pk
+    }
+    if pending:
+        done = bitmap.count(bitmap.set_positions(completed, pending))
+    return min(100, round(100 * done / course.lesson_count))
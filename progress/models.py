@@ -0,0 +1,40 @@
+from django.db import models
+from courses.models import Course
+from users.models import User
+
+
+class Enrollment(models.Model):
+    """
+    A learner's progress through a course.
+
+    `completed` is a bitmap: bit (position - 1) is set once the lesson at that
+    position has been completed. `completed_count` caches its population count
+    so percent complete is a single division.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="enrollments")
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name="enrollments"
+    )
+    completed = models.BinaryField(default=bytes)
+    completed_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "study_enrollments"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "course"], name="unique_enrollment_user_course"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.course}"
+
+    def percent_complete(self, lesson_count=None):
+        if lesson_count is None:
+            lesson_count = self.course.lesson_count
+        if not lesson_count:
+            return 0
+        return min(100, round(100 * self.completed_count / lesson_count))
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path("<int:lesson_id>/", views.complete_lesson, name="lesson-complete"),
+]
@@ -0,0 +1,28 @@
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_POST
+
+from courses.models import Lesson
+from progress.buffer import mark_complete, percent_complete
+
+
+@login_required
+@require_POST
+def complete_lesson(request, lesson_id):
+    lesson = get_object_or_404(
+        Lesson.objects.select_related("course").only(
+            "position",
+            "course",
+            "course__lesson_count",
+            "course__status",
+            "course__creator",
+        ),
+        id=lesson_id,
+    )
+    if not lesson.course.can_view(request.user):
+        raise Http404("No lesson found matching the query")
+    mark_complete(request.user, lesson)
+    return JsonResponse(
+        {"percent_complete": percent_complete(request.user, lesson.course)}
+    )
@@ -0,0 +1,26 @@
+from django.contrib import admin
+from .models import CourseQuizStats, Question, Quiz, QuizSubmission
+
+
+class QuestionInline(admin.StackedInline):
+    model = Question
+    extra = 1
+
+
+@admin.register(Quiz)
+class QuizAdmin(admin.ModelAdmin):
+    list_display = ("title", "course", "created_at")
+    search_fields = ("title", "course__title")
+    inlines = [QuestionInline]
+
+
+@admin.register(QuizSubmission)
+class QuizSubmissionAdmin(admin.ModelAdmin):
+    list_display = ("quiz", "user", "status", "score", "max_score", "submitted_at")
+    list_filter = ("status",)
+    readonly_fields = ("score", "max_score", "submitted_at", "graded_at")
+
+
+@admin.register(CourseQuizStats)
+class CourseQuizStatsAdmin(admin.ModelAdmin):
+    list_display = ("course", "graded_submissions", "mean_percent", "updated_at")
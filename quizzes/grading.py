@@ -0,0 +1,118 @@
+"""
+Batch quiz grading.
+
+A quiz's answer key becomes two arrays (correct choice index and points per
+question) and a batch of submissions becomes an (n_submissions, n_questions)
+matrix of chosen indexes, -1 where a question was left unanswered. Grading
+the whole batch is then a single comparison and a weighted row sum.
+Questions without an answer key score nothing and don't count towards the
+maximum score.
+"""
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from quizzes.models import CourseQuizStats, Question, Quiz, QuizSubmission
+
+UNANSWERED = -1
+
+
+class AnswerKey:
+    def __init__(self, question_ids, answers, points):
+        self.question_ids = list(question_ids)
+        self.index = {qid: i for i, qid in enumerate(self.question_ids)}
+        self.answers = np.asarray(answers, dtype=np.int16)
+        self.points = np.where(
+            self.answers == UNANSWERED, 0, np.asarray(points, dtype=np.int32)
+        )
+        self.max_score = int(self.points.sum())
+
+    @classmethod
+    def for_quiz(cls, quiz):
+        rows = list(
+            Question.objects.filter(quiz=quiz)
+            .order_by("position", "pk")
+            .values_list("pk", "data", "points")
+        )
+        return cls(
+            [pk for pk, _, _ in rows],
+            [int(data.get("answer", UNANSWERED)) for _, data, _ in rows],
+            [points for _, _, points in rows],
+        )
+
+    def encode(self, submissions):
+        """Matrix of chosen answers, one row per answers dict."""
+        matrix = np.full(
+            (len(submissions), len(self.question_ids)), UNANSWERED, dtype=np.int16
+        )
+        for row, answers in enumerate(submissions):
+            for qid, choice in answers.items():
+                col = self.index.get(int(qid))
+                if col is not None:
+                    try:
+                        matrix[row, col] = int(choice)
+                    except (TypeError, ValueError, OverflowError):
+                        pass
+        return matrix
+
+    def grade(self, matrix):
+        """Score of every row of `matrix`."""
+        return ((matrix == self.answers) & (matrix != UNANSWERED)) @ self.points
+
+
+def claim_pending(quiz_id, limit):
+    """Lock a batch of pending submissions, skipping ones other graders hold."""
+    queryset = QuizSubmission.objects.filter(
+        quiz_id=quiz_id, status=QuizSubmission.PENDING
+    ).order_by("pk")
+    if connection.features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True)
+    return list(queryset.only("pk", "answers")[:limit])
+
+
+def grade_quiz(quiz, batch_size=10000):
+    """Grade one batch of the quiz's pending submissions; returns how many."""
+    key = AnswerKey.for_quiz(quiz)
+    with transaction.atomic():
+        submissions = claim_pending(quiz.pk, batch_size)
+        if not submissions:
+            return 0
+        scores = key.grade(key.encode([s.answers for s in submissions]))
+        now = timezone.now()
+        for submission, score in zip(submissions, scores.tolist()):
+            submission.score = score
+            submission.max_score = key.max_score
+            submission.status = QuizSubmission.GRADED
+            submission.graded_at = now
+        QuizSubmission.objects.bulk_update(
+            submissions,
+            ["score", "max_score", "status", "graded_at"],
+            batch_size=1000,
+        )
+
+        percent_sum = (
+            float((100.0 * scores / key.max_score).sum()) if key.max_score else 0.0
+        )
+        CourseQuizStats.objects.get_or_create(course_id=quiz.course_id)
+        CourseQuizStats.objects.filter(course_id=quiz.course_id).update(
+            graded_submissions=F("graded_submissions") + len(submissions),
+            percent_sum=F("percent_sum") + percent_sum,
+            updated_at=now,
+        )
+    return len(submissions)
+
+
+def grade_pending(batch_size=10000):
+    """Grade everything queued; returns the number of submissions graded."""
+    graded = 0
+    quiz_ids = (
+        QuizSubmission.objects.filter(status=QuizSubmission.PENDING)
+        .values_list("quiz_id", flat=True)
+        .distinct()
+    )
+    for quiz in Quiz.objects.filter(pk__in=list(quiz_ids)):
+        while count := grade_quiz(quiz, batch_size):
+            graded += count
+    return graded
@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from quizzes.grading import AnswerKey
+
+
+class Command(BaseCommand):
+    help = "Benchmark vectorized grading against a per-submission Python loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--submissions", type=int, default=100_000)
+        parser.add_argument("--questions", type=int, default=40)
+        parser.add_argument("--choices", type=int, default=4)
+
+    def handle(self, *args, **options):
+        n, q = options["submissions"], options["questions"]
+        rng = np.random.default_rng(0)
+        key = AnswerKey(
+            range(1, q + 1),
+            rng.integers(0, options["choices"], q),
+            rng.integers(1, 4, q),
+        )
+        # Answers as they are stored: {question_id: choice}, some skipped
+        chosen = rng.integers(-1, options["choices"], (n, q))
+        submissions = [
+            {str(qid + 1): int(c) for qid, c in enumerate(row) if c >= 0}
+            for row in chosen
+        ]
+
+        start = time.perf_counter()
+        matrix = key.encode(submissions)
+        encoded = time.perf_counter()
+        scores = key.grade(matrix)
+        graded = time.perf_counter()
+
+        answers = dict(zip(key.question_ids, key.answers.tolist()))
+        points = dict(zip(key.question_ids, key.points.tolist()))
+        start_loop = time.perf_counter()
+        loop_scores = [
+            sum(
+                points[int(qid)]
+                for qid, choice in submission.items()
+                if answers[int(qid)] == choice
+            )
+            for submission in submissions
+        ]
+        looped = time.perf_counter()
+        assert loop_scores == scores.tolist()
+
+        self.stdout.write(f"{n} submissions x {q} questions")
+        self.stdout.write(f"Encode:          {(encoded - start) * 1000:8.1f} ms")
+        self.stdout.write(f"Grade (NumPy):   {(graded - encoded) * 1000:8.1f} ms")
+        self.stdout.write(f"Grade (loop):    {(looped - start_loop) * 1000:8.1f} ms")
+        self.stdout.write(
+            f"Throughput:      {n / (graded - start):,.0f} submissions/s "
+            f"(encode + grade)"
+        )
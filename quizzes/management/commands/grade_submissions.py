@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quizzes.grading import grade_pending
+
+
+class Command(BaseCommand):
+    help = "Grade queued quiz submissions in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--loop",
+            type=float,
+            metavar="SECONDS",
+            help="Keep running, polling the queue every SECONDS.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            graded = grade_pending(options["batch_size"])
+            if graded or options["verbosity"] > 1:
+                self.stdout.write(f"Graded {graded} submissions.")
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
@@ -0,0 +1,117 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+from courses.models import Course
+from users.models import User
+
+
+class Quiz(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="quizzes")
+    title = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Quizzes"
+
+    def __str__(self):
+        return self.title
+
+
+class Question(models.Model):
+    """
+    A gradable question. `data` holds the type-specific payload:
+    multiple choice: {"choices": ["a", "b", ...], "answer": <choice index>}
+    true/false:      {"answer": true|false}
+    """
+
+    MULTIPLE_CHOICE = "mc"
+    TRUE_FALSE = "tf"
+    TYPES = [(MULTIPLE_CHOICE, "Multiple choice"), (TRUE_FALSE, "True/False")]
+
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="questions")
+    position = models.PositiveIntegerField(default=1)
+    type = models.CharField(max_length=2, choices=TYPES, default=MULTIPLE_CHOICE)
+    prompt = models.TextField()
+    data = models.JSONField(default=dict)
+    points = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        ordering = ["position"]
+
+    def __str__(self):
+        return self.prompt[:50]
+
+    def clean(self):
+        # Without an answer the grader can't score the question
+        answer = self.data.get("answer") if isinstance(self.data, dict) else None
+        if self.type == self.TRUE_FALSE:
+            valid = isinstance(answer, bool)
+        else:
+            valid = (
+                isinstance(answer, int)
+                and not isinstance(answer, bool)
+                and 0 <= answer < len(self.choices)
+            )
+        if not valid:
+            raise ValidationError({"data": "Set the correct answer."})
+
+    @property
+    def choices(self):
+        if self.type == self.TRUE_FALSE:
+            return ["False", "True"]
+        return self.data.get("choices", [])
+
+    @property
+    def answer_index(self):
+        """Correct answer as a choice index (True/False map to 1/0)."""
+        return int(self.data.get("answer", -1))
+
+
+class QuizSubmission(models.Model):
+    """
+    A learner's answers, queued as "pending" until a grader picks it up.
+    `answers` maps question ids to the chosen choice index.
+    """
+
+    PENDING = "pending"
+    GRADED = "graded"
+    STATUSES = [(PENDING, "Pending"), (GRADED, "Graded")]
+
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="submissions")
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="quiz_submissions"
+    )
+    answers = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    score = models.PositiveIntegerField(null=True, blank=True)
+    max_score = models.PositiveIntegerField(null=True, blank=True)
+    submitted_at = models.DateTimeField(auto_now_add=True)
+    graded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "quiz"], name="submission_queue_idx"),
+        ]
+
+    @property
+    def percent(self):
+        if not self.max_score:
+            return 0
+        return round(100 * self.score / self.max_score)
+
+
+class CourseQuizStats(models.Model):
+    """Running score aggregates over all graded submissions of a course."""
+
+    course = models.OneToOneField(
+        Course, on_delete=models.CASCADE, primary_key=True, related_name="quiz_stats"
+    )
+    graded_submissions = models.PositiveIntegerField(default=0)
+    percent_sum = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def mean_percent(self):
+        if not self.graded_submissions:
+            return 0
+        return self.percent_sum / self.graded_submissions
@@ -0,0 +1,20 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path(
+        "<int:course_id>/quizzes/<int:quiz_id>/",
+        views.QuizDetailView.as_view(),
+        name="quiz-detail",
+    ),
+    path(
+        "<int:course_id>/quizzes/<int:quiz_id>/submissions/<int:submission_id>/",
+        views.SubmissionDetailView.as_view(),
+        name="quiz-submission",
+    ),
+    path(
+        "<int:course_id>/quizzes/<int:quiz_id>/submissions/<int:submission_id>/status/",
+        views.submission_status,
+        name="quiz-submission-status",
+    ),
+]
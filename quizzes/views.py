@@ -0,0 +1,87 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.utils.translation import gettext_lazy as _
+from django.views.generic import DetailView
+
+from quizzes.models import Quiz, QuizSubmission
+
+
+class QuizDetailView(LoginRequiredMixin, DetailView):
+    """
+    Shows a quiz and queues submissions for the batch grader; the request
+    returns as soon as the answers are stored.
+    """
+
+    template_name = "quizzes/quiz_detail.html"
+    pk_url_kwarg = "quiz_id"
+
+    def get_queryset(self):
+        return Quiz.objects.filter(course_id=self.kwargs["course_id"]).select_related(
+            "course"
+        )
+
+    def get_object(self, queryset=None):
+        quiz = super().get_object(queryset)
+        # Quizzes of a draft or private course don't exist for others
+        if not quiz.course.can_view(self.request.user):
+            raise Http404(_("No quiz found matching the query"))
+        return quiz
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["questions"] = self.object.questions.all()
+        context["submissions"] = self.object.submissions.filter(
+            user=self.request.user
+        ).order_by("-submitted_at")[:10]
+        return context
+
+    def post(self, request, *args, **kwargs):
+        quiz = self.get_object()
+        answers = {}
+        for question_id in quiz.questions.values_list("pk", flat=True):
+            choice = request.POST.get(f"question-{question_id}", "")
+            if choice.isdigit():
+                answers[str(question_id)] = int(choice)
+        submission = QuizSubmission.objects.create(
+            quiz=quiz, user=request.user, answers=answers
+        )
+        return redirect(
+            "quiz-submission", quiz.course_id, quiz.pk, submission.pk, permanent=False
+        )
+
+
+class SubmissionDetailView(LoginRequiredMixin, DetailView):
+    template_name = "quizzes/submission_detail.html"
+    context_object_name = "submission"
+    pk_url_kwarg = "submission_id"
+
+    def get_queryset(self):
+        return QuizSubmission.objects.filter(
+            user=self.request.user,
+            quiz_id=self.kwargs["quiz_id"],
+            quiz__course_id=self.kwargs["course_id"],
+        ).select_related("quiz")
+
+
+def submission_status(request, course_id, quiz_id, submission_id):
+    """Polled by the result page until the grader has scored the submission."""
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    submission = get_object_or_404(
+        QuizSubmission.objects.only("status", "score", "max_score"),
+        pk=submission_id,
+        user=request.user,
+        quiz_id=quiz_id,
+        quiz__course_id=course_id,
+    )
+    if submission.status == QuizSubmission.PENDING:
+        return JsonResponse({"status": submission.status}, status=202)
+    return JsonResponse(
+        {
+            "status": submission.status,
+            "score": submission.score,
+            "max_score": submission.max_score,
+            "percent": submission.percent,
+        }
+    )
@@ -0,0 +1,115 @@
+"""
+Token bucket rate limits for views.
+
+RATE_LIMITS maps a limit name to {"rate": "10/m", "burst": 10, "key": "ip"}:
+every request takes a token from a bucket that refills at `rate` and holds
+up to `burst` tokens. `key` says whose bucket it is: "ip", or "user" for the
+logged-in user's id as stored in the session (the user isn't loaded), with
+anonymous visitors falling back to their IP. Names missing from RATE_LIMITS
+aren't limited.
+
+A request over the limit is answered with 429 and Retry-After before the
+view runs, so it costs no queries (with the "local" or "cache" storage and
+"ip" keys) and, on the auth views, no password hashing.
+"""
+
+import functools
+import math
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.http import HttpResponse
+
+from ratelimit.storage import get_storage
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(value):
+    """Tokens per second from "<count>/<s|m|h|d>"."""
+    count, _, period = value.partition("/")
+    return int(count) / PERIODS[period]
+
+
+def client_ip(request):
+    # Behind RATE_LIMIT_PROXIES trusted proxies, the address the farthest
+    # of them saw is that many entries from the end of X-Forwarded-For
+    proxies = settings.RATE_LIMIT_PROXIES
+    if proxies:
+        forwarded = [
+            ip.strip()
+            for ip in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+            if ip.strip()
+        ]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def bucket_key(name, limit, request):
+    if limit.get("key") == "user" and hasattr(request, "session"):
+        user_id = request.session.get(SESSION_KEY)
+        if user_id:
+            return f"{name}:user:{user_id}"
+    return f"{name}:ip:{client_ip(request)}"
+
+
+def too_many_requests(wait):
+    return HttpResponse(
+        "Too many requests, try again later.",
+        status=429,
+        content_type="text/plain",
+        headers={"Retry-After": str(math.ceil(wait))},
+    )
+
+
+def rate_limit(name, methods=None):
+    """
+    Apply the RATE_LIMITS[name] limit to a view (sync or async), optionally
+    only to requests with one of `methods`.
+    """
+
+    def applies(request):
+        limit = settings.RATE_LIMITS.get(name)
+        if limit and (methods is None or request.method in methods):
+            return limit
+        return None
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                limit = applies(request)
+                if limit:
+                    if limit.get("key") == "user":
+                        # Reading the session may query the database
+                        key = await sync_to_async(bucket_key)(name, limit, request)
+                    else:
+                        key = bucket_key(name, limit, request)
+                    wait = await get_storage().aconsume(
+                        key, parse_rate(limit["rate"]), limit["burst"]
+                    )
+                    if wait:
+                        return too_many_requests(wait)
+                return await view(request, *args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limit = applies(request)
+            if limit:
+                wait = get_storage().consume(
+                    bucket_key(name, limit, request),
+                    parse_rate(limit["rate"]),
+                    limit["burst"],
+                )
+                if wait:
+                    return too_many_requests(wait)
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
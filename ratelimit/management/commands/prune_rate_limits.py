@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ratelimit.limits import parse_rate
+from ratelimit.models import TokenBucket
+from ratelimit.storage import idle_expiry
+
+
+class Command(BaseCommand):
+    help = "Delete database token buckets idle long enough to be full again."
+
+    def handle(self, *args, **options):
+        # The slowest limit to refill decides when any bucket is surely full
+        expiry = max(
+            (
+                idle_expiry(parse_rate(limit["rate"]), limit["burst"])
+                for limit in settings.RATE_LIMITS.values()
+            ),
+            default=0,
+        )
+        deleted, _ = TokenBucket.objects.filter(
+            updated__lt=time.time() - expiry
+        ).delete()
+        self.stdout.write(f"Deleted {deleted} idle buckets")
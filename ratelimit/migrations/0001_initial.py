@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="TokenBucket",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=200, primary_key=True, serialize=False),
+                ),
+                ("tokens", models.FloatField()),
+                ("updated", models.FloatField(db_index=True)),
+            ],
+            options={
+                "db_table": "ratelimit_token_buckets",
+            },
+        ),
+    ]
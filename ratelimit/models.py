@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class TokenBucket(models.Model):
+    """A token bucket kept in the database (RATE_LIMIT_STORAGE = "db")."""
+
+    key = models.CharField(max_length=200, primary_key=True)
+    tokens = models.FloatField()
+    # Unix time of the last refill
+    updated = models.FloatField(db_index=True)
+
+    class Meta:
+        db_table = "ratelimit_token_buckets"
@@ -0,0 +1,113 @@
+"""
+Where token buckets live between requests.
+
+Every storage implements consume(key, rate, burst): take one token from the
+bucket (refilled at `rate` tokens per second up to `burst` since it was last
+seen) and return 0 when one was available, or else the seconds until one
+will be. A bucket that has been idle long enough to refill completely is
+the same as a missing one, so storages are free to forget it.
+
+- "local": a dict per process. Nothing leaves the process, but limits apply
+  per worker.
+- "cache": the default Django cache. Shared when the cache is; the
+  read-modify-write isn't atomic, so concurrent requests can occasionally
+  take one token too many.
+- "db": a row per bucket, updated under SELECT ... FOR UPDATE. Exact, at
+  the price of a write per request; `manage.py prune_rate_limits` deletes
+  full buckets.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ratelimit.models import TokenBucket
+
+
+def take(state, now, rate, burst):
+    """(new state, seconds to wait) for a (tokens, updated) state or None."""
+    tokens, updated = state if state is not None else (burst, now)
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / rate
+
+
+def idle_expiry(rate, burst):
+    """Seconds after which an untouched bucket is full again."""
+    return math.ceil(burst / rate) + 1
+
+
+class LocalStorage:
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def consume(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            state, wait = take(self.buckets.pop(key, None), now, rate, burst)
+            self.buckets[key] = state
+            while len(self.buckets) > self.max_entries:
+                # Least recently seen first
+                self.buckets.popitem(last=False)
+        return wait
+
+    async def aconsume(self, key, rate, burst, now=None):
+        return self.consume(key, rate, burst, now)
+
+
+class CacheStorage:
+    prefix = "ratelimit:"
+
+    def consume(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        key = self.prefix + key
+        state, wait = take(cache.get(key), now, rate, burst)
+        cache.set(key, state, timeout=idle_expiry(rate, burst))
+        return wait
+
+    async def aconsume(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        key = self.prefix + key
+        state, wait = take(await cache.aget(key), now, rate, burst)
+        await cache.aset(key, state, timeout=idle_expiry(rate, burst))
+        return wait
+
+
+class DatabaseStorage:
+    def consume(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        with transaction.atomic():
+            TokenBucket.objects.bulk_create(
+                [TokenBucket(key=key, tokens=burst, updated=now)],
+                ignore_conflicts=True,
+            )
+            bucket = TokenBucket.objects.select_for_update().get(key=key)
+            (bucket.tokens, bucket.updated), wait = take(
+                (bucket.tokens, bucket.updated), now, rate, burst
+            )
+            bucket.save(update_fields=["tokens", "updated"])
+        return wait
+
+    async def aconsume(self, key, rate, burst, now=None):
+        return await sync_to_async(self.consume)(key, rate, burst, now)
+
+
+STORAGES = {"local": LocalStorage, "cache": CacheStorage, "db": DatabaseStorage}
+
+_storages = {}
+
+
+def get_storage(name=None):
+    name = name or settings.RATE_LIMIT_STORAGE
+    if name not in _storages:
+        _storages[name] = STORAGES[name]()
+    return _storages[name]
@@ -0,0 +1,278 @@
+import datetime
+from io import StringIO
+from statistics import median
+from unittest import mock, skipIf
+
+import numpy as np
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.db.models.functions import Length
+from django.test import TestCase
+from django.utils import timezone
+
+from analytics import dashboards, events, partitions
+from analytics.models import CourseDailyStats, Event, EventKind, HourlyCourseStat
+from courses.models import Course, Lesson, Tag
+from progress.models import Enrollment
+from users.models import User
+
+
+class EventBufferTests(TestCase):
+    def setUp(self):
+        self.addCleanup(events.buffer.flush)
+        events.buffer.flush()
+
+    def test_track_is_buffered_until_flushed(self):
+        events.track(EventKind.COURSE_VIEW, 7)
+        events.track(EventKind.SIGNUP)
+        self.assertFalse(Event.objects.exists())
+        self.assertEqual(len(events.buffer.pending()), 2)
+
+        self.assertEqual(events.buffer.flush(), 2)
+        self.assertEqual(
+            sorted(Event.objects.values_list("kind", "course_id")),
+            [(EventKind.COURSE_VIEW, 7), (EventKind.SIGNUP, None)],
+        )
+        self.assertEqual(events.buffer.pending(), [])
+
+    def test_full_buffer_flushes_itself(self):
+        with mock.patch.object(events.buffer, "max_items", 3):
+            for _ in range(3):
+                events.track(EventKind.COURSE_VIEW, 1)
+        self.assertEqual(Event.objects.count(), 3)
+        self.assertEqual(events.buffer.pending(), [])
+
+    async def test_atrack(self):
+        with mock.patch.object(events.buffer, "max_items", 2):
+            await events.atrack(EventKind.COURSE_VIEW, 1)
+            self.assertEqual(await Event.objects.acount(), 0)
+            await events.atrack(EventKind.COURSE_VIEW, 1)
+        self.assertEqual(await Event.objects.acount(), 2)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    def event(self, hours_ago, course_id=1, kind=EventKind.COURSE_VIEW):
+        return Event(
+            kind=kind,
+            course_id=course_id,
+            occurred_at=self.ago(hours_ago) + datetime.timedelta(minutes=10),
+        )
+
+    def ago(self, hours):
+        return self.hour - datetime.timedelta(hours=hours)
+
+    def counts(self):
+        return {
+            (stat.course_id, stat.kind, stat.hour): stat.count
+            for stat in HourlyCourseStat.objects.all()
+        }
+
+    def rollup(self):
+        out = StringIO()
+        call_command("rollup_events", lag=0, stdout=out)
+        return out.getvalue()
+
+    def test_reruns_do_not_double_count(self):
+        Event.objects.bulk_create(
+            [
+                self.event(3),
+                self.event(3),
+                self.event(1),
+                self.event(1, course_id=None, kind=EventKind.SIGNUP),
+                # Not rolled up until its hour is over
+                self.event(0),
+            ]
+        )
+        self.rollup()
+        first = self.counts()
+        self.assertEqual(
+            first,
+            {
+                (1, EventKind.COURSE_VIEW, self.ago(3)): 2,
+                (1, EventKind.COURSE_VIEW, self.ago(1)): 1,
+                (0, EventKind.SIGNUP, self.ago(1)): 1,
+            },
+        )
+
+        self.rollup()
+        self.assertEqual(self.counts(), first)
+
+        # An event for the last rolled-up hour flushed late is recounted
+        Event.objects.bulk_create([self.event(1)])
+        self.rollup()
+        self.assertEqual(self.counts()[(1, EventKind.COURSE_VIEW, self.ago(1))], 2)
+        self.assertEqual(self.counts()[(1, EventKind.COURSE_VIEW, self.ago(3))], 2)
+
+    @skipIf(connection.vendor == "postgresql", "SQLite fallback")
+    def test_partitions_are_skipped_without_postgresql(self):
+        self.assertEqual(partitions.ensure_partitions(self.hour.date(), 3), [])
+        Event.objects.bulk_create([self.event(24 * 100), self.event(1)])
+        output = self.rollup()
+        self.assertNotIn("Created partition", output)
+        self.assertIn("dropped 1 expired", output)
+        self.assertEqual(Event.objects.count(), 1)
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.users = User.objects.bulk_create(
+            User(email=f"u{i}@example.com", username=f"u{i}") for i in range(5)
+        )
+        self.courses = [
+            Course.objects.create(title=f"C{i}", creator=self.users[0], status="pub")
+            for i in range(3)
+        ]
+        # The last course has no lessons and no learners
+        for course, lengths in zip(self.courses, ([10, 400, 35], [120])):
+            for position, length in enumerate(lengths, start=1):
+                Lesson.objects.create(
+                    title=f"L{position}",
+                    content="x" * length,
+                    course=course,
+                    position=position,
+                )
+        Enrollment.objects.bulk_create(
+            [
+                Enrollment(
+                    user=self.users[0], course=self.courses[0], completed_count=3
+                ),
+                Enrollment(
+                    user=self.users[1], course=self.courses[0], completed_count=1
+                ),
+                Enrollment(user=self.users[2], course=self.courses[0]),
+                Enrollment(
+                    user=self.users[3], course=self.courses[1], completed_count=1
+                ),
+            ]
+        )
+        self.courses[1].favorites.add(*self.users[:2])
+        self.ids = [course.pk for course in self.courses]
+
+    def test_grouping_matches_the_orm(self):
+        rows = np.array(
+            list(
+                Lesson.objects.annotate(length=Length("content_html")).values_list(
+                    "course_id", "length"
+                )
+            )
+        )
+        groups = dashboards.grouped(self.ids, rows[:, 0], rows[:, 1])
+        for course_id in self.ids:
+            lessons = Lesson.objects.filter(course_id=course_id)
+            expected = sorted(
+                lessons.annotate(length=Length("content_html")).values_list(
+                    "length", flat=True
+                )
+            )
+            self.assertEqual(sorted(groups[course_id].tolist()), expected)
+        self.assertEqual(len(groups[self.ids[2]]), 0)
+
+        call_command("rollup_dashboards", stdout=StringIO())
+        stats = {s.course_id: s for s in CourseDailyStats.objects.all()}
+        self.assertEqual(set(stats), set(self.ids))
+        counts = Course.objects.filter(pk__in=self.ids).annotate(
+            n_enrollments=Count("enrollments", distinct=True),
+            n_favorites=Count("favorites", distinct=True),
+            n_lessons=Count("lesson", distinct=True),
+        )
+        for course in counts:
+            s = stats[course.pk]
+            self.assertEqual(
+                (s.enrollments, s.favorites, s.lessons),
+                (course.n_enrollments, course.n_favorites, course.n_lessons),
+            )
+            lengths = Lesson.objects.filter(course=course).annotate(
+                length=Length("content_html")
+            )
+            lengths = [lesson.length for lesson in lengths]
+            self.assertEqual(
+                s.lesson_length_median, median(lengths) if lengths else 0.0
+            )
+        first = stats[self.ids[0]]
+        self.assertEqual(first.completed_enrollments, 1)
+        self.assertEqual(first.completion_histogram, [1, 0, 0, 1, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(stats[self.ids[1]].completed_enrollments, 1)
+        empty = stats[self.ids[2]]
+        self.assertEqual(
+            (empty.enrollments, empty.completion_median, empty.completion_histogram),
+            (0, 0.0, [0] * 10),
+        )
+
+    def at(self, day, hour, minute):
+        """Patch the clock to local `hour`:`minute` on `day`."""
+        moment = timezone.make_aware(
+            datetime.datetime.combine(day, datetime.time(hour, minute))
+        )
+        return mock.patch("django.utils.timezone.now", return_value=moment)
+
+    def settle(self, day):
+        """Date every course and enrollment change before `day`."""
+        earlier = timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+        Course.objects.update(updated_at=earlier - datetime.timedelta(days=1))
+        Enrollment.objects.update(updated_at=earlier - datetime.timedelta(days=1))
+
+    def views(self, course_id, day, hour, count):
+        HourlyCourseStat.objects.create(
+            course_id=course_id,
+            kind=EventKind.COURSE_VIEW,
+            hour=timezone.make_aware(
+                datetime.datetime.combine(day, datetime.time(hour))
+            ),
+            count=count,
+        )
+
+    def test_counts_written_after_a_run_are_picked_up(self):
+        course = self.ids[2]
+        day = datetime.date(2026, 3, 10)
+        self.settle(day)
+        with self.at(day, 10, 2):
+            since, _ = dashboards.rollup(None)
+        # rollup_events writes the 09:00 count after the dashboard ran
+        with self.at(day, 10, 5):
+            self.views(course, day, 9, 4)
+        with self.at(day, 10, 10):
+            dashboards.rollup(since)
+        self.assertEqual(CourseDailyStats.objects.get(course=course, day=day).views, 4)
+
+    def test_late_counts_update_the_previous_day(self):
+        course = self.ids[2]
+        day = datetime.date(2026, 3, 10)
+        next_day = day + datetime.timedelta(days=1)
+        self.settle(day)
+        with self.at(day, 23, 50):
+            since, _ = dashboards.rollup(None)
+        CourseDailyStats.objects.filter(course=course, day=day).update(lessons=99)
+        with self.at(next_day, 0, 5):
+            self.views(course, day, 23, 6)
+        with self.at(next_day, 0, 10):
+            dashboards.rollup(since)
+        stats = CourseDailyStats.objects.get(course=course, day=day)
+        # Only the views change, the day's other figures stay as computed
+        self.assertEqual((stats.views, stats.lessons), (6, 99))
+        self.assertEqual(
+            CourseDailyStats.objects.get(course=course, day=next_day).views, 0
+        )
+
+    def test_relation_changes_touch_the_course(self):
+        course = self.courses[2]
+        past = timezone.now() - datetime.timedelta(days=1)
+
+        def touched(change):
+            Course.objects.filter(pk=course.pk).update(updated_at=past)
+            change()
+            return Course.objects.get(pk=course.pk).updated_at > past
+
+        tag = Tag.objects.create(name="python")
+        self.assertTrue(touched(lambda: course.tags.add(tag)))
+        self.assertTrue(touched(lambda: course.tags.remove(tag)))
+        self.assertTrue(touched(lambda: course.collaborators.add(self.users[1])))
+        self.assertTrue(touched(lambda: course.collaborators.clear()))
+        # From the other side of the relation
+        self.assertTrue(touched(lambda: self.users[2].favorite_courses.add(course)))
+        self.assertTrue(touched(lambda: tag.courses.add(course)))
+        # Only for changes
+        self.assertFalse(touched(lambda: course.tags.add()))
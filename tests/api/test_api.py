@@ -0,0 +1,132 @@
+import gzip
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from courses.models import Course, Lesson, Tag
+from users.models import User
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner@example.com", "owner", "pw")
+        self.other = User.objects.create_user("other@example.com", "other", "pw")
+        self.courses = [
+            Course.objects.create(
+                title=f"Course {i}", description="d", creator=self.owner, status="pub"
+            )
+            for i in range(5)
+        ]
+        self.course = self.courses[0]
+        self.course.tags.add(Tag.objects.create(name="python"))
+        self.private = Course.objects.create(
+            title="Private", description="", creator=self.owner, status="priv"
+        )
+
+    def send(self, method, url, data=None, **headers):
+        return getattr(self.client, method)(
+            url, json.dumps(data or {}), content_type="application/json", **headers
+        )
+
+    def test_cursor_pagination_and_sparse_fields(self):
+        url = reverse("api-courses") + "?fields=id,title&limit=2"
+        seen = []
+        with CaptureQueriesContext(connection) as ctx:
+            page = self.client.get(url).json()
+        self.assertNotIn("description", ctx.captured_queries[-1]["sql"])
+        while True:
+            self.assertTrue(all(set(row) == {"id", "title"} for row in page["results"]))
+            seen += [row["id"] for row in page["results"]]
+            if not page["next"]:
+                break
+            page = self.client.get(page["next"]).json()
+        self.assertEqual(seen, sorted(c.pk for c in self.courses))
+
+        response = self.client.get(reverse("api-courses") + "?fields=id,secret")
+        self.assertEqual(response.status_code, 400)
+
+    def test_private_courses(self):
+        url = reverse("api-course", args=[self.private.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(url).json()["status"], "priv")
+
+    def test_etag_follows_course_updates(self):
+        url = reverse("api-course", args=[self.course.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()["tags"], ["python"])
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Lesson.objects.create(title="New", content="x", course=self.course, position=1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["lesson_count"], 1)
+
+    def test_create_and_update_course(self):
+        self.assertEqual(self.send("post", reverse("api-courses")).status_code, 401)
+        self.client.force_login(self.owner)
+        response = self.send(
+            "post",
+            reverse("api-courses"),
+            {"title": "API", "description": "Made", "tags": ["Web", "python"]},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["tags"], ["python", "web"])
+        url = response["Location"]
+
+        etag = self.client.get(url)["ETag"]
+        response = self.send(
+            "patch", url, {"title": "API v2", "status": "pub"}, HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.json()["title"], "API v2")
+        self.assertEqual(response.json()["tags"], ["python", "web"])
+        # The course changed since the ETag was read
+        response = self.send("patch", url, {"title": "API v3"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.send("delete", url).status_code, 403)
+
+    def test_lessons(self):
+        url = reverse("api-lessons", args=[self.course.pk])
+        self.client.force_login(self.owner)
+        response = self.send("post", url, {"title": "Intro", "content": "# Hi"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["position"], 1)
+        self.assertIn("<h1", response.json()["content_html"])
+
+        self.send("post", url, {"title": "Long", "content": "word " * 2000})
+        response = self.client.get(
+            url + "?fields=title,content", HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        lessons = json.loads(gzip.decompress(response.content))["results"]
+        self.assertEqual([lesson["title"] for lesson in lessons], ["Intro", "Long"])
+
+        response = self.send("post", url, {"title": "Bad", "position": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_collaborators(self):
+        url = reverse("api-collaborators", args=[self.course.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.owner)
+        response = self.send("post", url, {"user": "Other"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            self.client.get(url).json()["results"][0]["display_name"],
+            f"other#{self.other.pk}",
+        )
+        self.client.delete(reverse("api-collaborator", args=[self.course.pk, 2**31]))
+        self.client.delete(
+            reverse("api-collaborator", args=[self.course.pk, self.other.pk])
+        )
+        self.assertEqual(self.client.get(url).json()["results"], [])
+
+    def test_tags(self):
+        response = self.client.get(reverse("api-tags"), {"q": "py"})
+        self.assertEqual(
+            response.json()["results"], [{"name": "python", "usage_count": 1}]
+        )
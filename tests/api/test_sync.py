@@ -0,0 +1,144 @@
+import gzip
+import json
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from api import sync
+from api.models import Tombstone
+from courses.models import Course, Lesson, Tag
+from users.models import User
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner@example.com", "owner", "pw")
+        self.courses = [
+            Course.objects.create(
+                title=f"Course {i}", description="d", creator=self.owner, status="pub"
+            )
+            for i in range(3)
+        ]
+        self.private = Course.objects.create(
+            title="Private", description="", creator=self.owner, status="priv"
+        )
+        self.lessons = [
+            Lesson.objects.create(
+                title=f"Lesson {i}", content="x", course=course, position=1
+            )
+            for i, course in enumerate([*self.courses, self.private])
+        ]
+        self.courses[0].tags.add(Tag.objects.create(name="python"))
+
+    def pull(self, cursor=None, **params):
+        """Sync until `more` is false; returns the merged pages and cursor."""
+        merged = {"courses": [], "lessons": [], "tags": [], "deleted": {}}
+        while True:
+            if cursor:
+                params["cursor"] = cursor
+            page = self.client.get(reverse("api-sync"), params).json()
+            for name in ("courses", "lessons", "tags"):
+                merged[name] += [row["id"] for row in page[name]]
+            for kind, ids in page["deleted"].items():
+                merged["deleted"].setdefault(kind, []).extend(ids)
+            cursor = page["cursor"]
+            if not page["more"]:
+                return merged, cursor
+
+    def test_initial_sync_in_pages(self):
+        merged, _ = self.pull(limit=2)
+        self.assertEqual(sorted(merged["courses"]), [c.pk for c in self.courses])
+        self.assertEqual(
+            sorted(merged["lessons"]), [lesson.pk for lesson in self.lessons[:3]]
+        )
+        self.assertEqual(len(merged["tags"]), 1)
+
+        self.client.force_login(self.owner)
+        merged, _ = self.pull()
+        self.assertIn(self.private.pk, merged["courses"])
+
+    def test_changes_and_deletions(self):
+        _, cursor = self.pull()
+        merged, cursor = self.pull(cursor)
+        self.assertEqual(merged["courses"], [])
+
+        self.courses[0].title = "Renamed"
+        self.courses[0].save()
+        added = Lesson.objects.create(
+            title="New", content="x", course=self.courses[1], position=2
+        )
+        self.lessons[2].delete()
+        self.courses[1].status = "priv"
+        self.courses[1].save()
+        gone = self.courses[2].pk
+        self.courses[2].delete()
+        Lesson.objects.create(
+            title="Hidden", content="x", course=self.private, position=2
+        )
+
+        merged, cursor = self.pull(cursor)
+        self.assertEqual(merged["courses"], [self.courses[0].pk])
+        # Changed courses the client can't see are sent as deleted, whether it
+        # had them or not
+        self.assertEqual(
+            sorted(merged["deleted"]["courses"]),
+            [self.courses[1].pk, gone, self.private.pk],
+        )
+        # Lessons of a hidden course aren't sent, nor those of a deleted one
+        self.assertEqual(merged["lessons"], [])
+        self.assertEqual(merged["deleted"]["lessons"], [])
+        self.assertNotIn(added.pk, merged["lessons"])
+
+        gone = self.lessons[0].pk
+        self.lessons[0].delete()
+        merged, _ = self.pull(cursor)
+        self.assertEqual(merged["deleted"]["lessons"], [gone])
+
+    def test_course_deletion_leaves_one_tombstone(self):
+        course = self.courses[0]
+        gone = course.pk
+        for i in range(3):
+            Lesson.objects.create(
+                title=f"Extra {i}", content="x", course=course, position=i + 2
+            )
+        course.delete()
+        self.assertEqual(
+            list(Tombstone.objects.values_list("kind", "object_id")),
+            [(Tombstone.Kind.COURSE, gone)],
+        )
+
+        # Queryset deletes cascade too
+        Course.objects.filter(pk=self.courses[1].pk).delete()
+        lesson = self.lessons[2].pk
+        self.lessons[2].delete()
+        self.assertEqual(
+            list(Tombstone.objects.order_by("pk").values_list("kind", "object_id"))[1:],
+            [
+                (Tombstone.Kind.COURSE, self.courses[1].pk),
+                (Tombstone.Kind.LESSON, lesson),
+            ],
+        )
+
+    def test_lesson_updates_and_gzip(self):
+        _, cursor = self.pull()
+        self.lessons[0].content = "word " * 2000
+        self.lessons[0].save()
+        response = self.client.get(
+            reverse("api-sync"), {"cursor": cursor}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        page = json.loads(gzip.decompress(response.content))
+        self.assertEqual([row["id"] for row in page["lessons"]], [self.lessons[0].pk])
+        self.assertIn("updated_at", page["lessons"][0])
+
+    def test_bad_and_expired_cursors(self):
+        response = self.client.get(reverse("api-sync"), {"cursor": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+        old = timezone.now() - timedelta(days=365)
+        cursor = sync.encode({name: (old, 0) for name in sync.STREAMS})
+        response = self.client.get(reverse("api-sync"), {"cursor": cursor})
+        self.assertEqual(response.status_code, 410)
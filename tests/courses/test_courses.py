@@ -1,3 +1,1242 @@
-from django.test import TestCase
+import base64
+import importlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import zlib
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import brotli
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    DatabaseError,
+    connection,
+    connections,
+    router,
+    transaction,
+)
+from django.db.migrations.loader import MigrationLoader
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from LibreCourse import compression
+from LibreCourse import settings as settings_module
+from LibreCourse.routers import PIN_COOKIE, PrimaryPinMiddleware, read_from_replica
+from courses import attachments, facets, search, tags
+from courses.fields import MARKER, compress_text, decompress_text
+from courses.management.commands import pgbouncer_config
+from courses.rendering import RENDERER_VERSION, content_hash, render_content
+from courses.snapshot import Snapshot, catalog
+from courses.models import (
+    AttachmentBlob,
+    AttachmentUpload,
+    Course,
+    Lesson,
+    LessonAttachment,
+    PendingCollaborator,
+    Tag,
+)
+from users.models import User
+
+
+# -------------------------
+# Query plans of the hot catalog queries
+# -------------------------
+class CatalogQueryPlanTests(TestCase):
+    """
+    Runs the catalog views against a fixture large enough for the planner to
+    prefer an index, EXPLAINs every SELECT they issue and fails if one of them
+    falls back to a full table scan.
+    """
+
+    COURSES = 3000
+    LESSONS = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            User(email=f"user{i}@example.com", username=f"user{i}") for i in range(200)
+        )
+        tags = Tag.objects.bulk_create(Tag(name=f"tag{i}") for i in range(50))
+        statuses = ["pub", "priv", "dra"]
+        Course.objects.bulk_create(
+            Course(
+                title=f"Course {i}",
+                description="x" * 200,
+                creator=cls.users[i % len(cls.users)],
+                status=statuses[i % len(statuses)],
+            )
+            for i in range(cls.COURSES)
+        )
+        cls.course = Course.objects.filter(status="pub").first()
+        through = Course.tags.through
+        through.objects.bulk_create(
+            through(course_id=course_id, tag_id=tags[course_id % len(tags)].pk)
+            for course_id in Course.objects.values_list("pk", flat=True)
+        )
+        Lesson.objects.bulk_create(
+            Lesson(title=f"Lesson {i}", content="y" * 500, course=course, position=i)
+            for course in Course.objects.all()[:50]
+            for i in range(cls.LESSONS // 50 if course != cls.course else cls.LESSONS)
+        )
+        PendingCollaborator.objects.bulk_create(
+            PendingCollaborator(course=cls.course, email=f"invite{i}@example.com")
+            for i in range(100)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        # The catalog's in-memory structures are built once per worker, not
+        # per request; build them outside the measured requests
+        facets.index.rebuild()
+        catalog.rebuild()
+
+    def explain(self, sql):
+        if connection.vendor == "postgresql":
+            prefix = "EXPLAIN "
+        else:
+            prefix = "EXPLAIN QUERY PLAN "
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+    def sequential_scans(self, plan):
+        if connection.vendor == "postgresql":
+            scanned = re.findall(r"Seq Scan on (\w+)", plan)
+        else:
+            # SQLite: "SCAN t" is a table scan, "SCAN t USING [COVERING] INDEX"
+            # walks an index in order and is fine.
+            scanned = re.findall(r"\bSCAN (\w+)\s*$", plan, re.MULTILINE)
+        # Ignore scans of derived tables such as COUNT(*) subqueries.
+        tables = connection.introspection.table_names()
+        return [t for t in scanned if t in tables]
+
+    def assertNoSequentialScans(self, url, allow=()):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            plan = self.explain(sql)
+            scanned = [t for t in self.sequential_scans(plan) if t not in allow]
+            self.assertEqual(scanned, [], f"{sql}\n{plan}")
+
+    # Served from memory; the tag vocabulary is small enough to read whole.
+    def test_course_list(self):
+        self.assertNoSequentialScans(reverse("course-list"), allow=("courses_tag",))
+
+    def test_course_list_second_page(self):
+        self.assertNoSequentialScans(
+            reverse("course-list") + "?page=2", allow=("courses_tag",)
+        )
+
+    def test_course_detail(self):
+        self.assertNoSequentialScans(
+            reverse("course-detail", kwargs={"pk": self.course.pk})
+        )
+
+    def test_course_list_query_count(self):
+        # Browsing is answered from memory, searching only fetches ids
+        for url in (reverse("course-list"), reverse("course-list") + "?page=2"):
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("course-list"), {"q": "Course 1"})
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(self.selected_columns(ctx.captured_queries[0]["sql"]), ["id"])
+
+    def test_snapshot_projection(self):
+        # The card fields only: no full descriptions, courses, tags and
+        # creator names each read once
+        with CaptureQueriesContext(connection) as ctx:
+            Snapshot.load()
+        courses, course_tags, tag_names, creator_names = [
+            query["sql"] for query in ctx.captured_queries
+        ]
+        self.assertEqual(
+            self.selected_columns(courses),
+            ["id", "status", "title", "creator_id", "created_at", "description"],
+        )
+        self.assertRegex(courses, r"(?i)SUBSTR(ING)?\(")
+        self.assertEqual(self.selected_columns(course_tags), ["course_id", "tag_id"])
+        self.assertEqual(self.selected_columns(tag_names), ["id", "name"])
+        self.assertEqual(self.selected_columns(creator_names), ["id", "username"])
+
+    def selected_columns(self, sql):
+        """Distinct columns read by the SELECT list, in order."""
+        select = re.match(r"SELECT (.*?) FROM ", sql, re.DOTALL).group(1)
+        return list(dict.fromkeys(re.findall(r'"\w+"\."(\w+)"', select)))
+
+    def test_user_autocomplete(self):
+        # Substring search needs a trigram index, which only PostgreSQL has.
+        allow = ("users_user",) if connection.vendor != "postgresql" else ()
+        self.assertNoSequentialScans(reverse("user-autocomplete") + "?q=user1", allow)
+
+
+# -------------------------
+# Course permissions
+# -------------------------
+class CoursePermissionTests(TestCase):
+    def test_rules_agree(self):
+        owner = User.objects.create_user("owner@example.com", "owner", "pw")
+        collaborator = User.objects.create_user("collab@example.com", "collab", "pw")
+        stranger = User.objects.create_user("stranger@example.com", "stranger", "pw")
+        courses = {
+            status: Course.objects.create(title=status, creator=owner, status=status)
+            for status in ("pub", "priv", "dra")
+        }
+        for course in courses.values():
+            course.collaborators.add(collaborator)
+
+        for user in (owner, collaborator, stranger, AnonymousUser()):
+            with self.subTest(user=user):
+                editable = user in (owner, collaborator)
+                visible = {
+                    status
+                    for status, course in courses.items()
+                    if course.can_view(user)
+                }
+                self.assertEqual(
+                    visible, {"pub", "priv", "dra"} if editable else {"pub"}
+                )
+                self.assertEqual(
+                    set(
+                        Course.objects.visible_to(user).values_list("status", flat=True)
+                    ),
+                    visible,
+                )
+                for course in courses.values():
+                    self.assertEqual(course.can_edit(user), editable)
+
+
+# -------------------------
+# Lesson rendering
+# -------------------------
+class LessonRenderingTests(TestCase):
+    def test_constructs(self):
+        cases = {
+            "# Title": "<h1>Title</h1>",
+            "### Third *level*": "<h3>Third <em>level</em></h3>",
+            "####### too deep": "<p>####### too deep</p>",
+            "one\ntwo\n\nthree": "<p>one<br>two</p>\n<p>three</p>",
+            "- a\n* **b**": "<ul><li>a</li><li><strong>b</strong></li></ul>",
+            "intro\n- item\nafter": "<p>intro</p>\n<ul><li>item</li></ul>\n<p>after</p>",
+            "use `x *not em*` here": "<p>use <code>x *not em*</code> here</p>",
+            "```\n# kept\n  indented\n```\nafter": (
+                "<pre><code># kept\n  indented</code></pre>\n<p>after</p>"
+            ),
+            "a\r\nb": "<p>a<br>b</p>",
+        }
+        for content, html in cases.items():
+            with self.subTest(content=content):
+                self.assertEqual(render_content(content), html)
+
+    def test_markup_in_content_is_escaped(self):
+        cases = {
+            "<script>alert(1)</script>": (
+                "<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>"
+            ),
+            "# <img src=x onerror=alert(1)>": (
+                "<h1>&lt;img src=x onerror=alert(1)&gt;</h1>"
+            ),
+            '**" onmouseover="alert(1)**': (
+                "<p><strong>&quot; onmouseover=&quot;alert(1)</strong></p>"
+            ),
+            "`</code><script>`": "<p><code>&lt;/code&gt;&lt;script&gt;</code></p>",
+            "```\n</code></pre><script>\n```": (
+                "<pre><code>&lt;/code&gt;&lt;/pre&gt;&lt;script&gt;</code></pre>"
+            ),
+        }
+        for content, html in cases.items():
+            with self.subTest(content=content):
+                self.assertEqual(render_content(content), html)
+
+    def test_links_are_not_rendered(self):
+        # The subset has no links, so no target, javascript: or other, becomes
+        # an href
+        for content in (
+            "[click](javascript:alert(1))",
+            "<a href='javascript:alert(1)'>click</a>",
+            "javascript:alert(1)",
+        ):
+            with self.subTest(content=content):
+                html = render_content(content)
+                self.assertNotIn("<a", html)
+
+    def test_unchanged_content_is_not_rendered_again(self):
+        user = User.objects.create_user("owner@example.com", "owner", "pw")
+        course = Course.objects.create(title="Render", creator=user, status="pub")
+        with mock.patch(
+            "courses.models.render_content", wraps=render_content
+        ) as render:
+            lesson = Lesson.objects.create(
+                title="L", content="**bold**", course=course, position=1
+            )
+            self.assertEqual(lesson.content_hash, content_hash("**bold**"))
+            lesson.title = "Renamed"
+            lesson.save()
+            Lesson.objects.get(pk=lesson.pk).save()
+            self.assertEqual(render.call_count, 1)
+
+            lesson.content = "*em*"
+            lesson.save(update_fields=["content"])
+            self.assertEqual(render.call_count, 2)
+            lesson.refresh_from_db()
+            self.assertEqual(lesson.content_html, "<p><em>em</em></p>")
+
+            with mock.patch("courses.models.RENDERER_VERSION", RENDERER_VERSION + 1):
+                lesson.save()
+            self.assertEqual(render.call_count, 3)
+            lesson.save()
+            self.assertEqual(render.call_count, 4)
+
+        out = StringIO()
+        call_command("render_lessons", workers=1, stdout=out)
+        self.assertIn("Rendered 0 lessons", out.getvalue())
+        Lesson.objects.filter(pk=lesson.pk).update(renderer_version=0, content_html="")
+        call_command("render_lessons", workers=1, stdout=out)
+        self.assertIn("Rendered 1 lessons", out.getvalue())
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.content_html, "<p><em>em</em></p>")
+
+    def test_migration_renders_with_its_own_renderer(self):
+        migration = importlib.import_module(
+            "courses.migrations.0006_lesson_content_html"
+        )
+        apps = (
+            MigrationLoader(connection)
+            .project_state(("courses", "0006_lesson_content_html"))
+            .apps
+        )
+        course = Course.objects.create(title="Render", status="pub")
+        lesson = Lesson.objects.create(
+            title="L", content="# Hi\n- **a**", course=course, position=1
+        )
+        Lesson.objects.filter(pk=lesson.pk).update(
+            content_html="", content_hash="", renderer_version=0
+        )
+        # A renderer change after the migration doesn't change its output
+        with mock.patch("courses.rendering.render_content", return_value="changed"):
+            migration.render_existing(apps, SimpleNamespace(connection=connection))
+        lesson.refresh_from_db()
+        self.assertEqual(
+            (lesson.content_html, lesson.content_hash, lesson.renderer_version),
+            (
+                "<h1>Hi</h1>\n<ul><li><strong>a</strong></li></ul>",
+                content_hash("# Hi\n- **a**"),
+                1,
+            ),
+        )
+
+
+# -------------------------
+# Compressed lesson content
+# -------------------------
+@override_settings(LESSON_CONTENT_COMPRESS_THRESHOLD=100)
+class CompressedContentTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("owner@example.com", "owner", "pw")
+        self.course = Course.objects.create(title="Big", creator=user, status="pub")
+
+    def lesson(self, content):
+        position = Lesson.objects.filter(course=self.course).count() + 1
+        return Lesson.objects.create(
+            title=f"L{position}", content=content, course=self.course, position=position
+        )
+
+    def stored(self, lesson):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT content FROM {Lesson._meta.db_table} WHERE id = %s",
+                [lesson.pk],
+            )
+            return cursor.fetchone()[0]
+
+    def test_round_trip_around_the_threshold(self):
+        small = self.lesson("short text")
+        big_text = "A long lesson paragraph, quite repetitive. " * 50
+        big = self.lesson(big_text)
+        self.assertEqual(self.stored(small), "short text")
+        self.assertTrue(self.stored(big).startswith(MARKER))
+        self.assertLess(len(self.stored(big)), len(big_text))
+        self.assertEqual(Lesson.objects.get(pk=small.pk).content, "short text")
+        self.assertEqual(Lesson.objects.get(pk=big.pk).content, big_text)
+        # Text that doesn't shrink is left plain
+        noise = base64.b64encode(os.urandom(300)).decode()
+        self.assertEqual(self.stored(self.lesson(noise)), noise)
+
+    def test_legacy_plain_rows(self):
+        lesson = self.lesson("x")
+        text = "Written before compression existed. " * 10
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Lesson._meta.db_table} SET content = %s WHERE id = %s",
+                [text, lesson.pk],
+            )
+        self.assertEqual(self.stored(lesson), text)
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).content, text)
+
+    def test_text_starting_with_the_marker(self):
+        text = MARKER + "not compressed"
+        with self.settings(LESSON_CONTENT_COMPRESS_THRESHOLD=0):
+            lesson = self.lesson(text)
+        # Framed whatever its size, or it would be decoded on the way out
+        self.assertNotEqual(self.stored(lesson), text)
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).content, text)
+        self.assertEqual(decompress_text(compress_text(text, 0)), text)
+
+    def test_values_and_only_decompress(self):
+        text = "Lesson text that compresses well. " * 20
+        lesson = self.lesson(text)
+        self.assertTrue(self.stored(lesson).startswith(MARKER))
+        lessons = Lesson.objects.filter(pk=lesson.pk)
+        self.assertEqual(lessons.values("content")[0]["content"], text)
+        self.assertEqual(lessons.values_list("content", flat=True)[0], text)
+        self.assertEqual(lessons.only("content")[0].content, text)
+
+
+# -------------------------
+# Lesson attachments
+# -------------------------
+class LessonAttachmentTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(override_settings(ATTACHMENT_ROOT=tmp.name))
+        self.user = User.objects.create_user("owner@example.com", "owner", "pw")
+        self.course = Course.objects.create(
+            title="Files", description="", creator=self.user, status="pub"
+        )
+        self.lesson = Lesson.objects.create(
+            title="One", content="text", course=self.course, position=1
+        )
+        self.client.force_login(self.user)
+
+    def upload(self, data, chunk=4):
+        response = self.client.post(
+            reverse("attachment-upload-create", args=[self.course.pk, self.lesson.pk]),
+            {"filename": "notes.txt", "size": len(data), "content_type": "text/plain"},
+        )
+        self.assertEqual(response.status_code, 201)
+        url = response.json()["url"]
+        for offset in range(0, len(data), chunk):
+            response = self.client.patch(
+                url,
+                data[offset : offset + chunk],
+                content_type="application/octet-stream",
+                headers={"Upload-Offset": str(offset)},
+            )
+        return url, response
+
+    def test_chunked_upload_and_dedup(self):
+        _, first = self.upload(b"hello attachment")
+        _, second = self.upload(b"hello attachment")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()["sha256"], second.json()["sha256"])
+        self.assertEqual(AttachmentBlob.objects.count(), 1)
+        self.assertEqual(self.lesson.attachments.count(), 2)
+
+    def test_resume_rejects_wrong_offset(self):
+        response = self.client.post(
+            reverse("attachment-upload-create", args=[self.course.pk, self.lesson.pk]),
+            {"filename": "a.bin", "size": 8},
+        )
+        url = response.json()["url"]
+        self.client.patch(
+            url,
+            b"1234",
+            content_type="application/octet-stream",
+            headers={"Upload-Offset": "0"},
+        )
+        response = self.client.patch(
+            url,
+            b"5678",
+            content_type="application/octet-stream",
+            headers={"Upload-Offset": "0"},
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.get(url).json()["offset"], 4)
+
+    def test_retried_completion_returns_the_attachment(self):
+        url, first = self.upload(b"0123456789")
+        attachment = first.json()
+        # The completing request again, as a client that missed the response
+        # sends it, or as a concurrent duplicate sees it once it gets the lock
+        for offset, body in (("8", b"89"), ("10", b"")):
+            response = self.client.patch(
+                url,
+                body,
+                content_type="application/octet-stream",
+                headers={"Upload-Offset": offset},
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), attachment)
+        self.assertEqual(self.client.get(url).json()["attachment"], attachment)
+        self.assertEqual(self.client.delete(url).status_code, 409)
+        self.assertEqual(self.lesson.attachments.count(), 1)
+
+    def test_failed_completion_can_be_retried(self):
+        response = self.client.post(
+            reverse("attachment-upload-create", args=[self.course.pk, self.lesson.pk]),
+            {"filename": "a.bin", "size": 8},
+        )
+        url = response.json()["url"]
+
+        def patch(offset, body):
+            return self.client.patch(
+                url,
+                body,
+                content_type="application/octet-stream",
+                headers={"Upload-Offset": str(offset)},
+            )
+
+        patch(0, b"1234")
+        self.assertEqual(patch(4, b"").status_code, 400)
+        with mock.patch.object(
+            LessonAttachment.objects, "create", side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                patch(4, b"5678")
+        # The failed attempt was rolled back, the last chunk included
+        self.assertEqual(self.client.get(url).json()["offset"], 4)
+        response = patch(4, b"5678")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["size"], 8)
+
+        # An upload whose last chunk was committed but never finalized, as
+        # left by a crash before finalizing joined the chunk's transaction
+        upload = AttachmentUpload.objects.create(
+            lesson=self.lesson, filename="b.bin", size=4, uploaded_by=self.user
+        )
+        upload.received = attachments.write_chunk(upload, BytesIO(b"abcd"), 4)
+        upload.save()
+        url = reverse("attachment-upload", args=[upload.pk])
+        response = patch(4, b"")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["filename"], "b.bin")
+
+    def test_empty_file(self):
+        response = self.client.post(
+            reverse("attachment-upload-create", args=[self.course.pk, self.lesson.pk]),
+            {"filename": "empty.txt", "size": 0},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["size"], 0)
+
+    def test_range_download(self):
+        _, response = self.upload(b"0123456789")
+        url = response.json()["url"]
+        self.client.logout()
+
+        full = self.client.get(url)
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(b"".join(full.streaming_content), b"0123456789")
+        self.assertIn("immutable", full["Cache-Control"])
+
+        partial = self.client.get(url, headers={"Range": "bytes=2-5"})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(b"".join(partial.streaming_content), b"2345")
+
+        suffix = self.client.get(url, headers={"Range": "bytes=-3"})
+        self.assertEqual(b"".join(suffix.streaming_content), b"789")
+
+        self.assertEqual(
+            self.client.get(url, headers={"Range": "bytes=20-"}).status_code, 416
+        )
+        self.assertEqual(
+            self.client.get(url, headers={"If-None-Match": full["ETag"]}).status_code,
+            304,
+        )
+
+
+# -------------------------
+# Tag service
+# -------------------------
+class TagServiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("author@example.com", "author", "pw")
+        Tag.objects.create(name="python")
+
+    def test_resolve_normalizes_and_creates_missing_in_bulk(self):
+        with self.assertNumQueries(3):
+            resolved = tags.resolve(["  Python", "Web   Dev", "python", ""])
+        self.assertEqual([t.name for t in resolved], ["python", "web dev"])
+        with self.assertNumQueries(1):
+            tags.resolve(["PYTHON", "web dev"])
+
+    def test_usage_counts_follow_course_tags(self):
+        course = Course.objects.create(title="C", creator=self.user)
+        course.tags.set(tags.resolve(["python", "django"]))
+        other = Course.objects.create(title="D", creator=self.user)
+        other.tags.set(tags.resolve(["python"]))
+        counts = dict(Tag.objects.values_list("name", "usage_count"))
+        self.assertEqual(counts, {"python": 2, "django": 1})
+
+        course.tags.set(tags.resolve(["django"]))
+        other.tags.clear()
+        Tag.objects.get(name="django").courses.add(other)
+        course.delete()
+        counts = dict(Tag.objects.values_list("name", "usage_count"))
+        self.assertEqual(counts, {"python": 0, "django": 1})
+
+    def test_vocabulary_is_cached_until_tags_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tags.invalidate()
+        self.assertEqual(tags.vocabulary().prefix("py"), ["python"])
+        with self.assertNumQueries(0):
+            tags.vocabulary()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tags.resolve(["pyramid"])
+        self.assertEqual(tags.vocabulary().prefix("PY"), ["pyramid", "python"])
+        response = self.client.get(reverse("tag-autocomplete"), {"q": "pyr"})
+        self.assertEqual(response.json(), {"tags": ["pyramid"]})
+
+
+# -------------------------
+# Tag facets on the catalog
+# -------------------------
+class CatalogFacetTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("author@example.com", "author", "pw")
+        self.courses = {}
+        for title, status, names in [
+            ("Py web", "pub", ["python", "web"]),
+            ("Py data", "pub", ["python", "data"]),
+            ("JS web", "pub", ["javascript", "web"]),
+            ("Draft", "dra", ["python"]),
+        ]:
+            course = Course.objects.create(title=title, status=status, creator=user)
+            course.tags.set(tags.resolve(names))
+            self.courses[title] = course
+        facets.index.rebuild()
+        catalog.rebuild()
+
+    def titles(self, response):
+        return [course.title for course in response.context["courses"]]
+
+    def facet_counts(self, response):
+        return {f["name"]: f["count"] for f in response.context["facets"]}
+
+    def test_and_or_filters_with_counts(self):
+        url = reverse("course-list")
+        response = self.client.get(url, {"tag": ["python", "web"]})
+        self.assertEqual(self.titles(response), ["Py web"])
+        self.assertEqual(self.facet_counts(response), {"python": 1, "web": 1})
+
+        response = self.client.get(url, {"tag": ["data", "javascript"], "match": "any"})
+        self.assertEqual(self.titles(response), ["JS web", "Py data"])
+
+        response = self.client.get(url, {"q": "py", "tag": "web"})
+        self.assertEqual(self.titles(response), ["Py web"])
+        self.assertEqual(self.facet_counts(response), {"python": 1, "web": 1})
+
+        response = self.client.get(url)
+        self.assertEqual(
+            self.facet_counts(response),
+            {"python": 2, "web": 2, "data": 1, "javascript": 1},
+        )
+
+    def test_incremental_refresh(self):
+        self.courses["Draft"].status = "pub"
+        self.courses["Draft"].save()
+        self.courses["Py web"].tags.remove(Tag.objects.get(name="python"))
+        facets.index.checked_at = catalog.checked_at = 0
+        self.assertEqual(
+            self.facet_counts(self.client.get(reverse("course-list"))),
+            {"python": 2, "web": 2, "data": 1, "javascript": 1},
+        )
+
+        self.courses["JS web"].delete()
+        response = self.client.get(reverse("course-list"), {"tag": "web"})
+        self.assertEqual(self.titles(response), ["Py web"])
+
+    def test_sorting_from_snapshot(self):
+        url = reverse("course-list")
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"sort": "title"})
+        self.assertEqual(self.titles(response), ["JS web", "Py data", "Py web"])
+        response = self.client.get(url, {"sort": "oldest", "tag": "web"})
+        self.assertEqual(self.titles(response), ["Py web", "JS web"])
+        entry = response.context["courses"][0]
+        self.assertEqual(entry.creator_name, "author")
+        self.assertEqual(sorted(entry.tags), ["python", "web"])
+
+    def test_incremental_snapshot_matches_full_load(self):
+        course = self.courses["Py data"]
+        course.title = "Renamed"
+        course.save()
+        self.courses["Draft"].status = "pub"
+        self.courses["Draft"].save()
+        updated = Snapshot.load(catalog.current.synced_at, catalog.current)
+        full = Snapshot.load()
+        self.assertEqual(list(updated.rows()), list(full.rows()))
+
+
+# -------------------------
+# Lesson search
+# -------------------------
+class LessonSearchTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(title="Course", status="pub")
+        self.other = Course.objects.create(title="Other", status="pub")
+        self.lesson = Lesson.objects.create(
+            title="Decorators",
+            content="Functions wrapping functions.\n\nA <b>decorator</b> returns "
+            "a new callable.",
+            course=self.course,
+            position=1,
+        )
+        Lesson.objects.create(
+            title="Generators",
+            content="Lazy sequences with yield.",
+            course=self.course,
+            position=2,
+        )
+        Lesson.objects.create(
+            title="Decorators elsewhere",
+            content="Decorators in another course.",
+            course=self.other,
+            position=1,
+        )
+
+    def test_search_within_course_with_snippets(self):
+        results = search.search("decorat", course_id=self.course.pk)
+        self.assertEqual([r["id"] for r in results], [self.lesson.pk])
+        self.assertIn("<mark>decorator</mark>", results[0]["snippet"])
+        # Markup in the lesson body comes back escaped
+        self.assertNotIn("<b>", results[0]["snippet"])
+
+        response = self.client.get(
+            reverse("lesson-search", args=[self.course.pk]), {"q": "yield"}
+        )
+        self.assertContains(response, "Generators")
+        self.assertNotContains(response, "Decorators")
+
+    def test_hidden_courses_cannot_be_searched(self):
+        owner = User.objects.create_user("owner@example.com", "owner", "pw")
+        stranger = User.objects.create_user("stranger@example.com", "stranger", "pw")
+        self.course.creator = owner
+        self.course.status = "dra"
+        self.course.save()
+        url = reverse("lesson-search", args=[self.course.pk])
+
+        self.assertEqual(self.client.get(url, {"q": "decorat"}).status_code, 404)
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(url, {"q": "decorat"}).status_code, 404)
+        self.client.force_login(owner)
+        self.assertContains(self.client.get(url, {"q": "decorat"}), "Decorators")
+
+    def test_index_follows_saves_and_deletes(self):
+        self.lesson.content = "Now about context managers."
+        self.lesson.save()
+        self.assertEqual(search.search("wrapping", course_id=self.course.pk), [])
+        self.assertEqual(len(search.search("managers", course_id=self.course.pk)), 1)
+
+        self.lesson.delete()
+        self.assertEqual(search.search("managers"), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(search.search('" OR * NEAR('), [])
+        self.assertEqual(len(search.search("decorators AND")), 0)
+        self.assertEqual(len(search.search("decorators")), 2)
+
+    def test_migration_backfills_the_index(self):
+        migration = importlib.import_module("courses.migrations.0012_lesson_search")
+        apps = (
+            MigrationLoader(connection)
+            .project_state(("courses", "0012_lesson_search"))
+            .apps
+        )
+        with connection.cursor() as cursor:
+            # The SQLite schema editor can't open inside the test transaction
+            schema_editor = SimpleNamespace(
+                connection=connection,
+                execute=cursor.execute,
+                quote_name=connection.ops.quote_name,
+            )
+            migration.drop_search_table(apps, schema_editor)
+            migration.create_search_table(apps, schema_editor)
+        self.assertEqual(len(search.search("decorators")), 2)
+        self.assertEqual(search.search("yield")[0]["title"], "Generators")
+
+
+# -------------------------
+# Read replica routing
+# -------------------------
+@override_settings(REPLICA_DATABASES=["replica1"])
+class ReplicaRoutingTests(TestCase):
+    def request(self, view, cookies=None):
+        request = RequestFactory().get("/")
+        request.COOKIES.update(cookies or {})
+        return PrimaryPinMiddleware(view)(request)
+
+    def test_reads_use_replica_only_in_marked_views(self):
+        seen = []
+
+        def view(request):
+            seen.append(router.db_for_read(Course))
+            return HttpResponse()
+
+        self.request(read_from_replica(view))
+        self.request(view)
+        self.assertEqual(seen, ["replica1", "default"])
+
+    def test_writes_pin_to_primary(self):
+        seen = []
+
+        def writing_view(request):
+            seen.append(router.db_for_write(Course))
+            seen.append(router.db_for_read(Course))
+            return HttpResponse()
+
+        response = self.request(read_from_replica(writing_view))
+        self.assertEqual(seen, ["default", "default"])
+        cookie = response.cookies[PIN_COOKIE]
+
+        def view(request):
+            seen.append(router.db_for_read(Course))
+            return HttpResponse()
+
+        self.request(read_from_replica(view), {PIN_COOKIE: cookie.value})
+        self.request(read_from_replica(view), {PIN_COOKIE: "0"})
+        self.assertEqual(seen[2:], ["default", "replica1"])
+
+    async def test_async_views(self):
+        seen = []
+
+        async def view(request):
+            seen.append(router.db_for_read(Course))
+            return HttpResponse()
+
+        middleware = PrimaryPinMiddleware(read_from_replica(view))
+        await middleware(RequestFactory().get("/"))
+        self.assertEqual(seen, ["replica1"])
+
+    def test_catalog_refreshes_read_the_primary(self):
+        # There is no replica1 connection here, any refresh query routed to
+        # it would fail
+        owner = User.objects.create_user("owner@example.com", "owner", "pw")
+        python = Tag.objects.create(name="python")
+        Course.objects.create(title="Old", creator=owner, status="pub").tags.add(python)
+        seen = []
+
+        def view(request):
+            seen.append(router.db_for_read(Course))
+            catalog.rebuild()
+            facets.index.rebuild()
+            Course.objects.create(title="New", creator=owner, status="pub").tags.add(
+                python
+            )
+            facets.index.checked_at = catalog.checked_at = 0
+            with CaptureQueriesContext(connection) as queries:
+                snapshot = catalog.snapshot()
+                facets.index.refresh()
+            self.assertTrue(queries)
+            seen.append(sorted(snapshot.entry(i).title for i in range(len(snapshot))))
+            seen.append(facets.index.counts(facets.index.published)["python"])
+            return HttpResponse()
+
+        self.request(read_from_replica(view))
+        self.assertEqual(seen, ["replica1", ["New", "Old"], 2])
+
+
+# -------------------------
+# Database connections
+# -------------------------
+class DatabaseConnectionTests(TestCase):
+    def test_postgresql_connections_are_reused(self):
+        config = settings_module.database_from_url("postgres://u:p@db:5432/app")
+        self.assertEqual(config["CONN_MAX_AGE"], settings.DATABASE_CONN_MAX_AGE)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+        self.assertNotIn("pool", config["OPTIONS"])
+
+    @override_settings(WEB_CONCURRENCY=4, WEB_THREADS=8, DATABASE_MAX_CONNECTIONS=20)
+    def test_pgbouncer_pool_is_sized_from_workers(self):
+        out = StringIO()
+        call_command("pgbouncer_config", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "[pgbouncer]")
+        self.assertIn("pool_mode = transaction", lines)
+        # 32 threads share the 20 connections the server allows
+        self.assertIn("default_pool_size = 20", lines)
+        self.assertIn("max_client_conn = 42", lines)
+        with self.settings(WEB_CONCURRENCY=2, WEB_THREADS=4):
+            self.assertEqual(pgbouncer_config.pool_settings()["default_pool_size"], 8)
+
+
+# -------------------------
+# SQLite backend
+# -------------------------
+class SQLiteBackendTests(TestCase):
+    def connect(self, engine="LibreCourse.sqlite_backend", **options):
+        """A connection to a new SQLite file, registered as "sqlite_test"."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        config = {
+            "ENGINE": engine,
+            "NAME": os.path.join(directory, "test.sqlite3"),
+            "OPTIONS": options,
+        }
+        connections.settings["sqlite_test"] = connections.configure_settings(
+            {DEFAULT_DB_ALIAS: config}
+        )[DEFAULT_DB_ALIAS]
+
+        def disconnect():
+            connections["sqlite_test"].close()
+            del connections["sqlite_test"]
+            del connections.settings["sqlite_test"]
+
+        self.addCleanup(disconnect)
+        return connections["sqlite_test"]
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def begin(self, connection):
+        """The statement opening a transaction on `connection`."""
+        with CaptureQueriesContext(connection) as ctx:
+            with transaction.atomic(using="sqlite_test"):
+                self.pragma(connection, "user_version")
+        return ctx.captured_queries[0]["sql"]
+
+    def test_immediate_transactions(self):
+        connection = self.connect(transaction_mode="IMMEDIATE")
+        self.assertEqual(self.begin(connection), "BEGIN IMMEDIATE")
+
+    def test_deferred_transactions_without_transaction_mode(self):
+        self.assertEqual(self.begin(self.connect()), "BEGIN")
+
+    def test_pragmas_applied_on_connect(self):
+        connection = self.connect()
+        self.assertEqual(self.pragma(connection, "journal_mode"), "wal")
+        self.assertEqual(
+            self.pragma(connection, "busy_timeout"),
+            settings.SQLITE_PRAGMAS["busy_timeout"],
+        )
+        self.assertEqual(self.pragma(connection, "synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma(connection, "temp_store"), 2)  # MEMORY
+
+    def test_django_backend_keeps_its_defaults(self):
+        connection = self.connect(engine="django.db.backends.sqlite3")
+        self.assertEqual(self.pragma(connection, "journal_mode"), "delete")
+
+
+# -------------------------
+# Async catalog views
+# -------------------------
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner@example.com", "owner", "pw")
+        User.objects.create_user("ownerly@example.com", "ownerly", "pw")
+        self.course = Course.objects.create(
+            title="Async", description="", creator=self.user, status="pub"
+        )
+        Lesson.objects.create(
+            title="First", content="x", course=self.course, position=1
+        )
+        self.async_client.force_login(self.user)
+
+    async def test_user_autocomplete_excludes_requester(self):
+        response = await self.async_client.get(
+            reverse("user-autocomplete"), {"q": "owner"}
+        )
+        self.assertEqual([u["username"] for u in response.json()], ["ownerly"])
+        response = await self.async_client.post(reverse("user-autocomplete"))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_course_detail(self):
+        response = await self.async_client.get(
+            reverse("course-detail", kwargs={"pk": self.course.pk})
+        )
+        self.assertContains(response, "First")
+        self.assertContains(response, "Edit Course")
+        response = await self.async_client.get(
+            reverse("course-detail", kwargs={"pk": self.course.pk + 1})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_asgi_closes_connections_after_each_request(self):
+        code = (
+            "import LibreCourse.asgi\n"
+            "from django.db import connections\n"
+            "print(connections['default'].settings_dict['CONN_MAX_AGE'])"
+        )
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if key not in ("LIBRECOURSE_ASGI", "DATABASE_CONN_MAX_AGE")
+        }
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        self.assertEqual(output.strip(), "0")
+
+
+# -------------------------
+# Settings
+# -------------------------
+class SettingsTests(TestCase):
+    def load(self, **env):
+        """The settings module's DEBUG and static storage under `env`."""
+        code = (
+            "from LibreCourse import settings\n"
+            "print(settings.DEBUG, settings.STORAGES['staticfiles']['BACKEND'])"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, **env},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        debug, storage = output.split()
+        return debug == "True", storage
+
+    def test_debug_flag_parsing(self):
+        self.assertTrue(settings_module.env_flag("UNSET_FLAG", default=True))
+        for value, expected in [
+            ("1", True),
+            ("true", True),
+            ("True", True),
+            ("yes", True),
+            (" ON ", True),
+            ("0", False),
+            ("false", False),
+            ("", False),
+        ]:
+            with self.subTest(value=value), mock.patch.dict(
+                os.environ, {"DEBUG": value}
+            ):
+                self.assertEqual(settings_module.env_flag("DEBUG"), expected)
+
+    def test_production_uses_hashed_compressed_static_files(self):
+        self.assertEqual(
+            self.load(DEBUG="True"),
+            (True, "django.contrib.staticfiles.storage.StaticFilesStorage"),
+        )
+        self.assertEqual(
+            self.load(DEBUG="false"),
+            (False, "whitenoise.storage.CompressedManifestStaticFilesStorage"),
+        )
+
+    def test_collectstatic_writes_hashed_and_compressed_copies(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        storages = {
+            **settings.STORAGES,
+            "staticfiles": {
+                "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"
+            },
+        }
+        with override_settings(STATIC_ROOT=root, STORAGES=storages):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name("css/output.css")
+        self.assertRegex(hashed, r"^css/output\.[0-9a-f]{12}\.css$")
+        for suffix in ("", ".gz", ".br"):
+            self.assertTrue(os.path.exists(os.path.join(root, hashed + suffix)))
+
+
+# -------------------------
+# Static export
+# -------------------------
+class StaticExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner@example.com", "owner", "pw")
+        self.courses = [
+            Course.objects.create(
+                title=f"Course {i}", description="", creator=self.user, status="pub"
+            )
+            for i in range(12)
+        ]
+        self.lesson = Lesson.objects.create(
+            title="First", content="# Hello", course=self.courses[0], position=1
+        )
+        Course.objects.create(title="Draft", creator=self.user, status="dra")
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def export(self):
+        out = StringIO()
+        call_command(
+            "export_site",
+            output=self.root,
+            base_url="https://example.com",
+            workers=1,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        return out.getvalue()
+
+    def read(self, *parts):
+        with open(os.path.join(self.root, *parts, "index.html")) as f:
+            return f.read()
+
+    def test_export_and_incremental_update(self):
+        self.assertIn("of 12 changed courses", self.export())
+        course = self.courses[0]
+        page = self.read("courses", str(course.pk))
+        self.assertIn("First", page)
+        self.assertNotIn("Edit Course", page)
+        self.assertIn(
+            "<h1", self.read("courses", str(course.pk), "lessons", str(self.lesson.pk))
+        )
+        self.assertIn('href="/courses/page/2/"', self.read("courses"))
+        self.assertIn("Course 0", self.read("courses", "page", "2"))
+        with open(os.path.join(self.root, "sitemap.xml")) as f:
+            sitemap = f.read()
+        self.assertIn(f"https://example.com/courses/{course.pk}/lessons/", sitemap)
+        self.assertNotIn("Draft", self.read("courses"))
+
+        self.lesson.delete()
+        for hidden in self.courses[1:3]:
+            hidden.status = "priv"
+            hidden.save()
+        self.assertIn("of 1 changed courses", self.export())
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(self.root, "courses", str(course.pk), "lessons")
+            )
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root, "courses", str(self.courses[1].pk)))
+        )
+        # One page of courses left
+        self.assertFalse(os.path.exists(os.path.join(self.root, "courses", "page")))
+
+    def test_catalog_pages_by_path(self):
+        facets.index.rebuild()
+        catalog.rebuild()
+        response = self.client.get(reverse("course-list-page", args=[2]))
+        self.assertEqual(len(response.context["courses"]), 2)
+        self.assertContains(response, 'href="/courses/?page=1"')
+
+
+# -------------------------
+# Response compression
+# -------------------------
+class CompressionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner@example.com", "owner", "pw")
+        self.course = Course.objects.create(
+            title="Long", description="", creator=self.user, status="pub"
+        )
+        Lesson.objects.bulk_create(
+            Lesson(title=f"Lesson {i}", content="x", course=self.course, position=i)
+            for i in range(200)
+        )
+
+    def test_negotiation(self):
+        self.assertEqual(compression.negotiate("gzip, deflate, br"), "br")
+        self.assertEqual(compression.negotiate("br;q=0.5, gzip"), "gzip")
+        self.assertEqual(compression.negotiate("*;q=0.1"), "br")
+        self.assertIsNone(compression.negotiate("gzip;q=0, identity"))
+        self.assertIsNone(compression.negotiate(""))
+
+    def test_course_page(self):
+        url = reverse("course-detail", kwargs={"pk": self.course.pk})
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertLess(int(response["Content-Length"]), len(plain.content) // 4)
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+    def test_pages_with_csrf_tokens_are_left_alone(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("course-manage-collaborators", args=[self.course.pk]),
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertContains(response, "csrfmiddlewaretoken")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_streaming_chunks_are_flushed(self):
+        def view(request):
+            return StreamingHttpResponse(
+                (f"<p>{i}</p>" * 100 for i in range(3)), content_type="text/html"
+            )
+
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        response = compression.CompressionMiddleware(view)(request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        decompressor = zlib.decompressobj(31)
+        chunks = [decompressor.decompress(chunk) for chunk in response]
+        # Each chunk decodes as soon as it arrives
+        self.assertEqual(chunks[0], b"<p>0</p>" * 100)
+        self.assertEqual(
+            b"".join(chunks), b"".join(f"<p>{i}</p>".encode() * 100 for i in range(3))
+        )
+
+
+# -------------------------
+# Jinja2 templates
+# -------------------------
+def normalize_html(content):
+    return re.sub(r">\s+<", "><", " ".join(content.decode().split()))
+
+
+class Jinja2TemplateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner@example.com", "owner", "pw")
+        self.course = Course.objects.create(
+            title="Fish & <Chips>", description="d", creator=self.user, status="pub"
+        )
+        self.course.tags.set(tags.resolve(["python", "web"]))
+        for i in range(12):
+            Course.objects.create(
+                title=f"Course {i}", description="", creator=self.user, status="pub"
+            )
+        Lesson.objects.create(
+            title="First", content="x", course=self.course, position=1
+        )
+        facets.index.rebuild()
+        catalog.rebuild()
+
+    def test_same_output_as_django_templates(self):
+        urls = [
+            reverse("home"),
+            reverse("course-list"),
+            reverse("course-list") + "?page=2&sort=title",
+            reverse("course-detail", kwargs={"pk": self.course.pk}),
+        ]
+        jinja2 = [settings.JINJA2_ENGINE, *settings.TEMPLATES]
+        for logged_in in (False, True):
+            if logged_in:
+                self.client.force_login(self.user)
+            for url in urls:
+                with self.subTest(url=url, logged_in=logged_in):
+                    expected = self.client.get(url)
+                    with override_settings(TEMPLATES=jinja2):
+                        response = self.client.get(url)
+                    # Only Django templates record their rendering
+                    self.assertTrue(expected.templates)
+                    self.assertFalse(response.templates)
+                    self.assertEqual(
+                        normalize_html(response.content),
+                        normalize_html(expected.content),
+                    )
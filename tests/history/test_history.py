@@ -0,0 +1,138 @@
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.forms import LessonForm
+from courses.models import Course, Lesson
+from history import recorder
+from history.models import ChangeHistory
+from users.models import User
+
+
+def entry(**fields):
+    return ChangeHistory.objects.create(
+        **{
+            "course_id": 1,
+            "object_type": "course",
+            "object_id": 1,
+            "object_repr": "Course",
+            "action": "create",
+            "timestamp": timezone.now(),
+            **fields,
+        }
+    )
+
+
+class RecorderTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner@example.com", "owner", "pw")
+        self.course = Course.objects.create(
+            title="History", description="", creator=self.user, status="pub"
+        )
+        self.lesson = Lesson.objects.create(
+            title="First",
+            content="\n".join(f"line {i}" for i in range(60)),
+            course=self.course,
+            position=1,
+        )
+        self.addCleanup(recorder.buffer.flush)
+
+    def test_form_changes_and_compact_diff(self):
+        content = self.lesson.content.replace("line 30", "changed")
+        form = LessonForm({"title": "First", "content": content}, instance=self.lesson)
+        self.assertTrue(form.is_valid())
+        changes = recorder.form_changes(form)
+        # Only the changed field, as a diff of the lines around the change
+        self.assertEqual(list(changes), ["content"])
+        self.assertEqual(
+            changes["content"]["diff"],
+            "@@ -30,3 +30,3 @@\n line 29\n-line 30\n+changed\n line 31",
+        )
+
+        form = LessonForm({"title": "Second", "content": "short"})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(
+            recorder.form_changes(form, initial=False),
+            {"title": [None, "Second"], "content": [None, "short"]},
+        )
+        self.assertEqual(recorder.compact("a", "b"), ["a", "b"])
+
+    def test_record_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            recorder.record("update", self.lesson, self.user, {"title": ["a", "b"]})
+            self.assertEqual(recorder.buffer.pending(), [])
+        for callback in callbacks:
+            callback()
+        recorder.buffer.flush()
+        history = ChangeHistory.objects.get()
+        self.assertEqual(
+            (history.course_id, history.object_type, history.object_id),
+            (self.course.pk, "lesson", self.lesson.pk),
+        )
+        self.assertEqual(history.changes, {"title": ["a", "b"]})
+
+    def test_nothing_recorded_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    recorder.record("delete", self.course, self.user)
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        self.assertEqual(callbacks, [])
+        recorder.buffer.flush()
+        self.assertFalse(ChangeHistory.objects.exists())
+
+    def test_rows_are_append_only(self):
+        history = entry()
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            ChangeHistory.objects.filter(pk=history.pk).update(action="delete")
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            history.delete()
+        history.refresh_from_db()
+        self.assertEqual(history.action, "create")
+
+
+class CourseHistoryViewTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner@example.com", "owner", "pw")
+        self.collaborator = User.objects.create_user(
+            "collaborator@example.com", "collaborator", "pw"
+        )
+        self.stranger = User.objects.create_user(
+            "stranger@example.com", "stranger", "pw"
+        )
+        self.course = Course.objects.create(
+            title="History", description="", creator=self.owner, status="pub"
+        )
+        self.course.collaborators.add(self.collaborator)
+        entry(course_id=self.course.pk, object_id=self.course.pk, user_repr="owner")
+        self.url = reverse("course-history", args=[self.course.pk])
+
+    def test_permissions(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("login/?next=", response["Location"])
+
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        for user in (self.owner, self.collaborator):
+            self.client.force_login(user)
+            self.assertContains(self.client.get(self.url), "owner")
+
+        self.assertEqual(
+            self.client.get(reverse("course-history", args=[0])).status_code, 404
+        )
+
+
+class FlushTests(TransactionTestCase):
+    def test_flush_empties_history_and_keeps_it_append_only(self):
+        entry()
+        call_command("flush", interactive=False, verbosity=0)
+        self.assertFalse(ChangeHistory.objects.exists())
+        history = entry()
+        with self.assertRaises(DatabaseError):
+            history.delete()
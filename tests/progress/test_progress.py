@@ -0,0 +1,150 @@
+import random
+import threading
+from unittest import mock
+
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from LibreCourse.buffering import BatchBuffer
+from courses.models import Course, Lesson
+from progress.buffer import buffer, percent_complete, write_marks
+from progress.models import Enrollment
+from users.models import User
+
+
+class ProgressTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("learner@example.com", "learner", "pw")
+        self.course = Course.objects.create(title="Course", status="pub")
+        self.lessons = [
+            Lesson.objects.create(
+                title=f"L{i}", content="", course=self.course, position=i
+            )
+            for i in range(1, 5)
+        ]
+        self.course.refresh_from_db()
+        # Don't leave marks for this test's rows in the shared buffer
+        self.addCleanup(buffer.flush)
+
+    def test_lesson_count_tracks_lessons(self):
+        self.assertEqual(self.course.lesson_count, 4)
+        self.lessons[0].delete()
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.lesson_count, 3)
+
+    def test_endpoint_marks_and_reports_percent(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("lesson-complete", args=[self.lessons[1].pk])
+        )
+        self.assertEqual(response.json(), {"percent_complete": 25})
+        self.client.get(
+            reverse("lesson-detail", args=[self.course.pk, self.lessons[2].pk])
+        )
+        self.assertEqual(percent_complete(self.user, self.course), 50)
+
+    def test_hidden_courses_cannot_be_completed(self):
+        owner = User.objects.create_user("owner@example.com", "owner", "pw")
+        for status in ("dra", "priv"):
+            course = Course.objects.create(
+                title=f"Hidden {status}", status=status, creator=owner
+            )
+            lesson = Lesson.objects.create(
+                title="L", content="", course=course, position=1
+            )
+            self.client.force_login(self.user)
+            response = self.client.post(reverse("lesson-complete", args=[lesson.pk]))
+            self.assertEqual(response.status_code, 404)
+            response = self.client.get(
+                reverse("lesson-detail", args=[course.pk, lesson.pk])
+            )
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(buffer.pending(), [])
+
+            course.collaborators.add(self.user)
+            response = self.client.post(reverse("lesson-complete", args=[lesson.pk]))
+            self.assertEqual(response.json(), {"percent_complete": 100})
+            self.client.force_login(owner)
+            response = self.client.post(reverse("lesson-complete", args=[lesson.pk]))
+            self.assertEqual(response.status_code, 200)
+            buffer.flush()
+
+    def test_failing_flush_does_not_break_the_page(self):
+        self.client.force_login(self.user)
+        url = reverse("lesson-detail", args=[self.course.pk, self.lessons[0].pk])
+        failing = mock.patch.object(
+            buffer, "flush_fn", side_effect=DatabaseError("database is locked")
+        )
+        with failing, mock.patch.object(buffer, "max_items", 1), self.assertLogs(
+            "LibreCourse.buffering", "ERROR"
+        ):
+            self.assertEqual(self.client.get(url).status_code, 200)
+            response = self.client.post(
+                reverse("lesson-complete", args=[self.lessons[1].pk])
+            )
+            self.assertEqual(response.status_code, 200)
+        # Kept for the next flush
+        self.assertEqual(
+            buffer.pending(),
+            [(self.user.pk, self.course.pk, 1), (self.user.pk, self.course.pk, 2)],
+        )
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(percent_complete(self.user, self.course), 50)
+
+        with mock.patch.object(buffer, "flush_fn", side_effect=DatabaseError):
+            buffer.append((self.user.pk, self.course.pk, 3))
+            # Explicit flushes still raise
+            with self.assertRaises(DatabaseError):
+                buffer.flush()
+
+
+class ProgressStressTests(TransactionTestCase):
+    """Many learners marking lessons at once through one shared buffer."""
+
+    LEARNERS = 40
+    LESSONS = 30
+    MARKS_PER_LEARNER = 200
+
+    def test_concurrent_marks(self):
+        users = User.objects.bulk_create(
+            User(email=f"l{i}@example.com", username=f"l{i}")
+            for i in range(self.LEARNERS)
+        )
+        course = Course.objects.create(title="Stress", status="pub")
+        # Flushes are triggered from the learner threads themselves
+        buffer = BatchBuffer(write_marks, max_items=250, max_age=60)
+        expected = {user.pk: set() for user in users}
+        errors = []
+
+        def learner(user):
+            try:
+                rng = random.Random(user.pk)
+                for _ in range(self.MARKS_PER_LEARNER):
+                    position = rng.randint(1, self.LESSONS)
+                    expected[user.pk].add(position)
+                    buffer.append((user.pk, course.pk, position))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=learner, args=(u,)) for u in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        buffer.flush()
+
+        self.assertEqual(errors, [])
+        enrollments = Enrollment.objects.filter(course=course)
+        self.assertEqual(enrollments.count(), self.LEARNERS)
+        for enrollment in enrollments:
+            self.assertEqual(
+                enrollment.completed_count, len(expected[enrollment.user_id])
+            )
+            bits = int.from_bytes(enrollment.completed, "little")
+            self.assertEqual(
+                {p for p in range(1, self.LESSONS + 1) if bits >> (p - 1) & 1},
+                expected[enrollment.user_id],
+            )
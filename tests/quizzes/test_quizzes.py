@@ -0,0 +1,135 @@
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+
+from courses.models import Course
+from quizzes.grading import UNANSWERED, AnswerKey, grade_pending
+from quizzes.models import CourseQuizStats, Question, Quiz, QuizSubmission
+from users.models import User
+
+
+class AnswerKeyTests(TestCase):
+    def test_vectorized_scores_match_loop(self):
+        rng = np.random.default_rng(1)
+        key = AnswerKey(range(1, 21), rng.integers(0, 4, 20), rng.integers(1, 4, 20))
+        chosen = rng.integers(-1, 4, (500, 20))
+        submissions = [
+            {str(q + 1): int(c) for q, c in enumerate(row) if c >= 0} for row in chosen
+        ]
+        expected = [
+            sum(int(key.points[q]) for q, c in enumerate(row) if c == key.answers[q])
+            for row in chosen
+        ]
+        self.assertEqual(key.grade(key.encode(submissions)).tolist(), expected)
+
+    def test_questions_without_an_answer_score_nothing(self):
+        key = AnswerKey([1, 2], [1, UNANSWERED], [2, 5])
+        self.assertEqual(key.max_score, 2)
+        matrix = key.encode([{}, {"1": 1}, {"1": 0, "2": 3}])
+        self.assertEqual(key.grade(matrix).tolist(), [0, 2, 0])
+
+    def test_questions_need_an_answer(self):
+        for type, data in [
+            (Question.MULTIPLE_CHOICE, {"choices": ["a", "b"]}),
+            (Question.MULTIPLE_CHOICE, {"choices": ["a", "b"], "answer": 2}),
+            (Question.TRUE_FALSE, {}),
+            (Question.TRUE_FALSE, {"answer": 1}),
+        ]:
+            with self.subTest(type=type, data=data), self.assertRaises(ValidationError):
+                Question(type=type, prompt="?", data=data).clean()
+        Question(data={"choices": ["a", "b"], "answer": 1}).clean()
+        Question(type=Question.TRUE_FALSE, data={"answer": False}).clean()
+
+    def test_unknown_and_invalid_answers_are_ignored(self):
+        key = AnswerKey([1, 2], [0, 1], [1, 1])
+        matrix = key.encode([{"1": 0, "99": 1, "2": "x"}])
+        self.assertEqual(key.grade(matrix).tolist(), [1])
+
+
+class QuizSubmissionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("learner@example.com", "learner", "pw")
+        self.course = Course.objects.create(title="Course", status="pub")
+        self.quiz = Quiz.objects.create(course=self.course, title="Quiz")
+        self.questions = [
+            Question.objects.create(
+                quiz=self.quiz,
+                position=1,
+                prompt="Pick b",
+                data={"choices": ["a", "b", "c"], "answer": 1},
+                points=3,
+            ),
+            Question.objects.create(
+                quiz=self.quiz,
+                position=2,
+                type=Question.TRUE_FALSE,
+                prompt="True?",
+                data={"answer": True},
+            ),
+        ]
+
+    def test_submission_is_queued_then_graded(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("quiz-detail", args=[self.course.pk, self.quiz.pk]),
+            {f"question-{self.questions[0].pk}": "1"},
+        )
+        submission = QuizSubmission.objects.get()
+        self.assertRedirects(
+            response,
+            reverse(
+                "quiz-submission", args=[self.course.pk, self.quiz.pk, submission.pk]
+            ),
+        )
+        status_url = reverse(
+            "quiz-submission-status",
+            args=[self.course.pk, self.quiz.pk, submission.pk],
+        )
+        self.assertEqual(self.client.get(status_url).status_code, 202)
+
+        self.assertEqual(grade_pending(), 1)
+        self.assertEqual(
+            self.client.get(status_url).json(),
+            {"status": "graded", "score": 3, "max_score": 4, "percent": 75},
+        )
+        stats = CourseQuizStats.objects.get(course=self.course)
+        self.assertEqual(stats.graded_submissions, 1)
+        self.assertEqual(stats.mean_percent, 75)
+
+    def test_hidden_course_quizzes(self):
+        owner = User.objects.create_user("owner@example.com", "owner", "pw")
+        collaborator = User.objects.create_user("collab@example.com", "collab", "pw")
+        self.course.creator = owner
+        self.course.status = "priv"
+        self.course.save()
+        self.course.collaborators.add(collaborator)
+        url = reverse("quiz-detail", args=[self.course.pk, self.quiz.pk])
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.post(url, {f"question-{self.questions[0].pk}": "1"})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(QuizSubmission.objects.exists())
+
+        for user in (owner, collaborator):
+            self.client.force_login(user)
+            self.assertContains(self.client.get(url), "Pick b")
+
+    def test_batches_update_course_aggregates(self):
+        QuizSubmission.objects.bulk_create(
+            QuizSubmission(
+                quiz=self.quiz,
+                user=self.user,
+                answers={
+                    str(self.questions[0].pk): 1,
+                    str(self.questions[1].pk): i % 2,
+                },
+            )
+            for i in range(10)
+        )
+        self.assertEqual(grade_pending(batch_size=3), 10)
+        self.assertFalse(QuizSubmission.objects.filter(status="pending").exists())
+        stats = CourseQuizStats.objects.get(course=self.course)
+        self.assertEqual(stats.graded_submissions, 10)
+        self.assertAlmostEqual(stats.mean_percent, 87.5)
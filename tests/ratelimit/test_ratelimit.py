@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ratelimit.storage import STORAGES, take
+from users.models import User
+
+LIMITS = {
+    "login": {"rate": "1/m", "burst": 2, "key": "ip"},
+    "autocomplete": {"rate": "1/m", "burst": 1, "key": "user"},
+}
+
+
+class TokenBucketTests(TestCase):
+    def test_take_refills_up_to_burst(self):
+        state, wait = take(None, 100.0, rate=1.0, burst=2)
+        self.assertEqual((state, wait), ((1.0, 100.0), 0.0))
+        state, wait = take(state, 100.0, 1.0, 2)
+        state, wait = take(state, 100.0, 1.0, 2)
+        self.assertEqual(wait, 1.0)
+        state, wait = take(state, 1000.0, 1.0, 2)
+        self.assertEqual((state, wait), ((1.0, 1000.0), 0.0))
+
+    def test_storages(self):
+        for name, storage_class in STORAGES.items():
+            with self.subTest(name):
+                storage = storage_class()
+                waits = [storage.consume("k", 0.5, 2, now=10.0) for _ in range(3)]
+                self.assertEqual(waits, [0.0, 0.0, 2.0])
+                self.assertEqual(storage.consume("k", 0.5, 2, now=12.0), 0.0)
+                self.assertEqual(storage.consume("other", 0.5, 2, now=12.0), 0.0)
+
+
+@override_settings(RATE_LIMITS=LIMITS, RATE_LIMIT_STORAGE="cache")
+class RateLimitViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("a@example.com", "alice", "pw")
+
+    def test_login_is_limited_per_ip_before_hashing(self):
+        data = {"email": "a@example.com", "password": "wrong"}
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse("login"), data).status_code, 200)
+        response = self.client.post(reverse("login"), data)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+        # Another address has its own bucket, and GET isn't limited
+        response = self.client.post(reverse("login"), data, REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse("login")).status_code, 200)
+
+    def test_async_autocomplete_is_limited_per_user(self):
+        self.client.force_login(self.user)
+        url = reverse("user-autocomplete")
+        self.assertEqual(self.client.get(url, {"q": "a"}).status_code, 200)
+        self.assertEqual(self.client.get(url, {"q": "al"}).status_code, 429)
+        self.client.logout()
+        self.assertEqual(self.client.get(url, {"q": "a"}).status_code, 200)
+
+    @override_settings(RATE_LIMIT_PROXIES=1)
+    def test_forwarded_address(self):
+        data = {"email": "a@example.com", "password": "wrong"}
+        for address in ("1.1.1.1", "1.1.1.1", "1.1.1.1", "2.2.2.2"):
+            response = self.client.post(
+                reverse("login"), data, HTTP_X_FORWARDED_FOR=f"9.9.9.9, {address}"
+            )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            reverse("login"), data, HTTP_X_FORWARDED_FOR="1.1.1.1"
+        )
+        self.assertEqual(response.status_code, 429)
@@ -0,0 +1,34 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# user_autocomplete filters with username__icontains, which PostgreSQL renders
+# as UPPER("username"::text) LIKE UPPER('%q%'). A B-tree index can't serve a
+# leading wildcard, a trigram GIN index on the same expression can.
+# SQLite has no equivalent, so both operations are no-ops there.
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS users_user_username_trgm "
+        "ON users_user USING gin (UPPER(username::text) gin_trgm_ops)"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS users_user_username_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_index, drop_index),
+    ]
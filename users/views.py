@@ -5,8 +5,13 @@ from .models import User
 from .forms import SignupForm, LoginForm, UserUpdateForm
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.decorators import login_required
+from LibreCourse.routers import read_from_replica
+from analytics.events import track
+from analytics.models import EventKind
+from ratelimit.limits import rate_limit
 
 
+@rate_limit("signup", methods=["POST"])
 def signup_view(request):
     if request.method == "POST":
         form = SignupForm(request.POST)
@@ -19,6 +24,7 @@ def signup_view(request):
             user = User.objects.create_user(
                 email=email, username=username, password=password
             )
+            track(EventKind.SIGNUP)
 
             # Authenticate using custom backend
             user = authenticate(request, email=email, password=password)
@@ -35,6 +41,7 @@ def signup_view(request):
     return render(request, "users/signup.html", {"form": form})
 
 
+@rate_limit("login", methods=["POST"])
 def login_view(request):
     if request.method == "POST":
         form = LoginForm(request.POST)
@@ -66,6 +73,7 @@ def logout_view(request):
     return JsonResponse({"error": "Invalid request method. Use POST."}, status=400)
 
 
+@read_from_replica
 def listUsers(request):
     users = User.objects.all().order_by("id")
     return render(request, "users/users.html", {"users": users})